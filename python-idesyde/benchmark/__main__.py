@@ -0,0 +1,84 @@
+import argparse
+import sys
+from pathlib import Path
+
+from idesyde.benchmark.suite import file_case
+from idesyde.benchmark.suite import find_regressions
+from idesyde.benchmark.suite import load_baseline
+from idesyde.benchmark.suite import run_suite
+from idesyde.benchmark.suite import scaling_cases
+from idesyde.benchmark.suite import write_results
+
+# models shipped in the repository that are benchmarked when they can be loaded
+_repository_root = Path(__file__).resolve().parents[2]
+_repository_models = [
+    _repository_root / "large_platform.fiodl",
+    _repository_root / "examples" / "sobel-on-mpsoc" / "process.forsyde.json",
+]
+
+
+def _print_result(result) -> None:
+    if result.error:
+        print(f"{result.name:<24} {result.vertexes:>8} vertexes  FAILED: {result.error.strip().splitlines()[-1]}")
+    else:
+        print(
+            f"{result.name:<24} {result.vertexes:>8} vertexes  "
+            f"identify {result.identify_time:>9.3f}s  choose {result.choose_time:>9.3f}s  "
+            f"chosen {', '.join(result.chosen) or '-'}"
+        )
+
+
+def benchmark_entry() -> int:
+    parser = argparse.ArgumentParser(
+        prog="idesyde.benchmark", description="Benchmark the identification procedure on scalable synthetic models."
+    )
+    parser.add_argument(
+        "--platform",
+        action="append",
+        choices=["mesh", "bus"],
+        help="Platforms of the synthetic scaling curves. Defaults to both.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8, 16],
+        help="Number of tiles of each point in the scaling curves.",
+    )
+    parser.add_argument("--actors-per-tile", type=int, default=4, help="Number of SDF actors per tile.")
+    parser.add_argument(
+        "--model",
+        action="append",
+        default=[],
+        help="Additional model files to benchmark, besides the ones in the repository.",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Repetitions of every case, keeping the fastest.")
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Stop a scaling curve once one of its points takes longer than this.",
+    )
+    parser.add_argument("-o", "--output", type=str, default=None, help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare the results against this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative slowdown accepted by the comparison.")
+    args = parser.parse_args()
+    cases = []
+    for platform in args.platform or ["mesh", "bus"]:
+        cases.extend(scaling_cases(platform, sorted(args.sizes), actors_per_tile=args.actors_per_tile))
+    cases.extend(file_case(str(p)) for p in _repository_models if p.is_file())
+    cases.extend(file_case(p) for p in args.model)
+    results = run_suite(cases, repeat=args.repeat, max_seconds=args.max_seconds, progress=_print_result)
+    if args.output:
+        write_results(results, args.output)
+    if args.baseline:
+        regressions = find_regressions(results, load_baseline(args.baseline), tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(benchmark_entry())
@@ -0,0 +1,291 @@
+import math
+import random
+from fractions import Fraction
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Edge
+from forsyde.io.python.core import Port
+from forsyde.io.python.core import Trait
+from forsyde.io.python.core import Vertex
+from forsyde.io.python.types import EdgeTrait
+from forsyde.io.python.types import VertexTrait
+
+
+def _add_vertex(
+    model: ForSyDeModel,
+    identifier: str,
+    traits: Set[Trait],
+    properties: Optional[Dict] = None,
+    ports: Sequence[str] = (),
+) -> Vertex:
+    v = Vertex(
+        identifier=identifier,
+        ports=set(Port(p) for p in ports),
+        properties=properties if properties else dict(),
+        vertex_traits=traits,
+    )
+    model.add_node(v, label=v.identifier)
+    return v
+
+
+def _connect(
+    model: ForSyDeModel,
+    source: Vertex,
+    target: Vertex,
+    traits: Set[Trait],
+    source_port: Optional[str] = None,
+    target_port: Optional[str] = None,
+) -> None:
+    edge = Edge(
+        source=source,
+        target=target,
+        source_port=source.get_port(source_port) if source_port else None,
+        target_port=target.get_port(target_port) if target_port else None,
+        edge_traits=traits,
+    )
+    model.add_edge(source, target, object=edge)
+
+
+def _connect_both(model: ForSyDeModel, a: Vertex, b: Vertex) -> None:
+    _connect(model, a, b, {EdgeTrait.AbstractPhysicalConnection})
+    _connect(model, b, a, {EdgeTrait.AbstractPhysicalConnection})
+
+
+def add_sdf_application(
+    model: ForSyDeModel,
+    actors: int,
+    rates: Sequence[int] = (1,),
+    extra_channels: int = 0,
+    delays: int = 0,
+    prefix: str = "app",
+    rng: Optional[random.Random] = None,
+) -> Tuple[List[Vertex], List[Vertex]]:
+    """Add a consistent SDF application to 'model'
+
+    The actors form a chain, with production and consumption rates drawn
+    from 'rates', plus 'extra_channels' forward channels between random actors
+    whose rates are chosen so that the application stays consistent. Each channel
+    is made of one signal, and 'delays' of them also get a delay in the middle.
+    Every actor also gets an instrumented implementation.
+
+    Returns:
+        The actors and the vertexes of the channels, signals and delays, that were added.
+    """
+    rng = rng if rng else random.Random(0)
+    actor_vertexes: List[Vertex] = []
+    # repetitions along the chain, used to keep the extra channels consistent
+    repetitions: List[Fraction] = []
+    chain: List[Tuple[int, int, int, int]] = []
+    for i in range(actors):
+        if i == 0:
+            repetitions.append(Fraction(1))
+        else:
+            (prod, cons) = (rng.choice(rates), rng.choice(rates))
+            repetitions.append(repetitions[i - 1] * prod / cons)
+            chain.append((i - 1, i, prod, cons))
+    extra: List[Tuple[int, int, int, int]] = []
+    for _ in range(extra_channels if actors > 2 else 0):
+        s = rng.randrange(0, actors - 2)
+        t = rng.randrange(s + 2, actors)
+        ratio = repetitions[t] / repetitions[s]
+        extra.append((s, t, ratio.numerator, ratio.denominator))
+    channels = chain + extra
+    ports: List[List[str]] = [[] for _ in range(actors)]
+    production: List[Dict[str, int]] = [dict() for _ in range(actors)]
+    consumption: List[Dict[str, int]] = [dict() for _ in range(actors)]
+    for (cidx, (s, t, prod, cons)) in enumerate(channels):
+        ports[s].append(f"out{cidx}")
+        ports[t].append(f"in{cidx}")
+        production[s][f"out{cidx}"] = prod
+        consumption[t][f"in{cidx}"] = cons
+    for i in range(actors):
+        a = _add_vertex(
+            model,
+            f"{prefix}_actor{i}",
+            {VertexTrait.SDFComb},
+            {"production": production[i], "consumption": consumption[i]},
+            ports[i] + ["impl"],
+        )
+        impl = _add_vertex(
+            model,
+            f"{prefix}_impl{i}",
+            {VertexTrait.InstrumentedFunction},
+            {"max_memory_size_in_bytes": rng.randint(1, 64) * 1024},
+        )
+        _connect(model, a, impl, {EdgeTrait.Composition}, source_port="impl")
+        actor_vertexes.append(a)
+    channel_vertexes: List[Vertex] = []
+    delayed = set(rng.sample(range(len(channels)), min(delays, len(channels))))
+    for (cidx, (s, t, _, _)) in enumerate(channels):
+        sig = _add_vertex(model, f"{prefix}_sig{cidx}", {VertexTrait.Signal}, ports=["in", "out"])
+        _connect(model, actor_vertexes[s], sig, {EdgeTrait.Output}, source_port=f"out{cidx}", target_port="in")
+        channel_vertexes.append(sig)
+        if cidx in delayed:
+            delay = _add_vertex(model, f"{prefix}_delay{cidx}", {VertexTrait.SDFPrefix}, ports=["in", "out"])
+            sig_out = _add_vertex(model, f"{prefix}_sig{cidx}_d", {VertexTrait.Signal}, ports=["in", "out"])
+            _connect(model, sig, delay, {EdgeTrait.Output}, source_port="out", target_port="in")
+            _connect(model, delay, sig_out, {EdgeTrait.Output}, source_port="out", target_port="in")
+            channel_vertexes.append(delay)
+            channel_vertexes.append(sig_out)
+            sig = sig_out
+        _connect(model, sig, actor_vertexes[t], {EdgeTrait.Input}, source_port="out", target_port=f"in{cidx}")
+    return (actor_vertexes, channel_vertexes)
+
+
+def _add_tile(model: ForSyDeModel, identifier: str, rng: random.Random) -> Vertex:
+    frequency = rng.choice([50, 100, 200]) * 1000 * 1000
+    core = _add_vertex(
+        model,
+        identifier,
+        {VertexTrait.AbstractProcessingComponent, VertexTrait.InstrumentedProcessorTile},
+        {
+            "max_memory_internal_bytes": rng.choice([32, 64, 128]) * 1024,
+            "min_frequency_hz": frequency,
+            "max_frequency_hz": frequency,
+            "max_clock_cycles_per_op": {"int_ops": rng.randint(1, 4), "float_ops": rng.randint(2, 16)},
+        },
+    )
+    scheduler = _add_vertex(model, f"{identifier}_os", {VertexTrait.TimeTriggeredScheduler})
+    _connect(model, core, scheduler, {EdgeTrait.AbstractAllocation})
+    return core
+
+
+def _add_interconnect(model: ForSyDeModel, identifier: str, slots: int, rng: random.Random) -> Vertex:
+    comm = _add_vertex(
+        model,
+        identifier,
+        {
+            VertexTrait.AbstractCommunicationComponent,
+            VertexTrait.InstrumentedCommunicationInterconnect,
+            VertexTrait.TimeDivisionMultiplexer,
+        },
+        {"slots": slots, "max_bandwith_bytes_per_sec": rng.choice([100, 200, 400]) * 1024 * 1024},
+    )
+    scheduler = _add_vertex(model, f"{identifier}_os", {VertexTrait.TimeTriggeredScheduler})
+    _connect(model, comm, scheduler, {EdgeTrait.AbstractAllocation})
+    return comm
+
+
+def add_mesh_platform(
+    model: ForSyDeModel,
+    tiles: int,
+    slots: int = 4,
+    prefix: str = "mesh",
+    rng: Optional[random.Random] = None,
+) -> Tuple[List[Vertex], List[Vertex]]:
+    """Add a mesh of 'tiles' tiles to 'model', as square as possible
+
+    Every tile has a core and a TDM router connected to the routers of the
+    neighbouring tiles. Cores and routers all have time triggered schedulers.
+
+    Returns:
+        The cores and the routers that were added.
+    """
+    rng = rng if rng else random.Random(0)
+    cols = max(1, int(math.ceil(math.sqrt(tiles))))
+    cores: List[Vertex] = []
+    routers: List[Vertex] = []
+    for i in range(tiles):
+        core = _add_tile(model, f"{prefix}_core{i}", rng)
+        router = _add_interconnect(model, f"{prefix}_router{i}", slots, rng)
+        _connect_both(model, core, router)
+        if i % cols > 0:
+            _connect_both(model, router, routers[i - 1])
+        if i >= cols:
+            _connect_both(model, router, routers[i - cols])
+        cores.append(core)
+        routers.append(router)
+    return (cores, routers)
+
+
+def add_bus_platform(
+    model: ForSyDeModel,
+    tiles: int,
+    slots: int = 4,
+    prefix: str = "bus",
+    rng: Optional[random.Random] = None,
+) -> Tuple[List[Vertex], List[Vertex]]:
+    """Add 'tiles' cores sharing a single TDM bus to 'model'
+
+    Returns:
+        The cores and the bus that were added.
+    """
+    rng = rng if rng else random.Random(0)
+    bus = _add_interconnect(model, f"{prefix}_bus", slots, rng)
+    cores: List[Vertex] = []
+    for i in range(tiles):
+        core = _add_tile(model, f"{prefix}_core{i}", rng)
+        _connect_both(model, core, bus)
+        cores.append(core)
+    return (cores, [bus])
+
+
+def add_timing_annotations(
+    model: ForSyDeModel,
+    actors: Sequence[Vertex],
+    cores: Sequence[Vertex],
+    signals: Sequence[Vertex],
+    comms: Sequence[Vertex],
+    wcet_range: Tuple[int, int] = (10, 100),
+    wcct_range: Tuple[int, int] = (1, 10),
+    prefix: str = "ann",
+    rng: Optional[random.Random] = None,
+) -> None:
+    """Add a WCET for every pair of actor and core, and a WCCT for every pair of channel vertex and interconnect."""
+    rng = rng if rng else random.Random(0)
+    for (i, a) in enumerate(actors):
+        for (j, p) in enumerate(cores):
+            w = _add_vertex(model, f"{prefix}_wcet_{i}_{j}", {VertexTrait.WCET}, {"time": rng.randint(*wcet_range)})
+            _connect(model, w, a, {EdgeTrait.Annotation})
+            _connect(model, w, p, {EdgeTrait.Annotation})
+    for (i, s) in enumerate(signals):
+        for (j, c) in enumerate(comms):
+            w = _add_vertex(model, f"{prefix}_wcct_{i}_{j}", {VertexTrait.WCCT}, {"time": rng.randint(*wcct_range)})
+            _connect(model, w, s, {EdgeTrait.Annotation})
+            _connect(model, w, c, {EdgeTrait.Annotation})
+
+
+def synthetic_model(
+    actors: int,
+    tiles: int,
+    platform: str = "mesh",
+    rates: Sequence[int] = (1, 2, 3),
+    extra_channels: int = 0,
+    delays: int = 0,
+    slots: int = 4,
+    annotated: bool = True,
+    seed: int = 0,
+) -> ForSyDeModel:
+    """Build a model with one SDF application and one platform
+
+    Arguments:
+        actors: number of SDF actors.
+        tiles: number of cores in the platform.
+        platform: either 'mesh' or 'bus'.
+        rates: the production and consumption rates to draw from.
+        extra_channels: number of channels besides the actor chain.
+        delays: number of channels with a delay.
+        slots: number of TDM slots in every interconnect.
+        annotated: whether to add WCET and WCCT annotations.
+        seed: seed for the random choices, so that the same arguments give the same model.
+    """
+    rng = random.Random(seed)
+    model = ForSyDeModel()
+    (sdf_actors, channel_vertexes) = add_sdf_application(
+        model, actors, rates=rates, extra_channels=extra_channels, delays=delays, rng=rng
+    )
+    if platform == "mesh":
+        (cores, comms) = add_mesh_platform(model, tiles, slots=slots, rng=rng)
+    elif platform == "bus":
+        (cores, comms) = add_bus_platform(model, tiles, slots=slots, rng=rng)
+    else:
+        raise ValueError(f"Unknown platform {platform}, expected 'mesh' or 'bus'.")
+    if annotated:
+        add_timing_annotations(model, sdf_actors, cores, channel_vertexes, comms, rng=rng)
+    return model
@@ -0,0 +1,204 @@
+import json
+import time
+import traceback
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+import forsyde.io.python.api as forsyde_io
+from forsyde.io.python.api import ForSyDeModel
+
+from idesyde.benchmark.generators import synthetic_model
+from idesyde.identification.api import choose_decision_models
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.tracing import IdentificationTrace
+
+
+@dataclass
+class BenchmarkCase:
+    """A model to be identified, built on demand
+
+    Cases of the same 'curve' only differ by 'size', so that
+    their results together form a scaling curve.
+    """
+
+    name: str
+    build: Callable[[], ForSyDeModel]
+    curve: str = ""
+    size: int = 0
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements of one benchmark case, with all times in seconds."""
+
+    name: str
+    curve: str = ""
+    size: int = 0
+    vertexes: int = 0
+    edges: int = 0
+    build_time: float = 0.0
+    identify_time: float = 0.0
+    choose_time: float = 0.0
+    identified: List[str] = field(default_factory=list)
+    chosen: List[str] = field(default_factory=list)
+    rules: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def scaling_cases(platform: str, sizes: Sequence[int], actors_per_tile: int = 4, seed: int = 0) -> List[BenchmarkCase]:
+    """Build a scaling curve of synthetic models with 'sizes' tiles each
+
+    Every model has 'actors_per_tile' SDF actors per tile, a few extra channels
+    and delays, and all the WCET and WCCT annotations.
+    """
+    cases = []
+    for size in sizes:
+        actors = size * actors_per_tile
+
+        def build(size=size, actors=actors) -> ForSyDeModel:
+            return synthetic_model(
+                actors, size, platform=platform, extra_channels=actors // 4, delays=actors // 8, seed=seed
+            )
+
+        cases.append(BenchmarkCase(name=f"{platform}-{size}", build=build, curve=platform, size=size))
+    return cases
+
+
+def file_case(path: str) -> BenchmarkCase:
+    """Build a case that loads the model in 'path'."""
+    return BenchmarkCase(name=path, build=lambda: forsyde_io.load_model(path))
+
+
+def run_case(case: BenchmarkCase, repeat: int = 1) -> BenchmarkResult:
+    """Identify and choose the decision models of 'case', keeping the fastest of 'repeat' runs
+
+    Errors are not raised but recorded in the result, so that
+    a broken case does not stop the rest of the suite.
+    """
+    result = BenchmarkResult(name=case.name, curve=case.curve, size=case.size)
+    try:
+        start = time.perf_counter()
+        model = case.build()
+        result.build_time = time.perf_counter() - start
+        result.vertexes = model.number_of_nodes()
+        result.edges = model.number_of_edges()
+        for r in range(max(1, repeat)):
+            trace = IdentificationTrace()
+            start = time.perf_counter()
+            identified = identify_decision_models(model, trace=trace)
+            identify_time = time.perf_counter() - start
+            start = time.perf_counter()
+            chosen = choose_decision_models(identified)
+            choose_time = time.perf_counter() - start
+            if r == 0 or identify_time + choose_time < result.identify_time + result.choose_time:
+                result.identify_time = identify_time
+                result.choose_time = choose_time
+                result.rules = {rule: total for (rule, (_, total)) in trace.rule_totals().items()}
+            result.identified = [m.short_name() for m in identified]
+            result.chosen = [m.short_name() for m in chosen]
+    except Exception:
+        result.error = traceback.format_exc(limit=3)
+    return result
+
+
+def run_suite(
+    cases: Sequence[BenchmarkCase],
+    repeat: int = 1,
+    max_seconds: Optional[float] = None,
+    progress: Optional[Callable[[BenchmarkResult], None]] = None,
+) -> List[BenchmarkResult]:
+    """Run all 'cases' in order
+
+    If 'max_seconds' is given, once a case of a curve takes longer than it
+    (or fails), the larger cases of the same curve are skipped, since that is
+    where the identification stopped scaling.
+    """
+    results = []
+    stopped = set()
+    for case in cases:
+        if case.curve and case.curve in stopped:
+            continue
+        result = run_case(case, repeat)
+        results.append(result)
+        if progress:
+            progress(result)
+        if case.curve and (
+            result.error or (max_seconds is not None and result.identify_time + result.choose_time > max_seconds)
+        ):
+            stopped.add(case.curve)
+    return results
+
+
+def scaling_curves(results: Sequence[BenchmarkResult]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group the results by curve, with the sizes and times of every point."""
+    curves: Dict[str, List[Dict[str, Any]]] = dict()
+    for r in results:
+        if r.curve:
+            curves.setdefault(r.curve, []).append(
+                {
+                    "size": r.size,
+                    "vertexes": r.vertexes,
+                    "edges": r.edges,
+                    "identify_time": r.identify_time,
+                    "choose_time": r.choose_time,
+                    "error": r.error is not None,
+                }
+            )
+    return curves
+
+
+def write_results(results: Sequence[BenchmarkResult], path: str) -> None:
+    """Write the results and their scaling curves to 'path', which can later be used as a baseline."""
+    with open(path, "w") as f:
+        json.dump(
+            {"results": [asdict(r) for r in results], "curves": scaling_curves(results)}, f, indent=2
+        )
+
+
+def load_baseline(path: str) -> Dict[str, BenchmarkResult]:
+    """Load results written by 'write_results', keyed by case name."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    return {r["name"]: BenchmarkResult(**r) for r in data["results"]}
+
+
+def find_regressions(
+    results: Sequence[BenchmarkResult],
+    baseline: Dict[str, BenchmarkResult],
+    tolerance: float = 0.25,
+    min_seconds: float = 0.05,
+) -> List[str]:
+    """Compare 'results' against a 'baseline'
+
+    A case regresses if it now fails while it did not before, if it identifies
+    or chooses different decision models, or if it became slower than the
+    baseline by more than 'tolerance' (relative). Cases taking less than
+    'min_seconds' in both runs are not compared in time, as they are mostly noise.
+
+    Returns:
+        A description of every regression found.
+    """
+    regressions = []
+    for r in results:
+        base = baseline.get(r.name, None)
+        if base is None:
+            continue
+        if r.error and not base.error:
+            regressions.append(f"{r.name}: fails now, but did not in the baseline")
+            continue
+        if sorted(r.identified) != sorted(base.identified) or sorted(r.chosen) != sorted(base.chosen):
+            regressions.append(
+                f"{r.name}: identifies {sorted(r.identified)} and chooses {sorted(r.chosen)}, "
+                f"but the baseline identifies {sorted(base.identified)} and chooses {sorted(base.chosen)}"
+            )
+        (now, before) = (r.identify_time + r.choose_time, base.identify_time + base.choose_time)
+        if max(now, before) >= min_seconds and now > before * (1.0 + tolerance):
+            regressions.append(f"{r.name}: took {now:.3f}s against {before:.3f}s in the baseline")
+    return regressions
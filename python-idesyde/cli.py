@@ -9,6 +9,9 @@ import networkx as nx
 from idesyde import LOGGER_NAME
 from idesyde.identification.api import identify_decision_models
 from idesyde.identification.api import choose_decision_models
+from idesyde.identification.cache import IdentificationCache
+from idesyde.identification.cache import identify_decision_models_cached
+from idesyde.identification.tracing import IdentificationTrace
 from idesyde.exploration import choose_explorer
 from idesyde.exploration import MinizincExplorer
 
@@ -52,6 +55,8 @@ def cli_entry():
                         action='append',
                         help='''
                         Filter decision model to match these short names.
+                        Only the identification rules that can lead to
+                        them are run.
                         ''')
     parser.add_argument('--mzn-solver',
                         type=str,
@@ -60,6 +65,40 @@ def cli_entry():
                         Minizinc solver to be used for decision models
                         that are solved by them.
                         ''')
+    parser.add_argument('--cache',
+                        action='store_true',
+                        help='''
+                        Cache the identified decision models on disk,
+                        so that identification is skipped when the same
+                        model is given again. The cache holds pickles,
+                        so only use a directory that no one else can write.
+                        ''')
+    parser.add_argument('--cache-dir',
+                        type=str,
+                        default=None,
+                        help='''
+                        Directory of the identification cache, which
+                        implies --cache. Defaults to IDESYDE_CACHE_DIR,
+                        if set, or the user cache directory.
+                        ''')
+    parser.add_argument('--trace-identification',
+                        type=str,
+                        default=None,
+                        metavar='PATH',
+                        help='''
+                        Record the time taken by every identification rule
+                        call and iteration and write it to PATH. The
+                        identification cache is not used when tracing.
+                        ''')
+    parser.add_argument('--trace-format',
+                        type=str,
+                        choices=['json', 'chrome'],
+                        default='json',
+                        help='''
+                        Format of the identification trace: plain json
+                        (default) or chrome trace events, which can be
+                        opened in chrome://tracing or Perfetto.
+                        ''')
     args = parser.parse_args()
     # logging.basicConfig(format='[{name:<10} | {levelname:<8} | {asctime}] {message}',
     #                     style='{',
@@ -75,10 +114,22 @@ def cli_entry():
     in_model = forsyde_io.load_model(args.model)
     logger.info('Model parsed')
     logger.debug('IDeSyDe API created')
-    identified = identify_decision_models(in_model)
+    desired_names = [i for i in args.decision_model] if args.decision_model else []
+    if args.trace_identification:
+        trace = IdentificationTrace()
+        identified = identify_decision_models(in_model, trace=trace, targets=desired_names)
+        trace.write(args.trace_identification, args.trace_format)
+        for (rule, (calls, total)) in trace.rule_totals().items():
+            logger.debug(f'Rule {rule}: {calls} call(s), {total:.3f}s')
+        logger.info(f'Identification trace written to {args.trace_identification}')
+    elif args.cache or args.cache_dir:
+        identified = identify_decision_models_cached(in_model,
+                                                     cache=IdentificationCache(args.cache_dir),
+                                                     targets=desired_names)
+    else:
+        identified = identify_decision_models(in_model, targets=desired_names)
     logger.info(f'{len(identified)} Decision model(s) identified')
     logger.debug(f"Decision models identified: {identified}")
-    desired_names = [i for i in args.decision_model] if args.decision_model else []
     models_chosen = choose_decision_models(identified, desired_names=desired_names)
     logger.info(f'{len(models_chosen)} Decision model(s) chosen')
     explorer_and_models = choose_explorer(models_chosen)
@@ -1,23 +1,41 @@
-import concurrent.futures
 import os
+import asyncio
 import importlib
+import threading
+import time
+from concurrent.futures import Executor
 import itertools
 from enum import Flag
 from enum import auto
 from typing import List
-from typing import Callable
 from typing import Tuple
 from typing import Optional
+from typing import Dict
+from typing import Iterable
+from typing import Type
+from typing import Any
+from typing import Set
+from typing import Iterator
+from typing import AsyncIterator
+
+import networkx as nx  # type: ignore
 
 # import idesyde.identification.rules as ident_rules
 from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Vertex
 from idesyde.identification.interfaces import DecisionModel
+from idesyde.identification.interfaces import IdentifiedModels
+from idesyde.identification.parallel import IdentificationWorkerPool
+from idesyde.identification.queries import invalidate_model_queries
+from idesyde.identification.scheduling import IdentificationRuleType
+from idesyde.identification.scheduling import RuleScheduler
+from idesyde.identification.tracing import IdentificationTrace
 
 # from idesyde.identification.interfaces import IdentificationRule
 
-IdentificationRuleType = Callable[[ForSyDeModel, List[DecisionModel]], Tuple[bool, Optional[DecisionModel]]]
-
 _registered_rules: List[IdentificationRuleType] = list()
+_rule_consumes: Dict[IdentificationRuleType, Tuple[Type[DecisionModel], ...]] = dict()
+_rule_produces: Dict[IdentificationRuleType, Tuple[Type[DecisionModel], ...]] = dict()
 
 
 class ChoiceCriteria(Flag):
@@ -40,20 +58,95 @@ def _get_registered_rules(include_internal: bool = True) -> List[IdentificationR
     return _registered_rules  # if _registered_rules else list(r_class() for r_class in ident_rules._standard_rules_classes)
 
 
-def register_identification_rule(func: IdentificationRuleType):
+def register_identification_rule(
+    func: Optional[IdentificationRuleType] = None,
+    consumes: Optional[Iterable[Type[DecisionModel]]] = None,
+    produces: Optional[Iterable[Type[DecisionModel]]] = None,
+):
     """Decorator to register a rule to be used in the identification procedure
 
+    It can be used either directly, as in '@register_identification_rule', or with
+    arguments, as in '@register_identification_rule(consumes=[SDFExecution])'.
+
     Arguments:
         func: must be a function of signature [ForSyDeModel, List[DecisionModel]] -> (bool, Optional[DecisionModel]).
             The first boolean indicates a fixpoint for the rule and the second result is the partially identified
             Decision model, if any.
+        consumes: the DecisionModel types that the rule looks for in the identified models. The rule is
+            only called again when new decision models of these types are identified. An empty collection
+            means that the rule depends solely on the design model. If not given, the rule is assumed to
+            depend on every type of decision model.
+        produces: the DecisionModel types that the rule can return. It is used to know which rules
+            must be run again when decision models are invalidated by a change in the design model.
+            If not given, the rule is assumed to produce every type of decision model.
+    """
+
+    def register(rule: IdentificationRuleType) -> IdentificationRuleType:
+        _registered_rules.append(rule)
+        if consumes is not None:
+            _rule_consumes[rule] = tuple(consumes)
+        if produces is not None:
+            _rule_produces[rule] = tuple(produces)
+        return rule
+
+    if func:
+        return register(func)
+    return register
+
+
+def _decision_model_types(names: Iterable[str]) -> List[Type[DecisionModel]]:
+    # every DecisionModel class currently defined whose short name is in 'names'
+    found: List[Type[DecisionModel]] = []
+    visit: List[Type[DecisionModel]] = [DecisionModel]
+    while visit:
+        cls = visit.pop()
+        if cls.__name__ in names and cls not in found:
+            found.append(cls)
+        visit.extend(cls.__subclasses__())
+    return found
+
+
+def _may_produce(produces: Iterable[Type[DecisionModel]], wanted: Iterable[Type[DecisionModel]]) -> bool:
+    # a rule declaring a general type may return any of its subtypes and vice-versa
+    return any(issubclass(p, w) or issubclass(w, p) for p in produces for w in wanted)
+
+
+def rules_for_targets(
+    rules: List[IdentificationRuleType], targets: Iterable[str]
+) -> Tuple[List[IdentificationRuleType], List[IdentificationRuleType]]:
+    """Find the rules that can lead to the decision models with short names in 'targets'
+
+    Starting from the rules producing the targets, the rules producing what
+    they consume are added until nothing changes, as declared in
+    'register_identification_rule'. Rules that do not declare what they produce
+    or consume are assumed to produce or consume every type of decision model.
+
+    Returns:
+        The rules that can lead to the targets and, among them, the rules that
+        produce the targets directly, both in the same order as in 'rules'.
     """
-    _registered_rules.append(func)
-    return func
+    target_types = _decision_model_types(targets)
+    goals = [r for r in rules if _may_produce(_rule_produces.get(r, (DecisionModel,)), target_types)]
+    relevant = set(goals)
+    wanted: List[Type[DecisionModel]] = []
+    for r in goals:
+        wanted.extend(_rule_consumes.get(r, (DecisionModel,)))
+    changed = True
+    while changed:
+        changed = False
+        for r in rules:
+            if r not in relevant and _may_produce(_rule_produces.get(r, (DecisionModel,)), wanted):
+                relevant.add(r)
+                wanted.extend(_rule_consumes.get(r, (DecisionModel,)))
+                changed = True
+    return ([r for r in rules if r in relevant], goals)
 
 
 def identify_decision_models(
-    model: ForSyDeModel, rules: List[IdentificationRuleType] = _get_registered_rules()
+    model: ForSyDeModel,
+    rules: List[IdentificationRuleType] = _get_registered_rules(),
+    trace: Optional[IdentificationTrace] = None,
+    targets: Optional[Iterable[str]] = None,
 ) -> List[DecisionModel]:
     """
     This function runs the Design Space Identification scheme,
@@ -63,28 +156,234 @@ def identify_decision_models(
     If the argument **problems** is not passed,
     the API uses all subclasses found during runtime that implement
     the interfaces DecisionModel and Explorer.
+
+    If a 'trace' is given, every rule call and every iteration is recorded in it.
+
+    If 'targets' is given, only the rules that can lead to decision models with
+    these short names are run (see 'rules_for_targets'), and the identification
+    stops as soon as the rules producing them reach their fixpoint.
     """
+    goals = None
+    if targets:
+        (rules, goals) = rules_for_targets(rules, targets)
+    return _run_identification(model, rules, RuleScheduler(rules, _rule_consumes), IdentifiedModels(), trace, goals)
+
+
+def identify_decision_models_stream(
+    model: ForSyDeModel,
+    rules: List[IdentificationRuleType] = _get_registered_rules(),
+    trace: Optional[IdentificationTrace] = None,
+    targets: Optional[Iterable[str]] = None,
+) -> Iterator[Tuple[DecisionModel, bool]]:
+    """Streaming version of 'identify_decision_models'
+
+    Instead of returning all decision models at the end, every decision model
+    is yielded as soon as a rule identifies it, so that consumers can already
+    work on it while the identification goes on. This mirrors the 'Identify'
+    stream of the IdentificationService.
+
+    Yields:
+        Tuples of the identified decision model and whether the rule that
+        identified it reached its fixpoint.
+    """
+    goals = None
+    if targets:
+        (rules, goals) = rules_for_targets(rules, targets)
+    yield from _iter_identification(
+        model, rules, RuleScheduler(rules, _rule_consumes), IdentifiedModels(), trace, goals
+    )
+
+
+def _run_identification(
+    model: ForSyDeModel,
+    rules: List[IdentificationRuleType],
+    scheduler: RuleScheduler,
+    identified: IdentifiedModels,
+    trace: Optional[IdentificationTrace] = None,
+    goals: Optional[List[IdentificationRuleType]] = None,
+) -> List[DecisionModel]:
+    for _ in _iter_identification(model, rules, scheduler, identified, trace, goals):
+        pass
+    return identified
+
+
+def _iter_identification(
+    model: ForSyDeModel,
+    rules: List[IdentificationRuleType],
+    scheduler: RuleScheduler,
+    identified: IdentifiedModels,
+    trace: Optional[IdentificationTrace] = None,
+    goals: Optional[List[IdentificationRuleType]] = None,
+) -> Iterator[Tuple[DecisionModel, bool]]:
     max_iterations = len(model) * len(rules)
-    allowed_rules = [rule for rule in rules]
-    identified: List[DecisionModel] = []
     iterations = 0
-    while len(allowed_rules) > 0 and iterations < max_iterations:
-        trials = ((rule, rule(model, identified)) for rule in allowed_rules)
-        for (rule, (fixed, subprob)) in trials:
-            # join with the identified
-            if subprob:
-                identified.append(subprob)
-            # take away candidates at fixpoint
-            if fixed:
-                allowed_rules.remove(rule)
+    called = True
+
+    def reached() -> bool:
+        # with goals, nothing else is needed once all of them reach their fixpoint
+        return goals is not None and not any(scheduler.is_pending(g) for g in goals)
+
+    while called and scheduler.has_pending() and iterations < max_iterations and not reached():
+        called = False
+        iteration_start = trace.now() if trace else 0.0
+        for rule in scheduler.pending_rules():
+            if reached():
+                break
+            # the check is done right before the call so that models identified
+            # earlier in this same iteration can already wake up the rule
+            if scheduler.is_due(rule, identified):
+                seen = len(identified)
+                start = trace.now() if trace else 0.0
+                (fixed, subprob) = rule(model, identified)
+                # models that are already identified are not identified again,
+                # so that they do not wake up the rules consuming them
+                if subprob and subprob in identified:
+                    subprob = None
+                if trace:
+                    trace.record_rule(rule, iterations, start, trace.now(), fixed, subprob)
+                scheduler.notify(rule, seen, fixed, subprob)
+                # join with the identified
+                if subprob:
+                    identified.append(subprob)
+                    yield (subprob, fixed)
+                called = True
+        if trace:
+            trace.record_iteration(iterations, iteration_start, trace.now(), len(identified))
         iterations += 1
-    return identified
+
+
+def reidentify_decision_models(
+    model: ForSyDeModel,
+    previous: List[DecisionModel],
+    added_vertexes: Iterable[Vertex] = [],
+    removed_vertexes: Iterable[Vertex] = [],
+    added_edges: Iterable[Tuple[Vertex, Vertex]] = [],
+    removed_edges: Iterable[Tuple[Vertex, Vertex]] = [],
+    rules: List[IdentificationRuleType] = _get_registered_rules(),
+    trace: Optional[IdentificationTrace] = None,
+) -> List[DecisionModel]:
+    """Update a previous identification after a change in the design model
+
+    Instead of running the whole identification from scratch, only the decision
+    models that cover a vertex or an edge touched by the change are invalidated,
+    and only the rules that can be affected by it are run again:
+
+        1. rules that produce or consume an invalidated type of decision model,
+        2. rules that depend solely on the design model, if anything changed,
+        3. rules that produce a type of decision model of which nothing was kept.
+
+    The remaining rules are only called again if new decision models that they
+    consume are identified.
+
+    The rules that depend solely on the design model are called before anything is
+    invalidated. If such a rule identifies the very decision model that it identified
+    before, that model is kept even if it covers the change; otherwise, every kept
+    decision model of the types it produces is replaced. In both cases, whatever is
+    built on an invalidated type of decision model is invalidated as well, so that
+    the result is the same as the one of a full identification.
+
+    Vertexes changed in place, e.g. with a new WCET, should
+    be given as added vertexes. The vertexes touched by the change are the added and
+    removed ones, the neighbours of the added ones and the endpoints of the added and
+    removed edges.
+
+    The decision models that are kept are still valid partial identifications of the
+    changed model, but they might be subsumed by newly identified ones. As in a full
+    identification, 'choose_decision_models' should be used to filter the result.
+
+    Arguments:
+        model: the design model, already changed.
+        previous: the result of the previous identification of the design model.
+        added_vertexes: vertexes that were added to the model, or changed in place.
+        removed_vertexes: vertexes that were removed from the model.
+        added_edges: (source, target) pairs of the edges added to the model.
+        removed_edges: (source, target) pairs of the edges removed from the model.
+        rules: the same rules that were used in the previous identification.
+        trace: if given, every rule call and every iteration is recorded in it.
+
+    Returns:
+        The updated list of identified decision models.
+    """
+    added_vertexes = list(added_vertexes)
+    touched: Set[str] = set(v.identifier for v in itertools.chain(added_vertexes, removed_vertexes))
+    for v in added_vertexes:
+        if v in model:
+            touched.update(n.identifier for n in model.predecessors(v))
+            touched.update(n.identifier for n in model.successors(v))
+    for (s, t) in itertools.chain(added_edges, removed_edges):
+        touched.add(s.identifier)
+        touched.add(t.identifier)
+    # the indexes and paths of the model are not valid anymore
+    invalidate_model_queries(model)
+    # the rules that depend solely on the design model are called first. A decision model
+    # that they identify again is still valid, and all others of the types they produce are not
+    invalidated: Set[Type[DecisionModel]] = set()
+    reproduced = IdentifiedModels()
+    design_calls = []
+    if len(touched) > 0:
+        for rule in rules:
+            if len(_rule_consumes.get(rule, (DecisionModel,))) == 0:
+                produces = _rule_produces.get(rule, (DecisionModel,))
+                start = trace.now() if trace else 0.0
+                (fixed, subprob) = rule(model, IdentifiedModels())
+                design_calls.append((rule, fixed, subprob, start, trace.now() if trace else 0.0))
+                same_type = IdentifiedModels(m for m in previous if _may_produce([type(m)], produces))
+                if fixed and subprob is not None and len(same_type) == 1 and subprob in same_type:
+                    reproduced.append(subprob)
+                else:
+                    invalidated.update(produces)
+    untouched = IdentifiedModels()
+    for m in previous:
+        if m in reproduced:
+            untouched.append(m)
+        elif any(v.identifier in touched for v in m.covered_vertexes()) or any(
+            e.source.identifier in touched or e.target.identifier in touched for e in m.covered_edges()
+        ):
+            invalidated.add(type(m))
+        else:
+            untouched.append(m)
+    # whatever is built on invalidated decision models is invalidated as well
+    changed = True
+    while changed:
+        changed = False
+        for rule in rules:
+            produces = _rule_produces.get(rule, (DecisionModel,))
+            if _may_produce(_rule_consumes.get(rule, (DecisionModel,)), invalidated) and not all(
+                any(issubclass(p, t) for t in invalidated) for p in produces
+            ):
+                invalidated.update(produces)
+                changed = True
+    kept = IdentifiedModels(m for m in untouched if not _may_produce([type(m)], invalidated))
+    kept_types = set(type(m) for m in kept)
+    scheduler = RuleScheduler(rules, _rule_consumes)
+    for rule in rules:
+        consumes = _rule_consumes.get(rule, (DecisionModel,))
+        produces = _rule_produces.get(rule, (DecisionModel,))
+        affected = (
+            _may_produce(consumes + produces, invalidated)
+            or (len(touched) > 0 and len(consumes) == 0)
+            or any(not any(issubclass(t, p) for t in kept_types) for p in produces)
+        )
+        if not affected:
+            scheduler.mark_seen(rule, len(kept))
+    for (rule, fixed, subprob, start, end) in design_calls:
+        # the same as if they had been called in the first iteration
+        if subprob and subprob in kept:
+            subprob = None
+        if trace:
+            trace.record_rule(rule, 0, start, end, fixed, subprob)
+        scheduler.notify(rule, len(kept), fixed, subprob)
+        if subprob:
+            kept.append(subprob)
+    return _run_identification(model, rules, scheduler, kept, trace)
 
 
 def identify_decision_models_parallel(
     model: ForSyDeModel,
     rules: List[IdentificationRuleType] = _get_registered_rules(),
     concurrent_idents: int = os.cpu_count() or 1,
+    parallel_threshold: int = 5000,
+    trace: Optional[IdentificationTrace] = None,
 ) -> List[DecisionModel]:
     """
     This function runs the Design Space Identification scheme,
@@ -93,32 +392,140 @@ def identify_decision_models_parallel(
     uses parallelism to run as many identifications as possible
     simultaneously.
 
+    The worker processes are started only once and receive the model
+    only once, when they start. Afterwards, only the decision models
+    identified in each iteration are sent to them. If the model has
+    fewer than 'parallel_threshold' vertexes, or there is no concurrency
+    available, the sequential version is used instead, since starting
+    the workers would then cost more than what they save.
+
+    The rules due at the start of every iteration run at once, and their results are
+    joined in order. A rule that consumes a decision model identified earlier in the
+    same iteration is called again with it, so that the result is the same as the one
+    of 'identify_decision_models'.
+
+    If a 'trace' is given, every rule call and every iteration is recorded in it,
+    with the rule calls attributed to the workers that made them.
+
     If the argument **problems** is not passed,
     the API uses all subclasses found during runtime that implement
     the interfaces DecisionModel and Explorer.
     """
+    workers = min(concurrent_idents, len(rules))
+    if workers <= 1 or len(model) < parallel_threshold:
+        return identify_decision_models(model, rules, trace)
     max_iterations = len(model) * len(rules)
-    allowed_rules = [rule for rule in rules]
-    identified: List[DecisionModel] = []
+    scheduler = RuleScheduler(rules, _rule_consumes)
+    rule_indexes = {rule: i for (i, rule) in enumerate(rules)}
+    identified = IdentifiedModels()
     iterations = 0
-    with concurrent.futures.ProcessPoolExecutor(max_workers=concurrent_idents) as executor:
-        while len(allowed_rules) > 0 and iterations < max_iterations:
-            # generate all trials and keep track of which subproblem
-            # made the trial
-            futures = {rule: executor.submit(rule, model, identified) for rule in allowed_rules}
-            concurrent.futures.wait(futures.values())
-            for rule in futures:
-                (fixed, subprob) = futures[rule].result()
-                # join with the identified
-                if subprob:
-                    identified.append(subprob)
-                # take away candidates at fixpoint
-                if fixed:
-                    allowed_rules.remove(rule)
+    called = True
+    with IdentificationWorkerPool(model, rules, workers) as pool:
+        while called and scheduler.has_pending() and iterations < max_iterations:
+            iteration_start = trace.now() if trace else 0.0
+            # the rules due at the start of the iteration are all run at once with the same
+            # identified models, and then joined in order as in the sequential version
+            seen = len(identified)
+            due_rules = scheduler.due_rules(identified)
+            results = pool.run([rule_indexes[rule] for rule in due_rules], identified)
+            speculated = {rule: (res, timing) for (rule, res, timing) in zip(due_rules, results, pool.last_timings)}
+            called = _join_in_order(pool, scheduler, identified, rule_indexes, speculated, seen, iterations, trace)
+            if trace:
+                trace.record_iteration(iterations, iteration_start, trace.now(), len(identified))
             iterations += 1
         return identified
 
 
+def _join_in_order(
+    pool: IdentificationWorkerPool,
+    scheduler: RuleScheduler,
+    identified: IdentifiedModels,
+    rule_indexes: Dict[IdentificationRuleType, int],
+    speculated: Dict[IdentificationRuleType, Tuple[Tuple[bool, Optional[DecisionModel]], Tuple[int, float, float]]],
+    seen: int,
+    iteration: int,
+    trace: Optional[IdentificationTrace],
+) -> bool:
+    # joins the results of rules that were called with the first 'seen' identified models.
+    # A rule that consumes something identified earlier in the iteration is called again, since
+    # in the sequential version it would see it, and the rules woken up in the iteration are called too.
+    called = False
+    for rule in scheduler.pending_rules():
+        if not scheduler.is_due(rule, identified):
+            continue
+        before = len(identified)
+        if rule in speculated and not scheduler.consumes_any(rule, identified[seen:]):
+            ((fixed, subprob), (worker, start, end)) = speculated[rule]
+        else:
+            (fixed, subprob) = pool.run([rule_indexes[rule]], identified)[0]
+            (worker, start, end) = pool.last_timings[0]
+        if subprob and subprob in identified:
+            subprob = None
+        if trace:
+            trace.record_rule(rule, iteration, start, end, fixed, subprob, worker)
+        scheduler.notify(rule, before, fixed, subprob)
+        # join with the identified
+        if subprob:
+            identified.append(subprob)
+        called = True
+    return called
+
+
+def _join_iteration(
+    scheduler: RuleScheduler,
+    identified: IdentifiedModels,
+    due_rules: List[IdentificationRuleType],
+    results: List[Tuple[bool, Optional[DecisionModel]]],
+    timings: List[Tuple[int, float, float]],
+    seen: int,
+    iteration: int,
+    trace: Optional[IdentificationTrace],
+) -> None:
+    # joins the results of rules that were all called with the same identified models
+    for (rule, (fixed, subprob), (worker, start, end)) in zip(due_rules, results, timings):
+        if subprob and subprob in identified:
+            subprob = None
+        if trace:
+            trace.record_rule(rule, iteration, start, end, fixed, subprob, worker)
+        scheduler.notify(rule, seen, fixed, subprob)
+        # join with the identified
+        if subprob:
+            identified.append(subprob)
+
+
+def _dominance_graph(models: List[DecisionModel]) -> nx.DiGraph:
+    # every covered vertex and edge of all models is interned to one bit,
+    # so that the covering of each model is a single integer and checking if
+    # it is contained in another model's covering is a single operation
+    bits: Dict[Any, int] = dict()
+    masks: List[int] = []
+    for m in models:
+        mask = 0
+        for key in itertools.chain(m.covered_vertexes_index().keys(), m.covered_edges_index().keys()):
+            if key not in bits:
+                bits[key] = 1 << len(bits)
+            mask |= bits[key]
+        masks.append(mask)
+    dominance = nx.DiGraph()
+    dominance.add_nodes_from(range(len(models)))
+    for (i, m) in enumerate(models):
+        # models that replace 'dominates' altogether must be asked directly,
+        # the others only refine it with 'dominates_beyond_covering'
+        overridden = type(m).dominates is not DecisionModel.dominates
+        for (j, other) in enumerate(models):
+            if i == j:
+                continue
+            if overridden:
+                dominates = m.dominates(other)
+            else:
+                # vertexes with the same identifier are the same vertex of
+                # the design model, so the refinement check is not needed
+                dominates = masks[j] & ~masks[i] == 0 and m.dominates_beyond_covering(other)
+            if dominates:
+                dominance.add_edge(i, j)
+    return dominance
+
+
 def choose_decision_models(
     models: List[DecisionModel], criteria: ChoiceCriteria = ChoiceCriteria.DOMINANCE, desired_names: List[str] = []
 ) -> List[DecisionModel]:
@@ -139,44 +546,194 @@ def choose_decision_models(
     if desired_names:
         models = [m for m in models if m.short_name() in desired_names]
     if criteria & ChoiceCriteria.DOMINANCE:
-        # build up a "dominance graph" and retain
-        # only the subset of model that dominates all others,
-        # including themselves
-        model_enum = list(enumerate(models))
-        dominance = {i: {j: m.dominates(other) for (j, other) in model_enum} for (i, m) in model_enum}
-        # it's like the floyd warshall algorithm
-        for (m, s, t) in itertools.product(range(len(models)), repeat=3):
-            if dominance[s][m] and dominance[m][t]:
-                dominance[s][t] = True
-        # retain only those models that either are not dominated or dominate
-        # those that dominate them as well, i.e. cyclic dominance or no order possible.
-        models = [
-            m
-            for (i, m) in model_enum
-            if all(dominance[i][j] for (j, other) in model_enum if i != j and dominance[j][i])
-        ]
-    unique_models: List[DecisionModel] = []
+        # build up a "dominance graph" and retain only the models
+        # that are not dominated by any model they do not dominate as well,
+        # i.e. cyclic dominance or no order possible.
+        dominance = _dominance_graph(models)
+        # these are exactly the members of the strongly connected
+        # components that no other component can reach
+        condensed = nx.condensation(dominance)
+        retained = set(
+            i for c in condensed.nodes if condensed.in_degree(c) == 0 for i in condensed.nodes[c]["members"]
+        )
+        models = [m for (i, m) in enumerate(models) if i in retained]
+    unique_models = IdentifiedModels()
     for m in models:
-        if not any(o == m for o in unique_models):
-            unique_models.append(m)
+        unique_models.add(m)
     return unique_models
 
 
+def _timed_call(
+    rule: IdentificationRuleType, model: ForSyDeModel, identified: List[DecisionModel], stop: threading.Event
+) -> Tuple[Tuple[bool, Optional[DecisionModel]], Tuple[int, float, float]]:
+    start = time.time()
+    # calls that only start after the identification gave up are not made at all
+    res = rule(model, identified) if not stop.is_set() else (False, None)
+    return (res, (0, start, time.time()))
+
+
+async def _wait_within_budget(calls: List["asyncio.Future[Any]"], deadline: Optional[float]) -> bool:
+    # waits for all calls, cancelling them if the deadline is reached or if the
+    # caller is cancelled, and tells if they all finished
+    timeout = max(0.0, deadline - asyncio.get_event_loop().time()) if deadline is not None else None
+    try:
+        (_, pending) = await asyncio.wait(calls, timeout=timeout)
+    except asyncio.CancelledError:
+        for c in calls:
+            c.cancel()
+        raise
+    for c in pending:
+        c.cancel()
+    return len(pending) == 0
+
+
 async def identify_decision_models_async(
-    model: ForSyDeModel, rules: List[IdentificationRuleType] = _get_registered_rules()
+    model: ForSyDeModel,
+    rules: List[IdentificationRuleType] = _get_registered_rules(),
+    timeout: Optional[float] = None,
+    executor: Optional[Executor] = None,
+    trace: Optional[IdentificationTrace] = None,
 ) -> List[DecisionModel]:
     """
-    AsyncIO version of the same function. Wraps the non-async version.
+    AsyncIO version of the same function. The rules that are due in an
+    iteration are all run concurrently in 'executor', or in the default
+    executor of the event loop if none is given, and awaited without blocking
+    the event loop. All the rules of an iteration see the same identified models.
+
+    If a 'timeout' in seconds is given and the identification takes longer than it,
+    the decision models identified until then are returned. Cancelling the
+    coroutine cancels the identification. In both cases, the rules that have not
+    started yet are not called, but rules cannot be interrupted, so the ones that
+    are already running in the executor still run until they finish, and their
+    results are discarded. They are given a copy of the identified models, so they
+    never see the returned list, and the only state they share with other calls are
+    the queries of 'model' (see 'get_model_queries'), which are thread safe.
     """
-    return identify_decision_models(model, rules)
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    max_iterations = len(model) * len(rules)
+    scheduler = RuleScheduler(rules, _rule_consumes)
+    identified = IdentifiedModels()
+    iterations = 0
+    stop = threading.Event()
+    try:
+        due_rules = scheduler.due_rules(identified)
+        while len(due_rules) > 0 and iterations < max_iterations:
+            seen = len(identified)
+            iteration_start = trace.now() if trace else 0.0
+            snapshot = IdentifiedModels(identified)
+            calls = [
+                loop.run_in_executor(executor, _timed_call, rule, model, snapshot, stop) for rule in due_rules
+            ]
+            if not await _wait_within_budget(calls, deadline):
+                break
+            outcomes = [c.result() for c in calls]
+            results = [res for (res, _) in outcomes]
+            timings = [timing for (_, timing) in outcomes]
+            _join_iteration(scheduler, identified, due_rules, results, timings, seen, iterations, trace)
+            if trace:
+                trace.record_iteration(iterations, iteration_start, trace.now(), len(identified))
+            iterations += 1
+            due_rules = scheduler.due_rules(identified)
+    finally:
+        stop.set()
+    return identified
 
 
 async def identify_decision_models_parallel_async(
     model: ForSyDeModel,
     rules: List[IdentificationRuleType] = _get_registered_rules(),
     concurrent_idents: int = os.cpu_count() or 1,
+    parallel_threshold: int = 5000,
+    timeout: Optional[float] = None,
+    trace: Optional[IdentificationTrace] = None,
 ) -> List[DecisionModel]:
     """
-    AsyncIO version of the same function. Wraps the non-async version.
+    AsyncIO version of the same function. The worker processes are driven
+    from the default executor of the event loop, so that the event loop is not
+    blocked while they work. Small models are identified by
+    'identify_decision_models_async' instead, as in the non-async version.
+
+    The 'timeout' works as in 'identify_decision_models_async'. On timeout or
+    cancellation, the worker processes are terminated right away.
     """
-    return identify_decision_models_parallel(model, rules, concurrent_idents)
+    workers = min(concurrent_idents, len(rules))
+    if workers <= 1 or len(model) < parallel_threshold:
+        return await identify_decision_models_async(model, rules, timeout=timeout, trace=trace)
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    max_iterations = len(model) * len(rules)
+    scheduler = RuleScheduler(rules, _rule_consumes)
+    rule_indexes = {rule: i for (i, rule) in enumerate(rules)}
+    identified = IdentifiedModels()
+    iterations = 0
+    pool = await loop.run_in_executor(None, IdentificationWorkerPool, model, rules, workers)
+    finished = False
+    try:
+        due_rules = scheduler.due_rules(identified)
+        while len(due_rules) > 0 and iterations < max_iterations:
+            seen = len(identified)
+            iteration_start = trace.now() if trace else 0.0
+            call = loop.run_in_executor(None, pool.run, [rule_indexes[rule] for rule in due_rules], identified)
+            if not await _wait_within_budget([call], deadline):
+                break
+            results = call.result()
+            _join_iteration(scheduler, identified, due_rules, results, pool.last_timings, seen, iterations, trace)
+            if trace:
+                trace.record_iteration(iterations, iteration_start, trace.now(), len(identified))
+            iterations += 1
+            due_rules = scheduler.due_rules(identified)
+        finished = len(due_rules) == 0 or iterations >= max_iterations
+    finally:
+        # workers that may still be running cannot be asked to stop politely
+        if finished:
+            await loop.run_in_executor(None, pool.close)
+        else:
+            pool.terminate()
+    return identified
+
+
+async def identify_decision_models_stream_async(
+    model: ForSyDeModel,
+    rules: List[IdentificationRuleType] = _get_registered_rules(),
+    trace: Optional[IdentificationTrace] = None,
+) -> AsyncIterator[Tuple[DecisionModel, bool]]:
+    """
+    AsyncIO version of 'identify_decision_models_stream'. The rules are run
+    in the default executor, so the event loop is free while they run.
+
+    If the consumer stops early, e.g. by cancelling or closing the iterator,
+    no other rule is called. A rule that is already running cannot be
+    interrupted, so the identification stops once it returns.
+    """
+    loop = asyncio.get_event_loop()
+    stream = identify_decision_models_stream(model, rules, trace)
+    done = object()
+    # only one thread at a time may advance or close the stream
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def advance() -> Any:
+        with lock:
+            if stop.is_set():
+                stream.close()
+                return done
+            res = next(stream, done)
+            if stop.is_set():
+                stream.close()
+            return res
+
+    try:
+        while True:
+            res = await loop.run_in_executor(None, advance)
+            if res is done:
+                break
+            yield res
+    finally:
+        stop.set()
+        # if a rule is running, the thread running it closes the stream instead
+        if lock.acquire(blocking=False):
+            try:
+                stream.close()
+            finally:
+                lock.release()
@@ -0,0 +1,275 @@
+import hashlib
+import importlib.util
+import inspect
+import io
+import json
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Vertex
+
+from idesyde import LOGGER_NAME
+from idesyde.identification.api import _get_registered_rules
+from idesyde.identification.api import identify_decision_models_stream
+from idesyde.identification.interfaces import DecisionModel
+from idesyde.identification.interfaces import IdentifiedModels
+from idesyde.identification.scheduling import IdentificationRuleType
+
+_logger = logging.getLogger(LOGGER_NAME)
+
+# bump whenever the layout of the cached entries changes
+_CACHE_FORMAT = 2
+
+# modules whose classes are pickled in the entries, or that compute their contents,
+# including the loop that decides which rules are called and in what order
+_MODEL_MODULES = (
+    "idesyde.identification.api",
+    "idesyde.identification.interfaces",
+    "idesyde.identification.models",
+    "idesyde.identification.queries",
+    "idesyde.identification.scheduling",
+    "idesyde.sdf",
+    "idesyde.sdf_throughput",
+    "idesyde.simulation",
+)
+
+
+def default_cache_dir() -> Path:
+    """Get the directory for the identification cache
+
+    It is 'IDESYDE_CACHE_DIR' if it is set, otherwise 'idesyde'
+    inside the user cache directory.
+    """
+    if "IDESYDE_CACHE_DIR" in os.environ:
+        return Path(os.environ["IDESYDE_CACHE_DIR"])
+    if "XDG_CACHE_HOME" in os.environ:
+        return Path(os.environ["XDG_CACHE_HOME"]) / "idesyde"
+    return Path.home() / ".cache" / "idesyde"
+
+
+def _trait_names(traits) -> List[str]:
+    return sorted(str(t) for t in traits)
+
+
+def _port_name(port) -> str:
+    return port.identifier if port is not None else ""
+
+
+def model_content_hash(model: ForSyDeModel) -> str:
+    """Hash the content of 'model', independently of the order it was built in
+
+    Every vertex contributes with its identifier, ports, traits and properties and
+    every edge with its endpoints, ports and traits. Two models that are loaded
+    from the same file, or from files with the same content, have the same hash.
+    """
+    h = hashlib.sha256()
+    vertexes = sorted(model.nodes, key=lambda v: v.identifier)
+    for v in vertexes:
+        entry = [
+            v.identifier,
+            sorted(p.identifier for p in v.ports),
+            _trait_names(v.vertex_traits),
+            v.properties,
+        ]
+        h.update(json.dumps(entry, sort_keys=True, default=str).encode("utf-8"))
+    edges = sorted(
+        [
+            s.identifier,
+            t.identifier,
+            _port_name(e.source_port) if e else "",
+            _port_name(e.target_port) if e else "",
+            _trait_names(e.edge_traits) if e else [],
+        ]
+        for (s, t, e) in model.edges(data="object")
+    )
+    for entry in edges:
+        h.update(json.dumps(entry, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def rules_hash(rules: Sequence[IdentificationRuleType]) -> str:
+    """Hash the rules by their names and their source code
+
+    Changing, adding or removing a rule changes the hash, so that decision
+    models identified by older versions of the rules are not reused.
+    """
+    h = hashlib.sha256()
+    for rule in rules:
+        h.update(f"{rule.__module__}.{rule.__qualname__}".encode("utf-8"))
+        try:
+            h.update(inspect.getsource(rule).encode("utf-8"))
+        except (OSError, TypeError):
+            h.update(getattr(getattr(rule, "__code__", None), "co_code", b""))
+    return h.hexdigest()
+
+
+def code_hash(rules: Sequence[IdentificationRuleType] = ()) -> str:
+    """Hash the source files of the decision model modules and of the modules of 'rules'
+
+    Decision models are pickled by reference to their classes, and the values they deduce
+    when built depend on the helpers they call. So any change in these modules, and not
+    only in the rules, makes the entries stored before it unusable.
+    """
+    h = hashlib.sha256()
+    names = sorted(set(_MODEL_MODULES) | {rule.__module__ for rule in rules})
+    for name in names:
+        h.update(name.encode("utf-8"))
+        try:
+            spec = importlib.util.find_spec(name)
+            with open(spec.origin, "rb") as f:
+                h.update(f.read())
+        except (ImportError, ValueError, AttributeError, OSError, TypeError):
+            pass
+    return h.hexdigest()
+
+
+class _ModelPickler(pickle.Pickler):
+    # vertexes are stored only by their identifiers so that
+    # they are taken back from the model when loading
+    def persistent_id(self, obj: Any) -> Optional[str]:
+        if isinstance(obj, Vertex):
+            return obj.identifier
+        return None
+
+
+class _ModelUnpickler(pickle.Unpickler):
+    def __init__(self, file, vertexes: Dict[str, Vertex]):
+        super().__init__(file)
+        self.vertexes = vertexes
+
+    def persistent_load(self, pid: str) -> Vertex:
+        try:
+            return self.vertexes[pid]
+        except KeyError:
+            raise pickle.UnpicklingError(f"Vertex {pid} does not exist in the model")
+
+
+class IdentificationCache(object):
+    """Persistent cache of identified decision models
+
+    The entries are keyed by the content hash of the design model, the
+    hash of the rules used to identify it and the hash of the code of the
+    decision models (see 'code_hash'). The vertexes referenced by
+    the cached decision models are not stored, but taken from the model
+    given when loading, so the decision models refer to the same
+    objects as the design model, as if they had just been identified.
+    Every decision model is stored with the fixpoint flag of the rule that
+    identified it, as in 'identify_decision_models_stream'.
+
+    The entries are pickles, and loading a pickle can run arbitrary code,
+    so the cache directory must only be writable by its owner. It is created
+    that way if it does not exist.
+    """
+
+    def __init__(self, cache_dir: Optional[Union[str, Path]] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        _logger.info(f"Identification cache in {self.cache_dir}")
+
+    def key(
+        self, model: ForSyDeModel, rules: Sequence[IdentificationRuleType], targets: Optional[Iterable[str]] = None
+    ) -> str:
+        code = f"{rules_hash(rules)[:16]}-{code_hash(rules)[:16]}"
+        key = f"{_CACHE_FORMAT}-{model_content_hash(model)[:32]}-{code}"
+        if targets:
+            # targeted identifications stop early, so they are kept apart from the complete ones
+            key += "-" + hashlib.sha1(json.dumps(sorted(set(targets))).encode("utf-8")).hexdigest()[:8]
+        return key
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pickle"
+
+    def load(
+        self, model: ForSyDeModel, rules: Sequence[IdentificationRuleType], targets: Optional[Iterable[str]] = None
+    ) -> Optional[List[DecisionModel]]:
+        """Get the decision models previously identified for 'model', 'rules' and 'targets', if any."""
+        stream = self.load_stream(model, rules, targets)
+        return IdentifiedModels(m for (m, _) in stream) if stream is not None else None
+
+    def load_stream(
+        self, model: ForSyDeModel, rules: Sequence[IdentificationRuleType], targets: Optional[Iterable[str]] = None
+    ) -> Optional[List[Tuple[DecisionModel, bool]]]:
+        """Same as 'load', but with the fixpoint flag stored with every decision model."""
+        path = self._path(self.key(model, rules, targets))
+        if not path.is_file():
+            return None
+        try:
+            with open(path, "rb") as f:
+                (identified, fixed) = _ModelUnpickler(f, {v.identifier: v for v in model.nodes}).load()
+            if len(fixed) != len(identified):
+                raise ValueError("the fixpoint flags do not match the decision models")
+            _logger.info(f"Identification cache hit: {path}")
+            return list(zip(identified, fixed))
+        except Exception as e:
+            # a corrupt or outdated entry is only a cache miss
+            _logger.warning(f"Ignoring identification cache entry {path}: {e}")
+            return None
+
+    def store(
+        self,
+        model: ForSyDeModel,
+        rules: Sequence[IdentificationRuleType],
+        identified: List[DecisionModel],
+        targets: Optional[Iterable[str]] = None,
+        fixed: Optional[Sequence[bool]] = None,
+    ) -> bool:
+        """Store the decision models identified for 'model', 'rules' and 'targets'
+
+        Arguments:
+            fixed: the fixpoint flag of every decision model in 'identified'. If not
+                given, they are all assumed to come from rules that reached their fixpoint.
+
+        Returns:
+            True if the decision models could be stored, False otherwise.
+        """
+        path = self._path(self.key(model, rules, targets))
+        fixed = list(fixed) if fixed is not None else [True for _ in identified]
+        try:
+            buffer = io.BytesIO()
+            _ModelPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump((list(identified), fixed))
+            self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # write and then move so that concurrent runs never read partial entries
+            (fd, tmp) = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp, path)
+            _logger.info(f"Identification cache entry written: {path}")
+            return True
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            _logger.warning(f"Could not store identification cache entry {path}: {e}")
+            return False
+
+
+def identify_decision_models_cached(
+    model: ForSyDeModel,
+    rules: Optional[List[IdentificationRuleType]] = None,
+    cache: Optional[IdentificationCache] = None,
+    targets: Optional[Iterable[str]] = None,
+) -> List[DecisionModel]:
+    """Same as 'identify_decision_models', but reusing the results stored in 'cache'
+
+    If 'cache' is not given, one in the default cache directory is used.
+    With 'targets', a complete identification in the cache is reused if there is
+    one, otherwise only the rules that can lead to the targets are run.
+    """
+    rules = rules if rules is not None else _get_registered_rules()
+    cache = cache if cache else IdentificationCache()
+    identified = cache.load(model, rules)
+    if identified is None and targets:
+        identified = cache.load(model, rules, targets)
+    if identified is None:
+        stream = list(identify_decision_models_stream(model, rules, targets=targets))
+        identified = IdentifiedModels(m for (m, _) in stream)
+        cache.store(model, rules, identified, targets, [fixed for (_, fixed) in stream])
+    return identified
@@ -1,3 +1,5 @@
+import dataclasses
+import hashlib
 import importlib.resources as resources
 from dataclasses import dataclass
 from typing import Union
@@ -10,6 +12,7 @@ from typing import Dict
 from typing import Iterable
 from typing import Any
 from typing import Sequence
+from typing import Callable
 
 from forsyde.io.python.api import ForSyDeModel
 from forsyde.io.python.core import Vertex
@@ -19,7 +22,40 @@ from minizinc import Instance as MznInstance
 from minizinc import Result as MznResult
 
 
-@dataclass
+def edge_key(e: Edge) -> Tuple[str, str, Optional[str], Optional[str]]:
+    """Identify an edge by its endpoints and ports, since edges have no identifiers."""
+    return (
+        e.source.identifier,
+        e.target.identifier,
+        e.source_port.identifier if e.source_port else None,
+        e.target_port.identifier if e.target_port else None,
+    )
+
+
+def _edge_sort_key(key: Tuple[str, str, Optional[str], Optional[str]]) -> Tuple[str, ...]:
+    return tuple(k or "" for k in key)
+
+
+def _summary(value: Any) -> Any:
+    # a cheap stand-in of a field for the fingerprint: scalars and
+    # vertexes as they are, containers only by their sizes. Numbers that
+    # compare equal, like True, 1 and 1.0, must have the same summary
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    if isinstance(value, Vertex):
+        return ("V", value.identifier)
+    if isinstance(value, DecisionModel):
+        return ("D", value.fingerprint())
+    if hasattr(value, "__len__"):
+        return (type(value).__name__, len(value))
+    return type(value).__name__
+
+
+@dataclass(eq=False)
 class DecisionModel(object):
     """Decision Models interface for the Design Space Identification procedure.
 
@@ -38,7 +74,62 @@ class DecisionModel(object):
     """
 
     def __hash__(self):
-        return hash((self.covered_vertexes(), self.covered_edges()))
+        return hash(self.fingerprint())
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) is not type(other) or self.fingerprint() != other.fingerprint():
+            return False
+        # only decision models that cover the same elements get here
+        return all(getattr(self, f.name, None) == getattr(other, f.name, None) for f in dataclasses.fields(self))
+
+    def fingerprint(self) -> str:
+        """Get a digest of the decision model, cheap to compute
+
+        It covers the class, the identifiers of the covered vertexes and edges and
+        a summary of every field, i.e. scalars, vertexes and the fingerprints of
+        sub decision models as they are and the sizes of containers. Equal decision
+        models have the same fingerprint, but different ones can share it too, so
+        it is only a hash. Like the indexes, it is computed only once per decision model.
+        """
+        return self._get_cached("fingerprint", self._compute_fingerprint)
+
+    def _compute_fingerprint(self) -> str:
+        try:
+            covered = (sorted(self.covered_vertexes_index()), sorted(self.covered_edges_index(), key=_edge_sort_key))
+        except NotImplementedError:
+            covered = ([], [])
+        content = (
+            type(self).__qualname__,
+            covered,
+            [(f.name, _summary(getattr(self, f.name, None))) for f in dataclasses.fields(self)],
+        )
+        return hashlib.sha1(repr(content).encode("utf-8")).hexdigest()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the cached indexes are rebuilt on demand after unpickling
+        return {k: v for (k, v) in self.__dict__.items() if k != "_cached"}
+
+    def _get_cached(self, key: str, build: Callable[[], Any]) -> Any:
+        # the caches live directly in the instance dictionary so that they
+        # also work for frozen dataclasses and do not count as fields
+        cached = self.__dict__.setdefault("_cached", dict())
+        if key not in cached:
+            cached[key] = build()
+        return cached[key]
+
+    def covered_vertexes_index(self) -> Dict[str, Vertex]:
+        """Get the covered vertexes keyed by their identifiers.
+
+        The index is built only once per decision model, so decision models
+        must not be changed after the index is first used.
+        """
+        return self._get_cached("covered_vertexes_index", lambda: {v.identifier: v for v in self.covered_vertexes()})
+
+    def covered_edges_index(self) -> Dict[Tuple[str, str, Optional[str], Optional[str]], Edge]:
+        """Get the covered edges keyed by 'edge_key', built only once per decision model."""
+        return self._get_cached("covered_edges_index", lambda: {edge_key(e): e for e in self.covered_edges()})
 
     def short_name(self) -> str:
         """Get the short name representation for the decision model
@@ -103,20 +194,28 @@ class DecisionModel(object):
         the other. It also takes in consideration the explicit
         model domination set from 'self'.
 
+        Besides covering everything that 'other' covers, 'self' must also
+        pass 'dominates_beyond_covering', which subclasses can refine
+        instead of overriding this method.
+
         Args:
             other: the other decision model to be checked.
 
         Returns:
             True if 'self' dominates other. False otherwise.
         """
+        if not self.dominates_beyond_covering(other):
+            return False
         # other - self
-        for o in other.covered_vertexes():
-            v = next((vs for vs in self.covered_vertexes() if vs.identifier == o.identifier), default=None)
-            if o is None or not v.refines(o):
+        vertexes_self = self.covered_vertexes_index()
+        for (k, o) in other.covered_vertexes_index().items():
+            v = vertexes_self.get(k, None)
+            if v is None or (v is not o and not v.refines(o)):
                 return False
-        for o in other.covered_edges():
-            v = next((vs for vs in self.covered_edges() if vs.identifier == o.identifier), default=None)
-            if o is None or not v.refines(o):
+        edges_self = self.covered_edges_index()
+        for (k, o) in other.covered_edges_index().items():
+            e = edges_self.get(k, None)
+            if e is None or (e is not o and not e.refines(o)):
                 return False
         return True
         # vertexes_other = set(other.covered_vertexes())
@@ -130,6 +229,105 @@ class DecisionModel(object):
         # #     and not all(e in self.covered_edges() for e in other.covered_edges())
         # return vertexes_self.issuperset(vertexes_other) and edges_self.issuperset(edges_other)
 
+    def dominates_beyond_covering(self, other: "DecisionModel") -> bool:
+        """Check the conditions for 'self' to dominate 'other' other than covering it
+
+        It is only a part of 'dominates', kept apart so that the covering can
+        be checked in bulk for many decision models at once, e.g. when choosing
+        between them. By default there are no such conditions.
+        """
+        return True
+
+
+class IdentifiedModels(List[DecisionModel]):
+    """List of identified decision models with constant time membership checks
+
+    The decision models in the list are indexed by their fingerprints, so that
+    checking if a decision model is already identified only compares it
+    against the few models in the list that share its fingerprint.
+    """
+
+    def __init__(self, models: Iterable[DecisionModel] = []):
+        super().__init__(models)
+        self._fingerprints: Optional[Dict[str, List[DecisionModel]]] = None
+
+    def _get_fingerprints(self) -> Dict[str, List[DecisionModel]]:
+        if self._fingerprints is None:
+            # built aside so that concurrent readers never see a partial index
+            fingerprints: Dict[str, List[DecisionModel]] = dict()
+            for m in self:
+                if isinstance(m, DecisionModel):
+                    fingerprints.setdefault(m.fingerprint(), []).append(m)
+            self._fingerprints = fingerprints
+        return self._fingerprints
+
+    def _index(self, m: Any) -> None:
+        if self._fingerprints is not None and isinstance(m, DecisionModel):
+            self._fingerprints.setdefault(m.fingerprint(), []).append(m)
+
+    def _unindex(self, m: Any) -> None:
+        if self._fingerprints is not None and isinstance(m, DecisionModel):
+            f = m.fingerprint()
+            same = [o for o in self._fingerprints.get(f, []) if o is not m]
+            if same:
+                self._fingerprints[f] = same
+            else:
+                self._fingerprints.pop(f, None)
+
+    def __contains__(self, m: Any) -> bool:
+        if isinstance(m, DecisionModel):
+            return any(o == m for o in self._get_fingerprints().get(m.fingerprint(), ()))
+        return super().__contains__(m)
+
+    def add(self, m: DecisionModel) -> bool:
+        """Append 'm' if it is not in the list yet
+
+        Returns:
+            True if 'm' was appended, False otherwise.
+        """
+        if m in self:
+            return False
+        self.append(m)
+        return True
+
+    def append(self, m: DecisionModel) -> None:
+        super().append(m)
+        self._index(m)
+
+    def extend(self, models: Iterable[DecisionModel]) -> None:
+        for m in models:
+            self.append(m)
+
+    def __iadd__(self, models: Iterable[DecisionModel]) -> "IdentifiedModels":  # type: ignore
+        self.extend(models)
+        return self
+
+    def insert(self, i, m: DecisionModel) -> None:
+        super().insert(i, m)
+        self._index(m)
+
+    def remove(self, m: DecisionModel) -> None:
+        super().remove(m)
+        self._fingerprints = None
+
+    def pop(self, i: int = -1) -> DecisionModel:
+        m = super().pop(i)
+        self._unindex(m)
+        return m
+
+    def clear(self) -> None:
+        super().clear()
+        self._fingerprints = None
+
+    # the remaining mutations are rare, so the index is simply rebuilt
+    def __setitem__(self, i, m) -> None:
+        super().__setitem__(i, m)
+        self._fingerprints = None
+
+    def __delitem__(self, i) -> None:
+        super().__delitem__(i)
+        self._fingerprints = None
+
 
 class DirectDecisionModel(DecisionModel):
     """DecisionModel interface that is solvable in python.
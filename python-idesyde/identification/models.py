@@ -1,15 +1,19 @@
 import functools
+import heapq
 import itertools
 import logging
-import copy
+import dataclasses
 from dataclasses import dataclass
 from dataclasses import field
+from fractions import Fraction
 from typing import Sequence, Tuple
 from typing import Set
 from typing import Mapping
 from typing import List
 from typing import Collection
 from typing import Iterable
+from typing import Iterator
+from typing import Optional
 from typing import Union
 
 # import numpy as np
@@ -38,6 +42,10 @@ from idesyde.identification.interfaces import CompositeDecisionModel
 from idesyde.identification.interfaces import MinizincableDecisionModel
 
 import idesyde.sdf as sdfapi
+from idesyde.sdf_throughput import SDFThroughputAnalysis
+from idesyde.simulation import SelfTimedExecution
+from idesyde.simulation import simulate_sdf
+from idesyde.simulation import simulate_self_timed
 
 _logger = logging.getLogger(LOGGER_NAME)
 
@@ -59,7 +67,7 @@ def _extended_eq(a, b):
         return a == b
 
 
-@dataclass
+@dataclass(eq=False)
 class SDFExecution(DecisionModel):
     """
     This decision model captures all SDF actors and channels in
@@ -76,11 +84,14 @@ class SDFExecution(DecisionModel):
     sdf_impl: Mapping[Vertex, Vertex] = field(default_factory=dict)
     sdf_delays: Sequence[Vertex] = field(default_factory=list)
     sdf_channels: Mapping[Tuple[Vertex, Vertex], Sequence[Sequence[Vertex]]] = field(default_factory=dict)
-    sdf_topology: List[List[int]] = field(default_factory=list)
+    # (source actor index, target actor index, production, consumption) of every channel
+    sdf_channel_rates: List[sdfapi.SDFChannel] = field(default_factory=list)
     sdf_repetition_vector: List[int] = field(default_factory=list)
     sdf_initial_tokens: List[int] = field(default_factory=list)
-    sdf_pass: Sequence[Vertex] = field(default_factory=list)
+    # the PASS as a looped schedule of indexes of 'sdf_actors', see 'sdf_pass'
+    sdf_pass_loops: sdfapi.LoopedSchedule = field(default_factory=list)
 
+    # the most tokens every channel can hold in an iteration, whatever the schedule
     sdf_max_tokens: List[int] = field(default_factory=list)
 
     def covered_vertexes(self):
@@ -91,16 +102,45 @@ class SDFExecution(DecisionModel):
         # yield from self.sdf_constructors.values()
         yield from self.sdf_impl.values()
 
+    @property
+    def sdf_pass(self) -> Iterator[Vertex]:
+        """The actors in the order they fire in the PASS, expanded lazily from 'sdf_pass_loops'."""
+        return (self.sdf_actors[idx] for idx in sdfapi.iter_looped_schedule(self.sdf_pass_loops))
+
+    def sdf_pass_length(self) -> int:
+        return sdfapi.looped_schedule_length(self.sdf_pass_loops)
+
+    def sdf_min_buffers(self) -> List[int]:
+        """Get the smallest buffers that still fit a whole iteration, see 'sdf.minimal_buffer_sizes'
+
+        The search starts from the buffers of the PASS and is only done once, when first asked for.
+        """
+        return self._get_cached(
+            "sdf_min_buffers",
+            lambda: sdfapi.minimal_buffer_sizes(
+                len(self.sdf_actors),
+                self.sdf_channel_rates,
+                self.sdf_repetition_vector,
+                self.sdf_initial_tokens,
+                sdfapi.iter_looped_schedule(self.sdf_pass_loops),
+            ),
+        )
+
+    @property
+    def sdf_topology(self) -> List[List[int]]:
+        """The dense topology matrix of the channels, built on demand."""
+        return sdfapi.channels_to_topology(len(self.sdf_actors), self.sdf_channel_rates)
+
     def compute_deduced_properties(self):
-        self.max_tokens = [0 for c in self.sdf_channels]
-        for (cidx, c) in enumerate(self.sdf_channels):
-            self.max_tokens[cidx] = max(
-                self.sdf_topology[cidx][aidx] * self.sdf_repetition_vector[aidx]
-                for (aidx, a) in enumerate(self.sdf_actors)
-            )
+        # bound for the solvers, which may pick schedules that need larger buffers than the PASS
+        initial_tokens = self.sdf_initial_tokens or [0 for _ in self.sdf_channel_rates]
+        self.sdf_max_tokens = [
+            tokens + prod * self.sdf_repetition_vector[src]
+            for ((src, _, prod, _), tokens) in zip(self.sdf_channel_rates, initial_tokens)
+        ]
 
 
-@dataclass
+@dataclass(eq=False)
 class SDFToOrders(DecisionModel):
 
     # sub identifications
@@ -124,11 +164,11 @@ class SDFToOrders(DecisionModel):
         sub = self.sdf_exec_sub
         data["sdf_actors"] = range(1, len(sub.sdf_actors) + 1)
         data["sdf_channels"] = range(1, len(sub.sdf_channels) + 1)
-        data["sdf_topology"] = sub.sdf_topology.tolist()
-        data["max_steps"] = len(sub.sdf_pass) // len(self.orderings)
-        data["max_steps"] += 1 if len(sub.sdf_pass) % len(self.orderings) > 0 else 0
-        data["max_tokens"] = sub.max_tokens.tolist()
-        data["activations"] = sub.sdf_repetition_vector[:, 0].tolist()
+        data["sdf_topology"] = sub.sdf_topology
+        data["max_steps"] = sub.sdf_pass_length() // len(self.orderings)
+        data["max_steps"] += 1 if sub.sdf_pass_length() % len(self.orderings) > 0 else 0
+        data["max_tokens"] = sub.sdf_max_tokens
+        data["activations"] = list(sub.sdf_repetition_vector)
         data["static_orders"] = range(1, len(self.orderings) + 1)
         data["initial_tokens"] = sub.sdf_initial_tokens
         return data
@@ -140,7 +180,7 @@ class SDFToOrders(DecisionModel):
         return ForSyDeModel()
 
 
-@dataclass
+@dataclass(eq=False)
 class SDFToMultiCore(DecisionModel):
 
     # sub identifications
@@ -300,7 +340,7 @@ class SDFToMultiCore(DecisionModel):
 #     return new_model
 
 
-@dataclass
+@dataclass(eq=False)
 class SDFToMultiCoreCharacterized(DecisionModel):
 
     # covered partial identifications
@@ -346,7 +386,7 @@ class SDFToMultiCoreCharacterized(DecisionModel):
         return self.sdf_mpsoc_sub.rebuild_forsyde_model(results)
 
 
-@dataclass
+@dataclass(eq=False)
 class SDFToMPSoCClusteringDirect(DirectDecisionModel):
     """SDF 2 MPSoC clustering approach greedy decision model"""
 
@@ -359,7 +399,67 @@ class SDFToMPSoCClusteringDirect(DirectDecisionModel):
         return None
 
 
-@dataclass
+@dataclass(eq=False)
+class SDFThroughputDirect(DirectDecisionModel):
+    """Throughput of a SDF execution under a fixed mapping, computed in python
+
+    The throughput is the one of the self-timed execution, where every actor fires
+    as soon as its tokens and its processor are available, following a static order
+    in every processor. See 'sdf_throughput.SDFThroughputAnalysis'. The HSDF
+    expansion is kept between calls of 'evaluate', so that many candidate
+    mappings can be ranked before a solver is called.
+    """
+
+    # covered partial identifications
+    sdf_exec_sub: SDFExecution = SDFExecution()
+
+    # execution time of every actor in every processor
+    wcet: List[List[int]] = field(default_factory=list)
+    # time to send one token of every channel between two processors
+    token_wcct: List[int] = field(default_factory=list)
+    # processor of every actor and, optionally, the actors in firing order of every processor
+    mapping: List[int] = field(default_factory=list)
+    orders: List[List[int]] = field(default_factory=list)
+
+    def covered_vertexes(self):
+        yield from self.sdf_exec_sub.covered_vertexes()
+
+    def analysis(self) -> SDFThroughputAnalysis:
+        sub = self.sdf_exec_sub
+        return self._get_cached(
+            "analysis",
+            lambda: SDFThroughputAnalysis(
+                len(sub.sdf_actors),
+                sub.sdf_channel_rates,
+                sub.sdf_repetition_vector,
+                sub.sdf_initial_tokens,
+                list(sdfapi.iter_looped_schedule(sub.sdf_pass_loops)),
+            ),
+        )
+
+    def evaluate(self, mapping: Sequence[int], orders: Optional[Sequence[Sequence[int]]] = None) -> Optional[Fraction]:
+        """Get the throughput of the SDF execution with 'mapping' and 'orders' instead of the ones of this model
+
+        Returns:
+            Iterations per time unit, 0 if the execution deadlocks, or None if it is unbounded.
+        """
+        execution_times = [self.wcet[a][p] for (a, p) in enumerate(mapping)]
+        token_times = self.token_wcct if self.token_wcct else None
+        return self.analysis().throughput(execution_times, mapping, orders, token_times)
+
+    def simulate(
+        self, mapping: Sequence[int], orders: Optional[Sequence[Sequence[int]]] = None
+    ) -> SelfTimedExecution:
+        """Simulate the SDF execution with 'mapping' and 'orders', see 'simulation.simulate_sdf'."""
+        execution_times = [self.wcet[a][p] for (a, p) in enumerate(mapping)]
+        token_times = self.token_wcct if self.token_wcct else None
+        return simulate_sdf(self.analysis(), execution_times, mapping, orders, token_times)
+
+    def execute(self) -> Optional[Fraction]:
+        return self.evaluate(self.mapping, self.orders if self.orders else None)
+
+
+@dataclass(eq=False)
 class SDFToMPSoCClusteringMzn(MinizincableDecisionModel):
     """SDF 2 MPSoC clustering approach decision model
 
@@ -385,8 +485,8 @@ class SDFToMPSoCClusteringMzn(MinizincableDecisionModel):
 
     def compute_deduced_properties(self):
         # conservative estimation of the number of clusters
-        self.num_clusters = int(
-            self.sdf_mpsoc_char_sub.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_repetition_vector.sum()
+        self.num_clusters = sum(
+            self.sdf_mpsoc_char_sub.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_repetition_vector
         )
 
     def get_mzn_model_name(self):
@@ -401,7 +501,7 @@ class SDFToMPSoCClusteringMzn(MinizincableDecisionModel):
         return self.sdf_mpsoc_char_sub.rebuild_forsyde_model(results)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False)
 class TaskScheduling(MinizincableDecisionModel):
 
     # models that were abstracted_vertexes in jobs
@@ -412,9 +512,12 @@ class TaskScheduling(MinizincableDecisionModel):
     tasks: Sequence[TaskType] = field(default_factory=list)
     messages: Mapping[Tuple[TaskType, TaskType], Sequence[TaskMessageType]] = field(default_factory=dict)
     relative_offset: Mapping[Tuple[TaskType, TaskType], int] = field(default_factory=dict)
-    # weak_next: Mapping[TaskType, Sequence[TaskType]] = field(default_factory=dict)
-    # strong_next: Mapping[TaskType, Sequence[TaskType]] = field(default_factory=dict)
-    # comm_channels: Mapping[Tuple[TaskType, TaskType], Sequence[Sequence[Vertex]]] = field(default_factory=dict)
+    jobs: Sequence[TaskType] = field(default_factory=list)
+    # all data dependencies as strong precedences, but only the weak ones not implied by
+    # others, see 'sdf.precedence_reduction'
+    weak_next: Mapping[TaskType, Sequence[TaskType]] = field(default_factory=dict)
+    strong_next: Mapping[TaskType, Sequence[TaskType]] = field(default_factory=dict)
+    comm_channels: Mapping[Tuple[TaskType, TaskType], Sequence[Sequence[Vertex]]] = field(default_factory=dict)
     pre_mapping: Mapping[TaskType, ProcType] = field(default_factory=dict)
     pre_scheduling: Mapping[TaskType, int] = field(default_factory=dict)
     # the virtual processors and communicators should go from
@@ -425,10 +528,10 @@ class TaskScheduling(MinizincableDecisionModel):
     # comms_key: Mapping[int, CommType] = field(default_factory=dict)
     proc_capacity: Mapping[ProcType, int] = field(default_factory=dict)
     comm_capacity: Mapping[CommType, int] = field(default_factory=dict)
-    task_capacity_req: Mapping[Tuple[TaskType, ProcType], int] = field(default_factory=dict)
+    job_capacity_req: Mapping[Tuple[TaskType, ProcType], int] = field(default_factory=dict)
     # the virtual processors and communicators should go from
     # most physical -> cyber
-    task_allowed_location: Mapping[TaskType, Sequence[ProcType]] = field(default_factory=dict)
+    job_allowed_location: Mapping[TaskType, Sequence[ProcType]] = field(default_factory=dict)
     wcet: Mapping[Tuple[TaskType, ProcType], int] = field(default_factory=dict)
     wcct: Mapping[Tuple[TaskType, TaskType, CommType], int] = field(default_factory=dict)
     paths: Mapping[Tuple[Vertex, Vertex], Sequence[Sequence[Vertex]]] = field(default_factory=dict)
@@ -474,10 +577,16 @@ class TaskScheduling(MinizincableDecisionModel):
     #         return False
 
     def new(self, **kwargs):
-        new_copy = copy.copy(self)
-        for (k, arg) in kwargs.items():
-            setattr(new_copy, k, arg)
-        return new_copy
+        # a new instance is built instead of a copy so that
+        # the cached indexes of 'self' are not carried over
+        return dataclasses.replace(self, **kwargs)
+
+    def positive_timings_count(self) -> int:
+        """Count the execution and communication times that are known, i.e. positive."""
+        return self._get_cached(
+            "positive_timings_count",
+            lambda: sum(1 for v in self.wcet.values() if v > 0) + sum(1 for v in self.wcct.values() if v > 0),
+        )
 
     def covered_vertexes(self):
         yield from self.abstracted_vertexes
@@ -493,20 +602,96 @@ class TaskScheduling(MinizincableDecisionModel):
     #     for ((i, j), p) in self.pre_mapping.items():
     #         model.get_edge_data()
 
-    def dominates(self, other: "DecisionModel") -> bool:
+    def dominates_beyond_covering(self, other: "DecisionModel") -> bool:
         if isinstance(other, TaskScheduling):
             # it's the same identification, but with the times.
-            count_self = sum(1 if v > 0 else 0 for v in self.wcet.values()) + sum(
-                1 if v > 0 else 0 for v in self.wcct.values()
+            return self.positive_timings_count() >= other.positive_timings_count()
+        else:
+            return True
+
+    def _path_comms(self, source: ProcType, target: ProcType) -> List[CommType]:
+        # the communicators crossed between two processors, as in 'get_mzn_data'
+        paths = self._get_cached("path_comms", dict)
+        if (source, target) not in paths:
+            paths[(source, target)] = next(
+                (
+                    [cidx for (cidx, c) in enumerate(self.comms) if any(u in c for u in next(iter(ps)))]
+                    for ((s, t), ps) in self.paths.items()
+                    if s in self.procs[source] and t in self.procs[target] and ps
+                ),
+                [],
             )
-            count_other = sum(1 if v > 0 else 0 for v in other.wcet.values()) + sum(
-                1 if v > 0 else 0 for v in self.wcct.values()
+        return paths[(source, target)]
+
+    def simulate(
+        self, mapping: Sequence[ProcType], orders: Optional[Sequence[Sequence[int]]] = None
+    ) -> SelfTimedExecution:
+        """Simulate the self-timed execution of the jobs, repeated every iteration
+
+        Every job takes its 'wcet' in its processor. A job starts once the jobs that
+        weakly precede it have started, and the jobs that strongly precede it have
+        finished and sent their data over the communicators in the path between
+        the two processors, which takes the 'wcct' of each. The jobs of 'comm_channels'
+        that strongly precede each other send their data as well, even if their
+        precedence is implied by others. Communicators are assumed to be free.
+        The jobs of every processor run in a static order that repeats every iteration.
+
+        Arguments:
+            mapping: the processor of every job, by the job indexes in 'jobs'.
+            orders: the job indexes in execution order of every processor. By default,
+                the jobs of every processor in a topological order of the precedences.
+
+        Returns:
+            The period, latency and utilization of 'procs' of the execution, see 'simulation.simulate_self_timed'.
+        """
+        index = {j: jidx for (jidx, j) in enumerate(self.jobs)}
+        durations = [self.wcet.get((j, mapping[jidx]), 0) for (jidx, j) in enumerate(self.jobs)]
+        edges = []
+        for (s, ts) in self.weak_next.items():
+            edges.extend((index[s], index[t], 0, 0) for t in ts)
+        strong_pairs = {(index[s], index[t]) for (s, ts) in self.strong_next.items() for t in ts}
+        if self.comm_channels:
+            (_, closed_strong) = sdfapi.precedence_closure(
+                len(self.jobs),
+                [[index[t] for t in self.weak_next.get(j, [])] for j in self.jobs],
+                [[index[t] for t in self.strong_next.get(j, [])] for j in self.jobs],
             )
-            return super().dominates(other) and (count_self >= count_other)
-        elif super().dominates(other):
-            return True
-        else:
-            return False
+            strong_reach = [set(ts) for ts in closed_strong]
+            strong_pairs.update(
+                (index[s], index[t])
+                for (s, t) in self.comm_channels
+                if s in index and t in index and index[t] in strong_reach[index[s]]
+            )
+        for (sidx, tidx) in sorted(strong_pairs):
+            (s, t) = (self.jobs[sidx], self.jobs[tidx])
+            weight = durations[sidx]
+            if mapping[sidx] != mapping[tidx]:
+                weight += sum(self.wcct.get((s, t, c), 0) for c in self._path_comms(mapping[sidx], mapping[tidx]))
+            edges.append((sidx, tidx, 0, weight))
+        if orders is None:
+            # stable topological order of the precedences, which never deadlocks on its own
+            indegree = [0] * len(self.jobs)
+            for (_, v, _, _) in edges:
+                indegree[v] += 1
+            succ: List[List[int]] = [[] for _ in self.jobs]
+            for (u, v, _, _) in edges:
+                succ[u].append(v)
+            ready = [jidx for jidx in range(len(self.jobs)) if indegree[jidx] == 0]
+            heapq.heapify(ready)
+            topological = []
+            while ready:
+                u = heapq.heappop(ready)
+                topological.append(u)
+                for v in succ[u]:
+                    indegree[v] -= 1
+                    if indegree[v] == 0:
+                        heapq.heappush(ready, v)
+            orders = [[jidx for jidx in topological if mapping[jidx] == p] for p in range(len(self.procs))]
+        for order in orders:
+            if order:
+                edges.extend((u, v, 0, durations[u]) for (u, v) in zip(order[:-1], order[1:]))
+                edges.append((order[-1], order[0], 1, durations[order[-1]]))
+        return simulate_self_timed(len(self.jobs), edges, durations, mapping, len(self.procs))
 
     def get_mzn_model_name(self):
         return "dependent_job_scheduling.mzn"
@@ -686,7 +871,7 @@ class TaskScheduling(MinizincableDecisionModel):
 #         return self.sub_job_scheduling.rebuild_forsyde_model(results)
 
 
-@dataclass
+@dataclass(eq=False)
 class TimeTriggeredPlatform(DecisionModel):
 
     schedulers: Sequence[Vertex] = field(default_factory=list)
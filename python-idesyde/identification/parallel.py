@@ -0,0 +1,138 @@
+import multiprocessing
+import time
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from forsyde.io.python.api import ForSyDeModel
+from idesyde.identification.interfaces import DecisionModel
+from idesyde.identification.interfaces import IdentifiedModels
+from idesyde.identification.queries import get_model_queries
+from idesyde.identification.scheduling import IdentificationRuleType
+
+
+def _get_context() -> Any:
+    # forking lets the workers inherit the model (and its queries)
+    # instead of receiving a pickled copy of it
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _worker_loop(conn, model: ForSyDeModel, rules: Sequence[IdentificationRuleType]) -> None:
+    identified = IdentifiedModels()
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        (delta, rule_indexes) = msg
+        identified.extend(delta)
+        try:
+            results = []
+            timings = []
+            for r in rule_indexes:
+                start = time.time()
+                results.append(rules[r](model, identified))
+                timings.append((start, time.time()))
+            conn.send((results, timings, None))
+        except Exception as e:
+            conn.send((None, None, e))
+    conn.close()
+
+
+class IdentificationWorkerPool(object):
+    """Long lived worker processes that keep their own copy of the identification state
+
+    Every worker receives the design model and the rules only once, when it
+    is started, and keeps its own list of identified decision models. When rules
+    are run, each worker is only sent the decision models identified since the
+    last time it was used, instead of the whole model and identified list.
+
+    It should be used as a context manager so that the workers are always shut down.
+    """
+
+    def __init__(self, model: ForSyDeModel, rules: Sequence[IdentificationRuleType], workers: int):
+        ctx = _get_context()
+        self._conns = []
+        self._procs = []
+        # what each worker already has from the identified models
+        self._synced: List[int] = []
+        # (worker, start, end) of the rules in the last run
+        self.last_timings: List[Tuple[int, float, float]] = []
+        # build the shared queries before forking so that workers inherit them
+        get_model_queries(model)
+        for _ in range(max(1, workers)):
+            (parent_conn, child_conn) = ctx.Pipe()
+            proc = ctx.Process(target=_worker_loop, args=(child_conn, model, list(rules)), daemon=True)
+            proc.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._procs.append(proc)
+            self._synced.append(0)
+
+    def __enter__(self) -> "IdentificationWorkerPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def run(
+        self, rule_indexes: Sequence[int], identified: Sequence[DecisionModel]
+    ) -> List[Tuple[bool, Optional[DecisionModel]]]:
+        """Run the rules of the given indexes, all with the same identified models
+
+        The worker (counting from 1) and the wall times when each rule started and
+        ended are kept in 'last_timings', in the same order as 'rule_indexes'.
+
+        Returns:
+            The results of the rules, in the same order as 'rule_indexes'.
+        """
+        assignments: List[List[int]] = [[] for _ in self._conns]
+        for (i, _) in enumerate(rule_indexes):
+            assignments[i % len(self._conns)].append(i)
+        for (w, assigned) in enumerate(assignments):
+            if assigned:
+                delta = list(identified[self._synced[w] :])
+                self._conns[w].send((delta, [rule_indexes[i] for i in assigned]))
+                self._synced[w] = len(identified)
+        results: List[Tuple[bool, Optional[DecisionModel]]] = [(False, None) for _ in rule_indexes]
+        self.last_timings = [(0, 0.0, 0.0) for _ in rule_indexes]
+        errors = []
+        for (w, assigned) in enumerate(assignments):
+            if assigned:
+                (worker_results, worker_timings, error) = self._conns[w].recv()
+                if error is not None:
+                    errors.append(error)
+                    continue
+                for (i, res, (start, end)) in zip(assigned, worker_results, worker_timings):
+                    results[i] = res
+                    self.last_timings[i] = (w + 1, start, end)
+        # only raise after all workers answered, so that no answer is left in the pipes
+        if errors:
+            raise errors[0]
+        return results
+
+    def terminate(self) -> None:
+        """Stop the workers right away, even if they are in the middle of a run."""
+        for proc in self._procs:
+            proc.terminate()
+        for proc in self._procs:
+            proc.join()
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        self._procs = []
+
+    def close(self) -> None:
+        for conn in self._conns:
+            try:
+                conn.send(None)
+                conn.close()
+            except (OSError, EOFError):
+                pass
+        for proc in self._procs:
+            proc.join()
+        self._conns = []
+        self._procs = []
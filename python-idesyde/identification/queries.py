@@ -0,0 +1,223 @@
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Sequence
+from typing import Tuple
+
+import networkx as nx  # type: ignore
+
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Trait
+from forsyde.io.python.core import Vertex
+from forsyde.io.python.types import VertexTrait
+
+_model_queries: "weakref.WeakKeyDictionary[ForSyDeModel, ModelQueries]" = weakref.WeakKeyDictionary()
+_model_queries_lock = threading.Lock()
+
+# every trait that a given trait refines, including itself
+_refined_traits: Dict[Trait, Tuple[VertexTrait, ...]] = dict()
+
+
+def _get_refined_traits(trait: Trait) -> Tuple[VertexTrait, ...]:
+    if trait not in _refined_traits:
+        _refined_traits[trait] = tuple(t for t in VertexTrait if trait.refines(t))
+    return _refined_traits[trait]
+
+
+class ModelQueries(object):
+    """Memoized queries over a ForSyDeModel shared by all identification rules
+
+    The vertexes of the model are indexed by all the traits they have, directly
+    or by refinement, in a single pass over the model. The index keeps the
+    iteration order of the model, so that the answers are the same as
+    scanning the model with 'Vertex.has_trait'.
+
+    Shortest path queries are also answered here. The BFS predecessor tree of
+    a source is computed once and then reused for all targets, filters and
+    rules, so that asking for the paths between all pairs of n vertexes costs
+    n BFS runs instead of n * n. Only the trees of the 'max_trees' most recently
+    used sources are kept, since every tree is as large as the model.
+
+    The memoized answers are guarded by a lock, so the same instance can be
+    used by rules running in different threads.
+
+    An instance should not be created directly, but obtained through
+    'get_model_queries' so that it is shared between rules and iterations.
+    """
+
+    def __init__(self, model: ForSyDeModel, max_trees: int = 64):
+        self._model_ref = weakref.ref(model)
+        self._size = (model.number_of_nodes(), model.number_of_edges())
+        self._trait_index: Dict[VertexTrait, List[Vertex]] = dict()
+        self._trait_members: Dict[VertexTrait, Set[Vertex]] = dict()
+        self._max_trees = max_trees
+        self._predecessors: "OrderedDict[Vertex, Dict[Vertex, List[Vertex]]]" = OrderedDict()
+        self._paths: Dict[Tuple, Optional[List[List[Vertex]]]] = dict()
+        self._lock = threading.Lock()
+        for v in model:
+            for t in getattr(v, "vertex_traits", ()):
+                for refined in _get_refined_traits(t):
+                    if refined not in self._trait_members:
+                        self._trait_members[refined] = set()
+                        self._trait_index[refined] = []
+                    if v not in self._trait_members[refined]:
+                        self._trait_members[refined].add(v)
+                        self._trait_index[refined].append(v)
+
+    def is_stale(self, model: ForSyDeModel) -> bool:
+        """Check if the model changed since the queries were built
+
+        The check is only a cheap sanity guard: models changed in place must
+        be explicitly invalidated with 'invalidate_model_queries'.
+        """
+        return self._model_ref() is not model or self._size != (model.number_of_nodes(), model.number_of_edges())
+
+    def has_trait(self, v: Vertex, trait: VertexTrait) -> bool:
+        """Same as 'v.has_trait(trait)', but memoized for the vertexes of the model."""
+        members = self._trait_members.get(trait, None)
+        return members is not None and v in members
+
+    def has_any_trait(self, v: Vertex, traits: Iterable[VertexTrait]) -> bool:
+        return any(self.has_trait(v, t) for t in traits)
+
+    def vertexes_with_trait(self, trait: VertexTrait) -> List[Vertex]:
+        """Get all the vertexes of the model that have 'trait'
+
+        Returns:
+            A new list with the vertexes, in the same order as they
+            are iterated in the model.
+        """
+        return list(self._trait_index.get(trait, []))
+
+    def count_with_trait(self, trait: VertexTrait) -> int:
+        return len(self._trait_index.get(trait, []))
+
+    def vertexes_with_traits(self, traits: Sequence[VertexTrait]) -> List[Vertex]:
+        """Get all the vertexes of the model that have all the 'traits'."""
+        if not traits:
+            return []
+        (first, rest) = (traits[0], traits[1:])
+        return [v for v in self._trait_index.get(first, []) if all(self.has_trait(v, t) for t in rest)]
+
+    def get_predecessors(self, source: Vertex) -> Dict[Vertex, List[Vertex]]:
+        """Get the BFS predecessor tree from 'source', computing it only if it is not kept
+
+        Returns:
+            A dictionary with every vertex reachable from 'source' as keys and
+            their predecessors in shortest paths from 'source' as values.
+        """
+        with self._lock:
+            pred = self._predecessors.get(source, None)
+            if pred is not None:
+                self._predecessors.move_to_end(source)
+                return pred
+        # the BFS runs outside the lock, so two threads may both build the same tree
+        pred = nx.predecessor(self._model_ref(), source)
+        with self._lock:
+            self._predecessors[source] = pred
+            if len(self._predecessors) > self._max_trees:
+                self._predecessors.popitem(last=False)
+        return pred
+
+    def has_path(self, source: Vertex, target: Vertex) -> bool:
+        return target in self.get_predecessors(source)
+
+    def shortest_paths(
+        self,
+        source: Vertex,
+        target: Vertex,
+        through_traits: Sequence[VertexTrait] = (),
+        avoid_traits: Sequence[VertexTrait] = (),
+    ) -> Optional[List[List[Vertex]]]:
+        """Get the shortest paths between two vertexes, filtered by their inner vertexes
+
+        The paths are the same as the ones from 'nx.all_shortest_paths',
+        in the same order, but only those whose inner vertexes (all but 'source'
+        and 'target') have at least one of 'through_traits' and none of 'avoid_traits'
+        are kept. The answers are memoized.
+
+        Arguments:
+            source: the first vertex of the paths.
+            target: the last vertex of the paths.
+            through_traits: if not empty, the inner vertexes must have at least one of these traits.
+            avoid_traits: the inner vertexes must not have any of these traits.
+
+        Returns:
+            None if 'target' cannot be reached from 'source'. Otherwise, the list of
+            inner vertexes of every shortest path that passes the filters, which can
+            be empty if no shortest path passes them.
+        """
+        key = (source, target, tuple(through_traits), tuple(avoid_traits))
+        with self._lock:
+            found = key in self._paths
+            paths = self._paths.get(key, None)
+        if not found:
+            paths = self._build_shortest_paths(source, target, through_traits, avoid_traits)
+            with self._lock:
+                paths = self._paths.setdefault(key, paths)
+        return list(paths) if paths is not None else None
+
+    def _build_shortest_paths(
+        self,
+        source: Vertex,
+        target: Vertex,
+        through_traits: Sequence[VertexTrait],
+        avoid_traits: Sequence[VertexTrait],
+    ) -> Optional[List[List[Vertex]]]:
+        pred = self.get_predecessors(source)
+        if target not in pred:
+            return None
+
+        def allowed(v: Vertex) -> bool:
+            if through_traits and not self.has_any_trait(v, through_traits):
+                return False
+            return not self.has_any_trait(v, avoid_traits)
+
+        paths: List[List[Vertex]] = []
+        # same backtracking as networkx, but pruning the
+        # inner vertexes that do not pass the filters
+        stack = [[target, 0]]
+        top = 0
+        while top >= 0:
+            (node, i) = stack[top]
+            if node == source:
+                paths.append([p for (p, _) in reversed(stack[1:top])])
+            if len(pred[node]) > i:
+                nxt = pred[node][i]
+                if nxt != source and not allowed(nxt):
+                    stack[top][1] += 1
+                    continue
+                top += 1
+                if top == len(stack):
+                    stack.append([nxt, 0])
+                else:
+                    stack[top] = [nxt, 0]
+            else:
+                stack[top - 1][1] += 1
+                top -= 1
+        return paths
+
+
+def get_model_queries(model: ForSyDeModel) -> ModelQueries:
+    """Get the shared queries for 'model', building them if necessary.
+
+    The queries are kept for as long as the model is alive, so
+    every rule and every identification iteration reuses the same index.
+    """
+    with _model_queries_lock:
+        queries = _model_queries.get(model, None)
+        if queries is None or queries.is_stale(model):
+            queries = ModelQueries(model)
+            _model_queries[model] = queries
+        return queries
+
+
+def invalidate_model_queries(model: ForSyDeModel) -> None:
+    """Drop the shared queries of 'model', e.g. after it was changed in place."""
+    with _model_queries_lock:
+        _model_queries.pop(model, None)
@@ -15,7 +15,6 @@ import operator
 import networkx as nx  # type: ignore
 
 # import numpy as np
-import sympy  # type: ignore
 
 from forsyde.io.python.core import Vertex
 from forsyde.io.python.core import ForSyDeModel
@@ -46,10 +45,10 @@ from forsyde.io.python.types import VertexAcessor as V
 # from forsyde.io.python.types import AbstractMapping
 # from forsyde.io.python.types import AbstractScheduling
 
-import idesyde.math as math_util
 import idesyde.sdf as sdf_lib
 from idesyde import LOGGER_NAME
 from idesyde.identification.api import register_identification_rule
+from idesyde.identification.queries import get_model_queries
 from idesyde.identification.interfaces import DecisionModel
 from idesyde.identification.models import SDFExecution
 from idesyde.identification.models import SDFToOrders
@@ -57,9 +56,9 @@ from idesyde.identification.models import SDFToMultiCore
 from idesyde.identification.models import SDFToMultiCoreCharacterized
 from idesyde.identification.models import TimeTriggeredPlatform
 from idesyde.identification.models import TaskScheduling
-from idesyde.identification.models import JobType
 from idesyde.identification.models import ProcType
 from idesyde.identification.models import CommType
+from idesyde.sdf import JobType
 
 # class SDFAppRule(IdentificationRule):
 
@@ -75,50 +74,43 @@ def _hash_sequence(li):
     return v
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[], produces=[SDFExecution])
 def identify_sdf_app(model: ForSyDeModel, identified: List[DecisionModel]):
     """This Rule identifies (H)SDF applications that are consistent.
 
     To be consistent, the (H)SDF applications must:
-        1. The topology matrix must have a null space of dimension 1,
-            if there exists at least one channel in the application.
+        1. The balance equations must have a positive solution, i.e.
+            a repetition vector, for every connected part of the application.
         2. There must be a PASS for the application.
     """
+    queries = get_model_queries(model)
     result = None
-    sdf_actors: Sequence[Vertex] = [c for c in model if c.has_trait(VertexTrait.SDFComb)]
-    delay_constructors: Sequence[Vertex] = [c for c in model if c.has_trait(VertexTrait.SDFPrefix)]
+    sdf_actors: Sequence[Vertex] = queries.vertexes_with_trait(VertexTrait.SDFComb)
+    delay_constructors: Sequence[Vertex] = queries.vertexes_with_trait(VertexTrait.SDFPrefix)
     # 1: find the actors
     # sdf_actors: List[Vertex] = [a for c in constructors for a in model[c] if isinstance(a, Process)]
     # there are garanteed to be the correct vertexes by construction
     # sdf_constructors = {a: c for a in sdf_actors for c in constructors if a in model[c]}
-    sdf_impl = {a: i for a in sdf_actors for i in model[a] if i.has_trait(VertexTrait.InstrumentedFunction)}
+    sdf_impl = {a: i for a in sdf_actors for i in model[a] if queries.has_trait(i, VertexTrait.InstrumentedFunction)}
     # 1: find the delays
-    sdf_delays: List[Vertex] = [a for c in delay_constructors for a in model[c] if a.has_trait(VertexTrait.SDFPrefix)]
+    sdf_delays: List[Vertex] = list(delay_constructors)
     # 1: get connected signals
     sdf_channels = {}
     # 1: check the model for the paths between actors
     for s in sdf_actors:
         for t in sdf_actors:
             if s != t:
-                try:
-                    # take away the source and target nodes
-                    paths: Sequence[Sequence[Vertex]] = [path[1:-1] for path in nx.all_shortest_paths(model, s, t)]
-                    # check if all elements in the path are signals or delays
-                    paths_filtered: Sequence[Sequence[Vertex]] = [
-                        path
-                        for path in paths
-                        if all(v.has_trait(VertexTrait.Signal) or (v in sdf_delays) for v in path)
-                    ]
-                    if len(paths) > 0:
-                        sdf_channels[(s, t)] = paths_filtered
+                # take away the source and target nodes, keeping
+                # only the paths made of signals or delays
+                paths = queries.shortest_paths(s, t, through_traits=(VertexTrait.Signal, VertexTrait.SDFPrefix))
+                if paths is not None:
+                    sdf_channels[(s, t)] = paths
                     # for path in nx.all_shortest_paths(model, s, t):
                     #     # take away the source and target nodes
                     #     path = path[1:-1]
                     #     # check if all elements in the path are signals or delays
                     #     if all(v.has_trait(VertexTrait.Signal) or v in sdf_delays for v in path):
                     #         sdf_channels.append((s, t, path))
-                except nx.exception.NetworkXNoPath:
-                    pass
     # for (cidx, (s, t, _)) in enumerate(sdf_channels):
     #     for path in nx.all_shortest_paths(model, s, t):
     #         # take away the source and target nodes
@@ -132,12 +124,14 @@ def identify_sdf_app(model: ForSyDeModel, identified: List[DecisionModel]):
     # sdf_channels = [(s, t, p) for (s, t, p) in sdf_channels if all(
     #     isinstance(e["object"], Output) for (_, e) in model[s][t].items())]
     # 2: define the initial tokens by counting the delays on every path
-    initial_tokens = [sum(1 for d in sdf_channels[(s, t)] if d in sdf_delays) for (s, t) in sdf_channels]
-    # 1: build the topology matrix
-    sdf_topology = [[0 for _ in sdf_actors] for _ in sdf_channels]
-    for (cidx, (s, t)) in enumerate(sdf_channels):
-        sidx = sdf_actors.index(s)
-        tidx = sdf_actors.index(t)
+    initial_tokens = [
+        sum(1 for path in sdf_channels[(s, t)] for d in path if d in sdf_delays) for (s, t) in sdf_channels
+    ]
+    # 1: build the channel rates, i.e. the sparse topology
+    actor_index = {a: idx for (idx, a) in enumerate(sdf_actors)}
+    sdf_channel_rates = []
+    for (s, t) in sdf_channels:
+        (production, consumption) = (0, 0)
         for path in sdf_channels[(s, t)]:
             # get the relevant port for the source and target actors
             # in this channel, assuming there is only one edge
@@ -147,8 +141,9 @@ def identify_sdf_app(model: ForSyDeModel, identified: List[DecisionModel]):
             # get the constructor of the actors
             # look in their properties what is the production associated
             # with the channel, for the source...
-            sdf_topology[cidx][sidx] += int(V.get_production(s)[out_port.identifier])
-            sdf_topology[cidx][tidx] -= int(V.get_consumption(t)[in_port.identifier])
+            production += int(V.get_production(s)[out_port.identifier])
+            consumption += int(V.get_consumption(t)[in_port.identifier])
+        sdf_channel_rates.append((actor_index[s], actor_index[t], production, consumption))
         # if out_port.identifier in s_constructor.get_production():
         # else:
         #     sdf_topology[cidx, sidx] = int(s_constructor.get_consumption()[out_port.identifier])
@@ -156,27 +151,38 @@ def identify_sdf_app(model: ForSyDeModel, identified: List[DecisionModel]):
         # if in_port.identifier in t_constructor.get_production():
         #     sdf_topology[cidx, tidx] = -int(s_constructor.get_production()[in_port.identifier])
         # else:
-    # 1: calculate the null space
-    null_space = sympy.Matrix(sdf_topology).nullspace()
-    if len(null_space) == 1:
-        # 2: transform the vector into the least integer multiple possible
-        repetition_vector = math_util.integralize_vector(null_space[0])
-        # 2: cast it to a numpy
-        repetition_vector = [int(v) for v in repetition_vector]
-        # 2: calculate a PASS!
-        schedule = sdf_lib.get_PASS(sdf_topology, repetition_vector, initial_tokens)
-        # and if it exists, create the model with the schedule
-        if schedule != []:
-            sdf_pass = [sdf_actors[idx] for idx in schedule]
-            result = SDFExecution(
-                sdf_actors=sdf_actors,
-                sdf_impl=cast(Dict[Vertex, Vertex], sdf_impl),
-                sdf_channels=sdf_channels,
-                sdf_topology=sdf_topology,
-                sdf_repetition_vector=repetition_vector,
-                sdf_initial_tokens=initial_tokens,
-                sdf_pass=sdf_pass,
+    # 1: solve the balance equations and find a PASS for every independent part
+    components = sdf_lib.analyse_sdf_components(len(sdf_actors), sdf_channel_rates, initial_tokens)
+    for c in components:
+        if c.error:
+            _logger.warning(
+                f"SDF actors {', '.join(sdf_actors[a].identifier for a in c.actors)} are left out: {c.error}"
             )
+    consistent = [c for c in components if not c.error]
+    if consistent:
+        # 2: keep only the consistent parts, in their original order
+        kept_actors = sorted(a for c in consistent for a in c.actors)
+        kept = set(sdf_actors[a] for a in kept_actors)
+        new_index = {a: idx for (idx, a) in enumerate(kept_actors)}
+        repetition = {a: q for c in consistent for (a, q) in zip(c.actors, c.repetition_vector)}
+        channel_keys = list(sdf_channels)
+        kept_channels = [cidx for (cidx, (s, t)) in enumerate(channel_keys) if s in kept and t in kept]
+        # the components are independent, so their PASSes can simply follow each other
+        sdf_pass_loops = [
+            loop for c in consistent for loop in sdf_lib.map_looped_schedule(c.schedule, new_index.__getitem__)
+        ]
+        result = SDFExecution(
+            sdf_actors=[sdf_actors[a] for a in kept_actors],
+            sdf_impl=cast(Dict[Vertex, Vertex], {a: i for (a, i) in sdf_impl.items() if a in kept}),
+            sdf_channels={channel_keys[cidx]: sdf_channels[channel_keys[cidx]] for cidx in kept_channels},
+            sdf_channel_rates=[
+                (new_index[src], new_index[dst], prod, cons)
+                for (src, dst, prod, cons) in (sdf_channel_rates[cidx] for cidx in kept_channels)
+            ],
+            sdf_repetition_vector=[repetition[a] for a in kept_actors],
+            sdf_initial_tokens=[initial_tokens[cidx] for cidx in kept_channels],
+            sdf_pass_loops=sdf_pass_loops,
+        )
     # conditions for fixpoints and partial identification
     if result:
         result.compute_deduced_properties()
@@ -188,17 +194,18 @@ def identify_sdf_app(model: ForSyDeModel, identified: List[DecisionModel]):
 # class SDFOrderRule(IdentificationRule):
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[SDFExecution], produces=[SDFToOrders])
 def identify_sdf_parallel(model: ForSyDeModel, identified: List[DecisionModel]):
     """This Rule Identifies possible parallel ordered schedules atop 'SDFExecution'.
 
     Since only the ordered schedules are considered, the "time" in the resulting
     model is still abstract.
     """
+    queries = get_model_queries(model)
     res = None
     sdf_exec_sub = next((p for p in identified if isinstance(p, SDFExecution)), None)
     if sdf_exec_sub:
-        orderings = [o for o in model if o.has_trait(VertexTrait.TimeTriggeredScheduler)]
+        orderings = queries.vertexes_with_trait(VertexTrait.TimeTriggeredScheduler)
         if orderings:
             pre_scheduling = []
             for (a, o) in itertools.product(sdf_exec_sub.sdf_actors, orderings):
@@ -219,7 +226,7 @@ def identify_sdf_parallel(model: ForSyDeModel, identified: List[DecisionModel]):
 # class SDFToCoresRule(IdentificationRule):
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[SDFToOrders], produces=[SDFToMultiCore])
 def identify_sdf_multi_core(model: ForSyDeModel, identified: List[DecisionModel]):
     """This 'IdentificationRule' identifies processing units atop 'SDFToOrders'
 
@@ -231,23 +238,21 @@ def identify_sdf_multi_core(model: ForSyDeModel, identified: List[DecisionModel]
     is _always_ the one chosen for data communication. Regardless on how
     the 'AbstractCommunicationComponent' communicates.
     """
+    queries = get_model_queries(model)
     res = None
     sdf_orders_sub = next((p for p in identified if isinstance(p, SDFToOrders)), None)
     if sdf_orders_sub:
-        cores = [p for p in model if p.has_trait(VertexTrait.AbstractProcessingComponent)]
-        comms = [p for p in model if p.has_trait(VertexTrait.AbstractCommunicationComponent)]
+        cores = queries.vertexes_with_trait(VertexTrait.AbstractProcessingComponent)
+        comms = queries.vertexes_with_trait(VertexTrait.AbstractCommunicationComponent)
         # find all cores that are connected between each other
         connections: Dict[Tuple[Vertex, Vertex], Collection[Collection[Vertex]]] = {}
         for (s, t) in itertools.product(cores, cores):
             if s != t:
-                try:
-                    connections[(s, t)] = [
-                        path[1:-1]
-                        for path in nx.all_shortest_paths(model, s, t)
-                        if all(v.has_trait(VertexTrait.AbstractCommunicationComponent) for v in path[1:-1])
-                    ]
-                except nx.exception.NetworkXNoPath:
-                    pass
+                paths = queries.shortest_paths(
+                    s, t, through_traits=(VertexTrait.AbstractCommunicationComponent,)
+                )
+                if paths is not None:
+                    connections[(s, t)] = paths
         # there must be orderings for both execution and communication
         comms_capacity = [0 for c in comms]
         for (i, c) in enumerate(comms):
@@ -281,9 +286,10 @@ def identify_sdf_multi_core(model: ForSyDeModel, identified: List[DecisionModel]
 # class SDFToCoresCharacterizedRule(IdentificationRule):
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[SDFToMultiCore], produces=[SDFToMultiCoreCharacterized])
 def identify_sdf_multi_core_instrumented(model: ForSyDeModel, identified: List[DecisionModel]):
     """This 'IdentificationRule' add WCET and WCCT atop 'SDFToCoresRule'"""
+    queries = get_model_queries(model)
     res = None
     sdf_mpsoc_sub = next((p for p in identified if isinstance(p, SDFToMultiCore)), None)
     if sdf_mpsoc_sub:
@@ -292,9 +298,9 @@ def identify_sdf_multi_core_instrumented(model: ForSyDeModel, identified: List[D
         cores = sdf_mpsoc_sub.cores
         comms = sdf_mpsoc_sub.comms
         # list(model.get_vertexes(WCET.get_instance()))
-        wcet_vertexes = [w for w in model if w.has_trait(VertexTrait.WCET)]
+        wcet_vertexes = queries.vertexes_with_trait(VertexTrait.WCET)
         # list(model.get_vertexes(WCCT.get_instance()))
-        token_wcct_vertexes = [w for w in model if w.has_trait(VertexTrait.WCCT)]
+        token_wcct_vertexes = queries.vertexes_with_trait(VertexTrait.WCCT)
         wcet = [[0 for _ in cores] for _ in sdf_actors]  # np.zeros((len(sdf_actors), len(cores)), dtype=int)
         token_wcct = [[0 for _ in comms] for _ in sdf_channels]  # np.zeros((len(sdf_channels), len(comms)), dtype=int)
         for (aidx, a) in enumerate(sdf_actors):
@@ -322,11 +328,11 @@ def identify_sdf_multi_core_instrumented(model: ForSyDeModel, identified: List[D
         # per application, we apply maximun just in case
         # someone forgot to make sure there is only one annotation
         # per application
-        goals_vertexes = [v for v in model if v.has_trait(VertexTrait.Goal)]
-        throughput_vertexes = [v for v in goals_vertexes if v.has_trait(VertexTrait.MinimumThroughput)]
+        goals_vertexes = queries.vertexes_with_trait(VertexTrait.Goal)
+        throughput_vertexes = [v for v in goals_vertexes if queries.has_trait(v, VertexTrait.MinimumThroughput)]
         throughput_importance = 0
         # check that all actors are covered by a throughput goal
-        if all(sum(1 for p in nx.all_simple_paths(model, g, a)) > 0 for g in throughput_vertexes for a in sdf_actors):
+        if all(queries.has_path(g, a) for g in throughput_vertexes for a in sdf_actors):
             throughput_importance = max(
                 (int(v.properties["apriori_importance"]) for v in throughput_vertexes), default=0
             )
@@ -368,9 +374,10 @@ def identify_jobs_from_sdf_multicore(
         jobs, weak_next, strong_next = sdf_lib.sdf_to_jobs(
             sdf_mpsoc_char_sub.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_actors,
             sdf_mpsoc_char_sub.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_channels,
-            sdf_mpsoc_char_sub.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_topology,
+            sdf_mpsoc_char_sub.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_channel_rates,
             sdf_mpsoc_char_sub.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_repetition_vector,
             sdf_mpsoc_char_sub.sdf_mpsoc_sub.sdf_orders_sub.sdf_exec_sub.sdf_initial_tokens,
+            reduced=True,
         )
         cores = sdf_mpsoc_char_sub.sdf_mpsoc_sub.cores
         orderings = sdf_mpsoc_char_sub.sdf_mpsoc_sub.sdf_orders_sub.orderings
@@ -470,10 +477,11 @@ def identify_jobs_from_sdf_multicore(
         return (False, None)
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[SDFToMultiCore], produces=[TaskScheduling])
 def identify_jobs_from_multi_sdf(
     model: ForSyDeModel, identified: List[DecisionModel]
 ) -> Tuple[bool, Optional[DecisionModel]]:
+    queries = get_model_queries(model)
     sdf_multicore_sub: Optional[SDFToMultiCore] = next((p for p in identified if isinstance(p, SDFToMultiCore)), None)
     # early exit
     if not sdf_multicore_sub:
@@ -483,9 +491,10 @@ def identify_jobs_from_multi_sdf(
     jobs, weak_next, strong_next = sdf_lib.sdf_to_jobs(
         sdf_multicore_sub.sdf_orders_sub.sdf_exec_sub.sdf_actors,
         sdf_multicore_sub.sdf_orders_sub.sdf_exec_sub.sdf_channels,
-        sdf_multicore_sub.sdf_orders_sub.sdf_exec_sub.sdf_topology,
+        sdf_multicore_sub.sdf_orders_sub.sdf_exec_sub.sdf_channel_rates,
         sdf_multicore_sub.sdf_orders_sub.sdf_exec_sub.sdf_repetition_vector,
         sdf_multicore_sub.sdf_orders_sub.sdf_exec_sub.sdf_initial_tokens,
+        reduced=True,
     )
     cores = sdf_multicore_sub.cores
     orderings = sdf_multicore_sub.sdf_orders_sub.orderings
@@ -523,21 +532,14 @@ def identify_jobs_from_multi_sdf(
             # processors. Assume every edge is a different mapping
             core = next(u for u in proc if u.has_trait(VertexTrait.AbstractProcessingComponent))
             # use shortest path algorithms since we want a clear path without any
-            # repetitions or cycles
-            paths = []
-            try:
-                # build a list out of it so the generator is consumed
-                paths = list(nx.all_shortest_paths(model, core, a))
-            except nx.exception.NetworkXNoPath:
-                pass
-            # can only have one actor, the one in the loop
-            paths = [path for path in paths if sum(1 for u in path if u.has_trait(VertexTrait.SDFComb)) == 1]
-            # cn only have one core, the one in the loop
-            paths = [
-                path
-                for path in paths
-                if sum(1 for u in path if u.has_trait(VertexTrait.AbstractProcessingComponent)) == 1
-            ]
+            # repetitions or cycles. It can only have one actor and one core,
+            # the ones in the loop
+            paths = (
+                queries.shortest_paths(
+                    core, a, avoid_traits=(VertexTrait.SDFComb, VertexTrait.AbstractProcessingComponent)
+                )
+                or []
+            )
             # count the remaining paths now
             hits = sum(1 for _ in paths)
             for i in range(hits):
@@ -557,12 +559,12 @@ def identify_jobs_from_multi_sdf(
             # for (p, proc) in enumerate(procs):
             #     if all(nx.has_path(model, component, a) for component in proc):
             #         pre_mapping[start_index + i] = p
-    goals_vertexes = [v for v in model if v.has_trait(VertexTrait.Goal)]
-    throughput_vertexes = [v for v in goals_vertexes if v.has_trait(VertexTrait.MinimumThroughput)]
+    goals_vertexes = queries.vertexes_with_trait(VertexTrait.Goal)
+    throughput_vertexes = [v for v in goals_vertexes if queries.has_trait(v, VertexTrait.MinimumThroughput)]
     throughput_importance = 0
     latency_importance = 0
     # check that all actors are covered by a throughput goal
-    if all(nx.has_path(model, g, a) for g in throughput_vertexes for a in sdf_actors):
+    if all(queries.has_path(g, a) for g in throughput_vertexes for a in sdf_actors):
         throughput_importance = max((int(v.properties["apriori_importance"]) for v in throughput_vertexes), default=0)
     comm_channels = {
         ((jsi, js), (jti, jt)): sdf_channels[(js, jt)]
@@ -596,7 +598,7 @@ def identify_jobs_from_multi_sdf(
     #     return (False, None)
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[TaskScheduling, SDFExecution], produces=[TaskScheduling])
 def identify_instrumentation_in_jobs_from_sdf(model: ForSyDeModel, identified: List[DecisionModel]):
     res = None
     sub_jobs: Optional[TaskScheduling] = next((p for p in identified if isinstance(p, TaskScheduling)), None)
@@ -700,12 +702,13 @@ def identify_instrumentation_in_jobs_from_sdf(model: ForSyDeModel, identified: L
         return (False, None)
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[TaskScheduling], produces=[TaskScheduling])
 def identify_location_req_in_jobs_from_sdf(
     model: ForSyDeModel, identified: List[DecisionModel]
 ) -> IdentificationOutput:
+    queries = get_model_queries(model)
     sub_jobs: Sequence[TaskScheduling] = [p for p in identified if isinstance(p, TaskScheduling)]
-    location_vertexes = [li for li in model if li.has_trait(VertexTrait.LocationRequirement)]
+    location_vertexes = queries.vertexes_with_trait(VertexTrait.LocationRequirement)
     # check if any of the sub problems already covered the requirements
     if any(all(lver in sub.covered_vertexes() for lver in location_vertexes) for sub in sub_jobs):
         return (True, None)
@@ -729,7 +732,7 @@ def identify_location_req_in_jobs_from_sdf(
     return (False, None)
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[TaskScheduling], produces=[TaskScheduling])
 def identify_merge_job_scheduling_simple(
     model: ForSyDeModel, identified: List[DecisionModel]
 ) -> Tuple[bool, Optional[DecisionModel]]:
@@ -829,6 +832,8 @@ def identify_merge_job_scheduling_simple(
     job_capacity_req = {(j, procs_inv[p]): cap for ((j, p), cap) in job_capacity_req_proctype.items()}
     proc_capacity = {procs_inv[k]: v for (k, v) in proc_capacity.items()}
     comm_capacity = {comms_inv[k]: v for (k, v) in comm_capacity.items()}
+    # the union of reduced precedences might be redundant again, but the data dependencies are kept
+    (weak_next, strong_next) = sdf_lib.reduce_job_precedences(jobs, weak_next, strong_next, keep_strong=True)
     # merge the worst cases by always tkaing the maximum in case of clash
     res = TaskScheduling(
         abstracted_vertexes=reduce(operator.or_, (set(s.abstracted_vertexes) for s in sub_jobs), set()),
@@ -859,13 +864,14 @@ def identify_merge_job_scheduling_simple(
         return (False, res)
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[], produces=[TimeTriggeredPlatform])
 def identify_time_triggered_platform(
     model: ForSyDeModel, identified: Collection[DecisionModel]
 ) -> IdentificationOutput:
-    schedulers = [o for o in model if o.has_trait(VertexTrait.TimeTriggeredScheduler)]
-    cores = [p for p in model if p.has_trait(VertexTrait.AbstractProcessingComponent)]
-    comms = [p for p in model if p.has_trait(VertexTrait.AbstractCommunicationComponent)]
+    queries = get_model_queries(model)
+    schedulers = queries.vertexes_with_trait(VertexTrait.TimeTriggeredScheduler)
+    cores = queries.vertexes_with_trait(VertexTrait.AbstractProcessingComponent)
+    comms = queries.vertexes_with_trait(VertexTrait.AbstractCommunicationComponent)
     # find all cores that are connected between each other
     path: Dict[Tuple[Vertex, Vertex], Sequence[Sequence[Vertex]]] = {}
     # check if there are enough schedulers
@@ -873,12 +879,9 @@ def identify_time_triggered_platform(
         return (True, None)
     for (s, t) in itertools.product(cores, cores):
         if s != t:
-            try:
-                path[(s, t)] = [
-                    path[1:-1] for path in nx.all_shortest_paths(model, s, t) if all(v in comms for v in path[1:-1])
-                ]
-            except nx.exception.NetworkXNoPath:
-                pass
+            paths = queries.shortest_paths(s, t, through_traits=(VertexTrait.AbstractCommunicationComponent,))
+            if paths is not None:
+                path[(s, t)] = paths
     # there must be orderings for both execution and communication
     comms_bandwidth = {
         c: V.get_max_bandwith_bytes_per_sec(c) if c.has_trait(VertexTrait.InstrumentedCommunicationInterconnect) else 0
@@ -914,7 +917,7 @@ def identify_time_triggered_platform(
 # class SDFToCoresRule(IdentificationRule):
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[SDFExecution, TimeTriggeredPlatform], produces=[TaskScheduling])
 def identify_jobs_sdf_time_trigger_multicore(model: ForSyDeModel, identified: List[DecisionModel]):
     """This 'IdentificationRule' identifies processing units
 
@@ -926,6 +929,7 @@ def identify_jobs_sdf_time_trigger_multicore(model: ForSyDeModel, identified: Li
     is _always_ the one chosen for data communication. Regardless on how
     the 'AbstractCommunicationComponent' communicates.
     """
+    queries = get_model_queries(model)
     sdf_app_sub = next((p for p in identified if isinstance(p, SDFExecution)), None)
     time_trig_platform_sub = next((p for p in identified if isinstance(p, TimeTriggeredPlatform)), None)
     # all things to be identified are already there but not dependent model
@@ -937,16 +941,17 @@ def identify_jobs_sdf_time_trigger_multicore(model: ForSyDeModel, identified: Li
     jobs, weak_next, strong_next = sdf_lib.sdf_to_jobs(
         sdf_app_sub.sdf_actors,
         sdf_app_sub.sdf_channels,
-        sdf_app_sub.sdf_topology,
+        sdf_app_sub.sdf_channel_rates,
         sdf_app_sub.sdf_repetition_vector,
         sdf_app_sub.sdf_initial_tokens,
+        reduced=True,
     )
-    goals_vertexes = [v for v in model if v.has_trait(VertexTrait.Goal)]
-    throughput_vertexes = [v for v in goals_vertexes if v.has_trait(VertexTrait.MinimumThroughput)]
+    goals_vertexes = queries.vertexes_with_trait(VertexTrait.Goal)
+    throughput_vertexes = [v for v in goals_vertexes if queries.has_trait(v, VertexTrait.MinimumThroughput)]
     throughput_importance = 0
     latency_importance = 0
     # check that all actors are covered by a throughput goal
-    if all(nx.has_path(model, g, a) for g in throughput_vertexes for a in sdf_app_sub.sdf_actors):
+    if all(queries.has_path(g, a) for g in throughput_vertexes for a in sdf_app_sub.sdf_actors):
         throughput_importance = max((int(v.properties["apriori_importance"]) for v in throughput_vertexes), default=0)
     comm_channels = {
         ((jsi, js), (jti, jt)): sdf_app_sub.sdf_channels[(js, jt)]
@@ -985,13 +990,14 @@ def identify_jobs_sdf_time_trigger_multicore(model: ForSyDeModel, identified: Li
     return (True, res)
 
 
-@register_identification_rule
+@register_identification_rule(consumes=[TaskScheduling], produces=[TaskScheduling])
 def identify_jobs_insturmentation_vertexes(
     model: ForSyDeModel, identified: List[DecisionModel]
 ) -> IdentificationOutput:
+    queries = get_model_queries(model)
     sub_jobs: Sequence[TaskScheduling] = [p for p in identified if isinstance(p, TaskScheduling)]
-    wcet_vertexes = set(li for li in model if li.has_trait(VertexTrait.WCET))
-    wcct_vertexes = set(li for li in model if li.has_trait(VertexTrait.WCCT))
+    wcet_vertexes = set(queries.vertexes_with_trait(VertexTrait.WCET))
+    wcct_vertexes = set(queries.vertexes_with_trait(VertexTrait.WCCT))
     abstracted = wcet_vertexes | wcct_vertexes
     # check if any of the sub problems already covered the requirements
     if any(all(v in sub.covered_vertexes() for v in abstracted) for sub in sub_jobs):
@@ -0,0 +1,111 @@
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Type
+
+from forsyde.io.python.api import ForSyDeModel
+from idesyde.identification.interfaces import DecisionModel
+
+IdentificationRuleType = Callable[[ForSyDeModel, List[DecisionModel]], Tuple[bool, Optional[DecisionModel]]]
+
+
+class RuleScheduler(object):
+    """Decides which identification rules are worth calling at each step.
+
+    Every rule declares the DecisionModel types it consumes. Since the
+    design model does not change during identification, calling a rule
+    again can only give a different answer if new decision models of
+    these types have been identified since its last call. Therefore, a rule
+    is only _due_ if:
+
+        1. it has never been called, or,
+        2. new decision models of the types it consumes were identified
+           since it was last called, or,
+        3. it produced a decision model in its last call without reaching
+           its fixpoint, i.e. it may still have more to give.
+
+    Rules that reach their fixpoint are never called again.
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[IdentificationRuleType],
+        consumes: Mapping[IdentificationRuleType, Tuple[Type[DecisionModel], ...]] = {},
+    ):
+        self.rules = list(rules)
+        # rules that do not declare anything are assumed to consume everything
+        self._consumes: Dict[IdentificationRuleType, Tuple[Type[DecisionModel], ...]] = {
+            rule: tuple(consumes.get(rule, (DecisionModel,))) for rule in self.rules
+        }
+        self._pending: List[IdentificationRuleType] = list(self.rules)
+        # amount of identified models that each rule has already seen
+        self._seen: Dict[IdentificationRuleType, int] = {}
+        self._productive: Set[IdentificationRuleType] = set()
+
+    def pending_rules(self) -> List[IdentificationRuleType]:
+        """Get the rules that have not reached their fixpoint yet, in order."""
+        return list(self._pending)
+
+    def has_pending(self) -> bool:
+        return len(self._pending) > 0
+
+    def is_pending(self, rule: IdentificationRuleType) -> bool:
+        """Check if 'rule' has not reached its fixpoint yet."""
+        return rule in self._pending
+
+    def is_due(self, rule: IdentificationRuleType, identified: Sequence[DecisionModel]) -> bool:
+        """Check if calling 'rule' can possibly identify something new
+
+        Arguments:
+            rule: a rule that was given to this scheduler.
+            identified: all decision models identified so far.
+
+        Returns:
+            True if the rule should be called with 'identified', False otherwise.
+        """
+        if rule not in self._pending:
+            return False
+        if rule not in self._seen or rule in self._productive:
+            return True
+        return self.consumes_any(rule, identified[self._seen[rule] :])
+
+    def consumes_any(self, rule: IdentificationRuleType, models: Sequence[DecisionModel]) -> bool:
+        """Check if any of 'models' is of a type that 'rule' consumes."""
+        consumed = self._consumes[rule]
+        return len(consumed) > 0 and any(isinstance(m, consumed) for m in models)
+
+    def due_rules(self, identified: Sequence[DecisionModel]) -> List[IdentificationRuleType]:
+        """Get all the rules that are due for 'identified', in order."""
+        return [rule for rule in self._pending if self.is_due(rule, identified)]
+
+    def mark_seen(self, rule: IdentificationRuleType, seen: int) -> None:
+        """Record that 'rule' has already been called with 'seen' identified models
+
+        This is useful when the identification starts from decision models
+        that were identified previously, so that rules are not woken up by them.
+        """
+        self._seen[rule] = seen
+
+    def notify(
+        self, rule: IdentificationRuleType, seen: int, fixed: bool, subprob: Optional[DecisionModel]
+    ) -> None:
+        """Record the outcome of calling 'rule'
+
+        Arguments:
+            rule: the rule that was called.
+            seen: the amount of identified models given to the rule in the call.
+            fixed: the fixpoint flag returned by the rule.
+            subprob: the decision model returned by the rule, if any.
+        """
+        self._seen[rule] = seen
+        if subprob:
+            self._productive.add(rule)
+        else:
+            self._productive.discard(rule)
+        if fixed and rule in self._pending:
+            self._pending.remove(rule)
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from urllib.parse import unquote
+from urllib.parse import urlparse
+
+import forsyde.io.python.api as forsyde_io
+from forsyde.io.python.api import ForSyDeModel
+
+from idesyde import LOGGER_NAME
+from idesyde.identification.api import _get_registered_rules
+from idesyde.identification.api import identify_decision_models_stream_async
+from idesyde.identification.cache import IdentificationCache
+from idesyde.identification.interfaces import DecisionModel
+
+_logger = logging.getLogger(LOGGER_NAME)
+
+
+def _url_to_path(url: str) -> str:
+    parsed = urlparse(url)
+    if parsed.scheme in ("", "file"):
+        return unquote(parsed.path) if parsed.scheme else url
+    raise ValueError(f"Only local design models are supported, got {url}")
+
+
+def _result_message(m: DecisionModel, fixed: bool) -> Dict[str, Any]:
+    # same fields as 'IdentificationResult' in interfaces.proto3, but the decision
+    # models live only in the server, so there is no 'decision_model_url' to give
+    return {
+        "fixed": fixed,
+        "decision_model_ids": m.short_name(),
+    }
+
+
+class _Identification(object):
+    """An identification in progress, followed by every request for the same design model."""
+
+    def __init__(self, stamp: Tuple[float, int]):
+        self.stamp = stamp
+        self.results: List[Tuple[DecisionModel, bool]] = []
+        self.finished = False
+        self.error: Optional[Exception] = None
+        self.task: Optional["asyncio.Future[None]"] = None
+        self._changed = asyncio.Condition()
+
+    async def add(self, m: DecisionModel, fixed: bool) -> None:
+        async with self._changed:
+            self.results.append((m, fixed))
+            self._changed.notify_all()
+
+    async def finish(self, error: Optional[Exception] = None) -> None:
+        async with self._changed:
+            self.finished = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def follow(self) -> AsyncIterator[Tuple[DecisionModel, bool]]:
+        """Yield all results, the ones already identified and then the new ones as they come."""
+        seen = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: seen < len(self.results) or self.finished)
+                new = self.results[seen:]
+                finished = self.finished
+            for res in new:
+                yield res
+            seen += len(new)
+            if finished and seen == len(self.results):
+                if self.error:
+                    raise self.error
+                return
+
+
+class IdentificationServer(object):
+    """Resident implementation of the IdentificationService of interfaces.proto3
+
+    The service is offered over a Unix socket or a localhost TCP port with a
+    protocol of JSON lines. Every request is one line with a 'method', which is
+    one of 'CanIdentify', 'Identify' or 'Shutdown', and its 'params', named as
+    the fields of the messages in interfaces.proto3. Every answer is one line
+    with either a 'result' or an 'error'. 'Identify' answers with one line per
+    identified decision model, as soon as it is identified, followed by a line
+    with 'done' set to true.
+
+    Parsed design models and their identified decision models are kept in memory
+    between requests, and are only reloaded if the model file changes. If a
+    'cache' is given, the identifications are also stored in it. Requests for a
+    design model that is already being identified follow that identification
+    instead of starting another one.
+    """
+
+    def __init__(self, cache: Optional[IdentificationCache] = None):
+        self.rules = list(_get_registered_rules())
+        self.cache = cache
+        # path -> ((mtime, size), model)
+        self._models: Dict[str, Tuple[Tuple[float, int], ForSyDeModel]] = dict()
+        # path -> ((mtime, size), identified models with their fixpoint flags)
+        self._identified: Dict[str, Tuple[Tuple[float, int], List[Tuple[DecisionModel, bool]]]] = dict()
+        # path -> identification in progress
+        self._running: Dict[str, _Identification] = dict()
+        self._stopped: Optional[asyncio.Event] = None
+
+    def _stamp(self, path: str) -> Tuple[float, int]:
+        stat = os.stat(path)
+        return (stat.st_mtime, stat.st_size)
+
+    def load(self, url: str) -> ForSyDeModel:
+        """Get the design model at 'url', parsing it only if it is new or changed."""
+        path = os.path.abspath(_url_to_path(url))
+        stamp = self._stamp(path)
+        if path not in self._models or self._models[path][0] != stamp:
+            self._models[path] = (stamp, forsyde_io.load_model(path))
+            self._identified.pop(path, None)
+        return self._models[path][1]
+
+    def can_identify(self, design_model_url: str) -> bool:
+        try:
+            self.load(design_model_url)
+            return True
+        except Exception as e:
+            _logger.debug(f"Cannot identify {design_model_url}: {e}")
+            return False
+
+    async def identify(self, design_model_url: str, decision_model_ids: List[str] = []):
+        """Identify the design model at 'design_model_url', yielding results as they come
+
+        Arguments:
+            design_model_url: path or file URL of the design model.
+            decision_model_ids: if not empty, only the decision models with these short names are reported.
+        """
+        model = self.load(design_model_url)
+        path = os.path.abspath(_url_to_path(design_model_url))
+        stamp = self._models[path][0]
+        if path in self._identified and self._identified[path][0] == stamp:
+            results = self._identified[path][1]
+        else:
+            results = self.cache.load_stream(model, self.rules) if self.cache else None
+            if results is not None:
+                self._identified[path] = (stamp, results)
+        if results is not None:
+            for (m, fixed) in results:
+                if not decision_model_ids or m.short_name() in decision_model_ids:
+                    yield _result_message(m, fixed)
+            return
+        running = self._running.get(path, None)
+        if running is None or running.stamp != stamp:
+            running = _Identification(stamp)
+            self._running[path] = running
+            running.task = asyncio.ensure_future(self._run(path, model, running))
+        async for (m, fixed) in running.follow():
+            if not decision_model_ids or m.short_name() in decision_model_ids:
+                yield _result_message(m, fixed)
+
+    async def _run(self, path: str, model: ForSyDeModel, running: _Identification) -> None:
+        # runs to the end even if the requests following it are gone, so that the result is kept
+        try:
+            async for (m, fixed) in identify_decision_models_stream_async(model, self.rules):
+                await running.add(m, fixed)
+            if self.cache:
+                self.cache.store(
+                    model, self.rules, [m for (m, _) in running.results], fixed=[f for (_, f) in running.results]
+                )
+            self._identified[path] = (running.stamp, running.results)
+            await running.finish()
+        except Exception as e:
+            _logger.warning(f"Identification of {path} failed: {e}")
+            await running.finish(e)
+        finally:
+            if self._running.get(path, None) is running:
+                self._running.pop(path)
+
+    async def _write(self, writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+        writer.write((json.dumps(message) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while not reader.at_eof():
+                line = await reader.readline()
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    method = request.get("method", None)
+                    params = request.get("params", dict())
+                    if method == "CanIdentify":
+                        await self._write(writer, {"result": self.can_identify(params["design_model_url"])})
+                    elif method == "Identify":
+                        async for res in self.identify(
+                            params["design_model_url"], params.get("decision_model_ids", [])
+                        ):
+                            await self._write(writer, {"result": res})
+                        await self._write(writer, {"done": True})
+                    elif method == "Shutdown":
+                        await self._write(writer, {"result": None})
+                        if self._stopped:
+                            self._stopped.set()
+                        break
+                    else:
+                        await self._write(writer, {"error": f"Unknown method {method}"})
+                except Exception as e:
+                    _logger.warning(f"Identification request failed: {e}")
+                    await self._write(writer, {"error": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, unix_socket: Optional[str] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Serve requests until a 'Shutdown' request arrives
+
+        If 'unix_socket' is given, the server listens on it, otherwise on 'host' and 'port'.
+        """
+        self._stopped = asyncio.Event()
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            server = await asyncio.start_unix_server(self._handle, path=unix_socket)
+        else:
+            server = await asyncio.start_server(self._handle, host=host, port=port)
+        for sock in server.sockets:
+            _logger.info(f"Identification service listening on {sock.getsockname()}")
+        await self._stopped.wait()
+        server.close()
+        await server.wait_closed()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+
+class IdentificationClient(object):
+    """Blocking client for an 'IdentificationServer'."""
+
+    def __init__(self, unix_socket: Optional[str] = None, host: str = "127.0.0.1", port: int = 0):
+        if unix_socket:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(unix_socket)
+        else:
+            self._sock = socket.create_connection((host, port))
+        self._file = self._sock.makefile("rwb")
+
+    def __enter__(self) -> "IdentificationClient":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _request(self, method: str, params: Dict[str, Any]) -> None:
+        self._file.write((json.dumps({"method": method, "params": params}) + "\n").encode("utf-8"))
+        self._file.flush()
+
+    def _answer(self) -> Dict[str, Any]:
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Identification service closed the connection")
+        answer = json.loads(line)
+        if "error" in answer:
+            raise RuntimeError(answer["error"])
+        return answer
+
+    def can_identify(self, design_model_url: str) -> bool:
+        self._request("CanIdentify", {"design_model_url": design_model_url})
+        return bool(self._answer()["result"])
+
+    def identify(self, design_model_url: str, decision_model_ids: List[str] = []) -> Iterator[Dict[str, Any]]:
+        """Yield the 'IdentificationResult's of the design model as the server sends them."""
+        self._request("Identify", {"design_model_url": design_model_url, "decision_model_ids": decision_model_ids})
+        while True:
+            answer = self._answer()
+            if answer.get("done", False):
+                break
+            yield answer["result"]
+
+    def shutdown(self) -> None:
+        self._request("Shutdown", dict())
+        self._answer()
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+
+def server_entry() -> None:
+    parser = argparse.ArgumentParser(
+        prog="idesyde.identification.server", description="Resident IDeSyDe identification service."
+    )
+    parser.add_argument("--socket", type=str, default=None, help="Unix socket to listen on.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to listen on, if no socket is given.")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on, if no socket is given.")
+    parser.add_argument("--cache", action="store_true", help="Use the persistent identification cache.")
+    parser.add_argument(
+        "--cache-dir", type=str, default=None, help="Directory of the identification cache, which implies --cache."
+    )
+    args = parser.parse_args()
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+    server = IdentificationServer(IdentificationCache(args.cache_dir) if args.cache or args.cache_dir else None)
+    asyncio.get_event_loop().run_until_complete(server.serve(args.socket, args.host, args.port))
+
+
+if __name__ == "__main__":
+    server_entry()
@@ -0,0 +1,169 @@
+import itertools
+import json
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from idesyde.identification.interfaces import DecisionModel
+from idesyde.identification.scheduling import IdentificationRuleType
+
+
+def rule_name(rule: IdentificationRuleType) -> str:
+    return getattr(rule, "__name__", repr(rule))
+
+
+@dataclass
+class RuleInvocation:
+    """One call of an identification rule, with times in seconds since the start of the trace.
+
+    The worker is 0 if the rule was called by the identification process itself.
+    """
+
+    rule: str
+    iteration: int
+    start: float
+    duration: float
+    fixed: bool
+    identified: Optional[str] = None
+    identified_size: int = 0
+    worker: int = 0
+
+
+@dataclass
+class IterationSummary:
+    """One iteration of the identification loop, with times in seconds since the start of the trace."""
+
+    iteration: int
+    start: float
+    duration: float
+    rules_called: int = 0
+    rules_identified: int = 0
+    total_identified: int = 0
+
+
+@dataclass
+class IdentificationTrace:
+    """Record of what happened during an identification procedure
+
+    It is filled by the identification functions of 'idesyde.identification.api'
+    when given to them, and can be exported as plain JSON or in the Chrome
+    trace-event format, which can be opened with 'chrome://tracing' or Perfetto.
+    """
+
+    invocations: List[RuleInvocation] = field(default_factory=list)
+    iterations: List[IterationSummary] = field(default_factory=list)
+    origin: float = field(default_factory=time.time)
+
+    def now(self) -> float:
+        return time.time()
+
+    def record_rule(
+        self,
+        rule: IdentificationRuleType,
+        iteration: int,
+        start: float,
+        end: float,
+        fixed: bool,
+        subprob: Optional[DecisionModel],
+        worker: int = 0,
+    ) -> None:
+        """Record a rule call that started and ended at the wall times 'start' and 'end'."""
+        self.invocations.append(
+            RuleInvocation(
+                rule=rule_name(rule),
+                iteration=iteration,
+                start=start - self.origin,
+                duration=end - start,
+                fixed=fixed,
+                identified=subprob.short_name() if subprob else None,
+                identified_size=len(subprob.covered_vertexes_index()) if subprob else 0,
+                worker=worker,
+            )
+        )
+
+    def record_iteration(self, iteration: int, start: float, end: float, total_identified: int) -> None:
+        """Summarize the rule calls of 'iteration', which started and ended at the wall times 'start' and 'end'."""
+        calls = list(itertools.takewhile(lambda i: i.iteration == iteration, reversed(self.invocations)))
+        self.iterations.append(
+            IterationSummary(
+                iteration=iteration,
+                start=start - self.origin,
+                duration=end - start,
+                rules_called=len(calls),
+                rules_identified=sum(1 for i in calls if i.identified),
+                total_identified=total_identified,
+            )
+        )
+
+    def rule_totals(self) -> Dict[str, Tuple[int, float]]:
+        """Get the number of calls and the total time of every rule, slowest first."""
+        totals: Dict[str, Tuple[int, float]] = dict()
+        for i in self.invocations:
+            (calls, total) = totals.get(i.rule, (0, 0.0))
+            totals[i.rule] = (calls + 1, total + i.duration)
+        return dict(sorted(totals.items(), key=lambda kv: kv[1][1], reverse=True))
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "invocations": [asdict(i) for i in self.invocations],
+            "iterations": [asdict(i) for i in self.iterations],
+            "rules": {r: {"calls": c, "total": t} for (r, (c, t)) in self.rule_totals().items()},
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        # rules run in workers get their own threads, so that
+        # the iterations enclose the sequential calls in the viewer
+        events: List[Dict[str, Any]] = []
+        for it in self.iterations:
+            events.append(
+                {
+                    "name": f"iteration {it.iteration}",
+                    "cat": "iteration",
+                    "ph": "X",
+                    "ts": it.start * 1e6,
+                    "dur": it.duration * 1e6,
+                    "pid": 0,
+                    "tid": 0,
+                    "args": {
+                        "rules_called": it.rules_called,
+                        "rules_identified": it.rules_identified,
+                        "total_identified": it.total_identified,
+                    },
+                }
+            )
+        for i in self.invocations:
+            events.append(
+                {
+                    "name": i.rule,
+                    "cat": "rule",
+                    "ph": "X",
+                    "ts": i.start * 1e6,
+                    "dur": i.duration * 1e6,
+                    "pid": 0,
+                    "tid": i.worker,
+                    "args": {
+                        "iteration": i.iteration,
+                        "fixed": i.fixed,
+                        "identified": i.identified,
+                        "identified_size": i.identified_size,
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str, trace_format: str = "json") -> None:
+        """Write the trace to 'path' either as 'json' or as 'chrome' trace events."""
+        if trace_format == "json":
+            data = self.to_json()
+        elif trace_format == "chrome":
+            data = self.to_chrome_trace()
+        else:
+            raise ValueError(f"Unknown trace format {trace_format}, expected 'json' or 'chrome'.")
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
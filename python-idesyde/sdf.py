@@ -1,14 +1,275 @@
-from idesyde.identification.models import JobType
+import heapq
+import itertools
+import math
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from dataclasses import field
+from fractions import Fraction
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Set
 from typing import Sequence
 from typing import Optional
 from typing import Mapping
 from typing import Tuple
 from typing import Collection
+from typing import Union
 
 # import numpy as np
 from forsyde.io.python.core import Vertex
 
+JobType = Tuple[int, Vertex]
+# a channel as (source actor, target actor, production, consumption)
+SDFChannel = Tuple[int, int, int, int]
+# (count, actor) firings and (count, body) loops, the body being a looped schedule itself
+LoopedSchedule = List[Tuple[int, Union[int, List[Any]]]]
+
+
+class SDFInconsistencyError(ValueError):
+    """Raised when the balance equations of a SDF graph have no positive solution
+
+    Attributes:
+        reason: what is wrong with the channel.
+        channel: index of the first channel (row of the topology matrix) found to conflict.
+    """
+
+    def __init__(self, reason: str, channel: int):
+        super().__init__(f"Channel {channel} {reason}")
+        self.reason = reason
+        self.channel = channel
+
+
+def topology_to_channels(sdf_topology: List[List[int]]) -> List[SDFChannel]:
+    """Get the channels of a SDF topology matrix
+
+    Rows without any production or consumption become channels with zero rates
+    from and to the first actor, as they do not constrain anything.
+
+    Raises:
+        SDFInconsistencyError: if a row does not have exactly one producer and
+            one consumer, or none at all.
+    """
+    channels: List[SDFChannel] = []
+    for (cidx, row) in enumerate(sdf_topology):
+        rates = [(aidx, r) for (aidx, r) in enumerate(row) if r != 0]
+        if not rates:
+            channels.append((0, 0, 0, 0))
+        elif len(rates) == 1:
+            raise SDFInconsistencyError("only produces or only consumes tokens.", cidx)
+        elif len(rates) > 2:
+            raise SDFInconsistencyError("connects more than two actors.", cidx)
+        else:
+            ((a, ra), (b, rb)) = rates
+            if (ra > 0) == (rb > 0):
+                raise SDFInconsistencyError("has two producers or two consumers.", cidx)
+            channels.append((a, b, ra, -rb) if ra > 0 else (b, a, rb, -ra))
+    return channels
+
+
+def channels_to_topology(num_actors: int, channels: Sequence[SDFChannel]) -> List[List[int]]:
+    """Get the dense topology matrix of SDF channels, e.g. for MiniZinc data."""
+    sdf_topology = [[0 for _ in range(num_actors)] for _ in channels]
+    for (cidx, (src, dst, prod, cons)) in enumerate(channels):
+        if prod != 0 or cons != 0:
+            sdf_topology[cidx][src] += prod
+            sdf_topology[cidx][dst] -= cons
+    return sdf_topology
+
+
+def get_repetition_vector(sdf_topology: List[List[int]]) -> List[int]:
+    """Returns the repetition vector of a SDF graph given by its topology matrix
+
+    See 'channels_repetition_vector', which does the actual work.
+
+    Arguments:
+        sdf_topology: The topology matrix of the SDF graph, with one row per
+            channel, positive for the producer and negative for the consumer.
+    """
+    num_actors = len(sdf_topology[0]) if sdf_topology else 0
+    return channels_repetition_vector(num_actors, topology_to_channels(sdf_topology))
+
+
+def channels_repetition_vector(num_actors: int, channels: Sequence[SDFChannel]) -> List[int]:
+    """Returns the repetition vector of a SDF graph
+
+    The balance equations are solved exactly by propagating rational firing
+    ratios along the channels of every connected component of the graph, so it
+    takes time linear in the number of actors and channels. Each component is
+    then scaled independently to the smallest positive integers.
+
+    Arguments:
+        num_actors: The number of actors of the SDF graph.
+        channels: The channels of the SDF graph.
+
+    Returns:
+        Number of firings for each actor.
+
+    Raises:
+        SDFInconsistencyError: at the first channel whose rates contradict the
+            ones propagated so far, or that has no positive solution at all.
+    """
+    # channels as (channel, rate, other actor, other rate), indexed by actor
+    incident: List[List[Tuple[int, int, int, int]]] = [[] for _ in range(num_actors)]
+    for (cidx, (src, dst, prod, cons)) in enumerate(channels):
+        if prod == 0 and cons == 0:
+            continue
+        elif prod <= 0 or cons <= 0:
+            raise SDFInconsistencyError("only produces or only consumes tokens.", cidx)
+        elif src == dst:
+            if prod != cons:
+                raise SDFInconsistencyError("is a self loop that does not produce what it consumes.", cidx)
+            continue
+        incident[src].append((cidx, prod, dst, -cons))
+        incident[dst].append((cidx, -cons, src, prod))
+    ratios: List[Optional[Fraction]] = [None for _ in range(num_actors)]
+    repetition_vector = [0 for _ in range(num_actors)]
+    for root in range(num_actors):
+        if ratios[root] is not None:
+            continue
+        ratios[root] = Fraction(1)
+        component = [root]
+        stack = [root]
+        while stack:
+            a = stack.pop()
+            for (cidx, ra, b, rb) in incident[a]:
+                # ra * q[a] + rb * q[b] = 0
+                expected = -ratios[a] * ra / rb
+                if ratios[b] is None:
+                    ratios[b] = expected
+                    component.append(b)
+                    stack.append(b)
+                elif ratios[b] != expected:
+                    raise SDFInconsistencyError("is inconsistent with the rest of the graph.", cidx)
+        denominators = 1
+        for a in component:
+            denominators = denominators * ratios[a].denominator // math.gcd(denominators, ratios[a].denominator)
+        numerators = 0
+        for a in component:
+            numerators = math.gcd(numerators, ratios[a].numerator * (denominators // ratios[a].denominator))
+        for a in component:
+            repetition_vector[a] = ratios[a].numerator * (denominators // ratios[a].denominator) // numerators
+    return repetition_vector
+
+
+@dataclass
+class SDFComponent:
+    """A weakly connected part of a SDF graph and its analysis
+
+    Actors and channels are indexes in the whole graph, in increasing order.
+    The repetition vector is aligned with 'actors' and the schedule is a PASS
+    of the component as a looped schedule, in whole-graph actor indexes. If the component is
+    inconsistent or deadlocks, 'error' says why and both are empty.
+    """
+
+    actors: List[int] = field(default_factory=list)
+    channels: List[int] = field(default_factory=list)
+    repetition_vector: List[int] = field(default_factory=list)
+    schedule: LoopedSchedule = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def sdf_components(num_actors: int, channels: Sequence[SDFChannel]) -> List[SDFComponent]:
+    """Split a SDF graph into its weakly connected components, not yet analysed
+
+    Channels without any production or consumption do not connect actors and
+    belong to no component.
+    """
+    parent = list(range(num_actors))
+
+    def find(a: int) -> int:
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    for (src, dst, prod, cons) in channels:
+        if prod != 0 or cons != 0:
+            parent[find(dst)] = find(src)
+    by_root: Dict[int, SDFComponent] = {}
+    for aidx in range(num_actors):
+        by_root.setdefault(find(aidx), SDFComponent()).actors.append(aidx)
+    for (cidx, (src, _, prod, cons)) in enumerate(channels):
+        if prod != 0 or cons != 0:
+            by_root[find(src)].channels.append(cidx)
+    return list(by_root.values())
+
+
+def _analyse_component(
+    num_actors: int, sub_channels: List[SDFChannel], sub_tokens: List[int], channels: List[int]
+) -> Tuple[List[int], LoopedSchedule, Optional[str]]:
+    # module level so that it can be sent to worker processes
+    try:
+        repetition_vector = channels_repetition_vector(num_actors, sub_channels)
+    except SDFInconsistencyError as e:
+        return ([], [], str(SDFInconsistencyError(e.reason, channels[e.channel])))
+    schedule = channels_looped_PASS(num_actors, sub_channels, repetition_vector, sub_tokens)
+    if sum(repetition_vector) > 0 and not schedule:
+        return ([], [], "No PASS exists, the initial tokens are not enough to avoid a deadlock.")
+    return (repetition_vector, schedule, None)
+
+
+def analyse_sdf_components(
+    num_actors: int,
+    channels: Sequence[SDFChannel],
+    initial_tokens: Optional[List[int]] = None,
+    parallel_threshold: int = 2000,
+    max_workers: Optional[int] = None,
+) -> List[SDFComponent]:
+    """Compute the repetition vector and a PASS of every weakly connected component of a SDF graph
+
+    The components are analysed independently, so an inconsistent component
+    does not prevent the others from being analysed. If there are many
+    components and at least 'parallel_threshold' actors in total, they are
+    analysed in a pool of 'max_workers' processes, or serially if the pool fails.
+
+    Arguments:
+        num_actors: The number of actors of the SDF graph.
+        channels: The channels of the SDF graph.
+        initial_tokens: Initial tokens in each channel.
+        parallel_threshold: Minimum number of actors to analyse the components in parallel.
+        max_workers: Size of the process pool, by default the number of processors.
+
+    Returns:
+        The components of the graph, analysed.
+    """
+    tokens = initial_tokens if initial_tokens is not None else [0 for _ in channels]
+    components = sdf_components(num_actors, channels)
+    inputs = []
+    for c in components:
+        local = {a: i for (i, a) in enumerate(c.actors)}
+        sub_channels = [
+            (local[src], local[dst], prod, cons) for (src, dst, prod, cons) in (channels[cidx] for cidx in c.channels)
+        ]
+        inputs.append((len(c.actors), sub_channels, [tokens[cidx] for cidx in c.channels], c.channels))
+    results: List[Tuple[List[int], LoopedSchedule, Optional[str]]] = []
+    # daemonic processes, like the identification workers, cannot have children
+    if (
+        len(components) > 1
+        and num_actors >= parallel_threshold
+        and not multiprocessing.current_process().daemon
+    ):
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(_analyse_component, *zip(*inputs)))
+        except (OSError, BrokenProcessPool, pickle.PicklingError):
+            # no processes available, a worker died or something could not be sent
+            # between them. Errors of the analysis itself are not hidden
+            results = []
+    if not results:
+        results = [_analyse_component(*args) for args in inputs]
+    for (c, (repetition_vector, schedule, error)) in zip(components, results):
+        c.repetition_vector = repetition_vector
+        c.schedule = map_looped_schedule(schedule, c.actors.__getitem__)
+        c.error = error
+    return components
+
 
 def get_PASS(
     sdf_topology: List[List[int]], repetition_vector: List[int], initial_tokens: Optional[List[int]] = None
@@ -16,8 +277,8 @@ def get_PASS(
     """Returns the PASS of a SDF graph
 
     The calculation follows almost exactly what is dictated in the
-    87 paper by LSV (Reference to be added later), except with some
-    minor adaptations for numpy usage.
+    87 paper by LSV (Reference to be added later): at every step, the
+    first actor (by index) that can fire is fired.
 
     Arguments:
         sdf_topology: The topology matrix of the SDF graph.
@@ -34,45 +295,489 @@ def get_PASS(
 
             Actor 1 fires, then 9 then 4.
     """
+    incidence: List[List[Tuple[int, int]]] = [[] for _ in repetition_vector]
+    for (channeln, row) in enumerate(sdf_topology):
+        for (idx, rate) in enumerate(row):
+            if rate != 0:
+                incidence[idx].append((channeln, rate))
     tokens = [b for b in initial_tokens] if initial_tokens is not None else [0 for _ in sdf_topology]
+    return _pass_from_incidence(incidence, repetition_vector, tokens)
+
+
+def channels_PASS(
+    num_actors: int,
+    channels: Sequence[SDFChannel],
+    repetition_vector: List[int],
+    initial_tokens: Optional[List[int]] = None,
+) -> List[int]:
+    """Same as 'get_PASS', but for a SDF graph given by its channels."""
+    incidence = _channels_incidence(num_actors, channels)
+    tokens = [b for b in initial_tokens] if initial_tokens is not None else [0 for _ in channels]
+    return _pass_from_incidence(incidence, repetition_vector, tokens)
+
+
+def channels_looped_PASS(
+    num_actors: int,
+    channels: Sequence[SDFChannel],
+    repetition_vector: List[int],
+    initial_tokens: Optional[List[int]] = None,
+) -> LoopedSchedule:
+    """Same as 'channels_PASS', but returning it as a looped schedule (see 'looped_schedule')
+
+    The PASS is compressed while it is built, so the flat sequence of firings is never stored.
+    """
+    tokens = [b for b in initial_tokens] if initial_tokens is not None else [0 for _ in channels]
+    schedule = looped_schedule(
+        _iter_pass_from_incidence(_channels_incidence(num_actors, channels), repetition_vector, tokens)
+    )
+    # if the schedule could not be built, return an empty list
+    if looped_schedule_length(schedule) < sum(repetition_vector):
+        return []
+    else:
+        return schedule
+
+
+def _channels_incidence(num_actors: int, channels: Sequence[SDFChannel]) -> List[List[Tuple[int, int]]]:
+    incidence: List[List[Tuple[int, int]]] = [[] for _ in range(num_actors)]
+    for (channeln, (src, dst, prod, cons)) in enumerate(channels):
+        if src == dst:
+            if prod != cons:
+                incidence[src].append((channeln, prod - cons))
+        else:
+            if prod != 0:
+                incidence[src].append((channeln, prod))
+            if cons != 0:
+                incidence[dst].append((channeln, -cons))
+    return incidence
+
+
+def _iter_pass_from_incidence(
+    incidence: List[List[Tuple[int, int]]], repetition_vector: List[int], tokens: List[int]
+) -> Iterator[int]:
+    # 'incidence' has the (channel, rate) pairs of every actor and 'tokens' is updated in place.
+    # Instead of trying every actor at every step, the actors that can fire are kept
+    # in a heap, and only the neighbours of the fired actor are checked again,
+    # so every firing costs time proportional to the channels around it.
+    # It stops early if the PASS cannot be completed.
     repetition = [q for q in repetition_vector]
-    firings: List[int] = []
-    num_firings = sum(repetition)
-    # we know the maximum number of steps
-    for _ in range(num_firings):
-        # we try firing every actor
-        for (idx, q) in enumerate(repetition):
-            # if they can be fired
-            if q > 0:
-                # we do the do product
-                for (channeln, col) in enumerate(sdf_topology):
-                    tokens[channeln] += col[idx]
-                # and check if anything didnt go negative
-                if all(v >= 0 for v in tokens):
-                    repetition[idx] -= 1
-                    firings.append(idx)
-                    break
-                # if so, we roll back and try gain
-                else:
-                    for (channeln, col) in enumerate(sdf_topology):
-                        tokens[channeln] -= col[idx]
+    by_channel: Dict[int, List[int]] = {}
+    for (idx, channels) in enumerate(incidence):
+        for (channeln, _) in channels:
+            by_channel.setdefault(channeln, []).append(idx)
+    neighbours: List[Set[int]] = [set() for _ in incidence]
+    for actors in by_channel.values():
+        for idx in actors:
+            neighbours[idx].update(a for a in actors if a != idx)
+
+    def can_fire(idx: int) -> bool:
+        return repetition[idx] > 0 and all(tokens[channeln] + rate >= 0 for (channeln, rate) in incidence[idx])
+
+    ready = [idx for idx in range(len(incidence)) if can_fire(idx)]
+    in_heap = [False for _ in incidence]
+    for idx in ready:
+        in_heap[idx] = True
+    while ready:
+        idx = heapq.heappop(ready)
+        in_heap[idx] = False
+        # the tokens may have changed since it was pushed
+        if not can_fire(idx):
+            continue
+        for (channeln, rate) in incidence[idx]:
+            tokens[channeln] += rate
+        repetition[idx] -= 1
+        yield idx
+        for other in itertools.chain((idx,), neighbours[idx]):
+            if not in_heap[other] and can_fire(other):
+                in_heap[other] = True
+                heapq.heappush(ready, other)
+
+
+def _pass_from_incidence(
+    incidence: List[List[Tuple[int, int]]], repetition_vector: List[int], tokens: List[int]
+) -> List[int]:
+    firings = list(_iter_pass_from_incidence(incidence, repetition_vector, tokens))
     # if the schedule could not be built, return an empty list
-    if len(firings) < num_firings:
+    if len(firings) < sum(repetition_vector):
         return []
     else:
         return firings
 
 
+def looped_schedule(firings: Iterable[int], max_block: int = 16) -> LoopedSchedule:
+    """Compress a sequence of actor firings into a looped schedule
+
+    Consecutive firings of the same actor become a single (count, actor)
+    entry, and then consecutive repetitions of blocks of up to 'max_block'
+    entries become (count, block) loops, until nothing else can be folded.
+    For instance, the firings
+
+        [0, 0, 1, 0, 0, 1, 2]
+
+    become
+
+        [(2, [(2, 0), (1, 1)]), (1, 2)]
+
+    The firings are consumed lazily, so they never need to be in memory at once.
+    """
+    schedule: LoopedSchedule = []
+    for idx in firings:
+        if schedule and schedule[-1][1] == idx:
+            schedule[-1] = (schedule[-1][0] + 1, idx)
+        else:
+            schedule.append((1, idx))
+    changed = True
+    while changed:
+        changed = False
+        for block in range(2, min(max_block, len(schedule) // 2) + 1):
+            folded = _fold_blocks(schedule, block)
+            if len(folded) < len(schedule):
+                schedule = folded
+                changed = True
+    return schedule
+
+
+def _fold_blocks(schedule: LoopedSchedule, block: int) -> LoopedSchedule:
+    folded: LoopedSchedule = []
+    i = 0
+    while i < len(schedule):
+        body = schedule[i : i + block]
+        repeats = 1
+        while (
+            i + (repeats + 1) * block <= len(schedule)
+            and schedule[i + repeats * block] == body[0]
+            and schedule[i + repeats * block : i + (repeats + 1) * block] == body
+        ):
+            repeats += 1
+        if repeats > 1:
+            entry = (repeats, body)
+            i += repeats * block
+        else:
+            entry = schedule[i]
+            i += 1
+        # a loop right after a loop with the same body is merged into it
+        if folded and folded[-1][1] == entry[1]:
+            folded[-1] = (folded[-1][0] + entry[0], entry[1])
+        else:
+            folded.append(entry)
+    return folded
+
+
+def iter_looped_schedule(schedule: LoopedSchedule) -> Iterator[int]:
+    """Lazily expand a looped schedule into the actor firings, in order."""
+    for (count, body) in schedule:
+        for _ in range(count):
+            if isinstance(body, int):
+                yield body
+            else:
+                yield from iter_looped_schedule(body)
+
+
+def looped_schedule_length(schedule: LoopedSchedule) -> int:
+    """Get the number of firings of a looped schedule without expanding it."""
+    return sum(count * (1 if isinstance(body, int) else looped_schedule_length(body)) for (count, body) in schedule)
+
+
+def map_looped_schedule(schedule: LoopedSchedule, actor_map: Callable[[int], int]) -> LoopedSchedule:
+    """Get the same looped schedule with every actor index 'a' replaced by 'actor_map(a)'."""
+    return [
+        (count, actor_map(body) if isinstance(body, int) else map_looped_schedule(body, actor_map))
+        for (count, body) in schedule
+    ]
+
+
 def check_sdf_consistency(sdf_topology) -> bool:
     return False
 
 
+@dataclass
+class JobGraph:
+    """The jobs of a SDF graph, numbered with integers, and their precedences
+
+    The jobs of every actor are numbered contiguously, in firing order, so that
+    actor 'a' fires as jobs 'actor_first_job[a]' up to 'actor_first_job[a + 1]' (exclusive).
+    'job_actor' and 'job_firing' give back the actor index and the firing (starting at 1)
+    of every job. The weak and strong precedences are adjacency arrays in CSR form:
+    the successors of job 'j' are 'targets[offsets[j]:offsets[j + 1]]'.
+    """
+
+    actor_first_job: List[int] = field(default_factory=lambda: [0])
+    job_actor: List[int] = field(default_factory=list)
+    job_firing: List[int] = field(default_factory=list)
+    weak_offsets: List[int] = field(default_factory=lambda: [0])
+    weak_targets: List[int] = field(default_factory=list)
+    strong_offsets: List[int] = field(default_factory=lambda: [0])
+    strong_targets: List[int] = field(default_factory=list)
+
+    @property
+    def num_jobs(self) -> int:
+        return len(self.job_actor)
+
+    def job(self, actor: int, firing: int) -> int:
+        """Get the index of the job of 'actor' at 'firing', starting at 1."""
+        return self.actor_first_job[actor] + firing - 1
+
+    def weak_successors(self, job: int) -> List[int]:
+        return self.weak_targets[self.weak_offsets[job] : self.weak_offsets[job + 1]]
+
+    def strong_successors(self, job: int) -> List[int]:
+        return self.strong_targets[self.strong_offsets[job] : self.strong_offsets[job + 1]]
+
+    def _with_precedences(self, weak: Sequence[Sequence[int]], strong: Sequence[Sequence[int]]) -> "JobGraph":
+        (weak_offsets, weak_targets) = _edges_to_csr(
+            self.num_jobs, [j for (j, succs) in enumerate(weak) for _ in succs], [k for succs in weak for k in succs]
+        )
+        (strong_offsets, strong_targets) = _edges_to_csr(
+            self.num_jobs,
+            [j for (j, succs) in enumerate(strong) for _ in succs],
+            [k for succs in strong for k in succs],
+        )
+        return JobGraph(
+            actor_first_job=self.actor_first_job,
+            job_actor=self.job_actor,
+            job_firing=self.job_firing,
+            weak_offsets=weak_offsets,
+            weak_targets=weak_targets,
+            strong_offsets=strong_offsets,
+            strong_targets=strong_targets,
+        )
+
+    def reduced(self, keep_strong: bool = False) -> "JobGraph":
+        """Get the same jobs with only the precedences that are not implied by others, see 'precedence_reduction'."""
+        return self._with_precedences(
+            *precedence_reduction(
+                self.num_jobs,
+                [self.weak_successors(j) for j in range(self.num_jobs)],
+                [self.strong_successors(j) for j in range(self.num_jobs)],
+                keep_strong=keep_strong,
+            )
+        )
+
+    def closure(self) -> "JobGraph":
+        """Get the same jobs with all precedences implied by the graph, see 'precedence_closure'."""
+        return self._with_precedences(
+            *precedence_closure(
+                self.num_jobs,
+                [self.weak_successors(j) for j in range(self.num_jobs)],
+                [self.strong_successors(j) for j in range(self.num_jobs)],
+            )
+        )
+
+    def to_jobs(
+        self, actors: Sequence[Vertex]
+    ) -> Tuple[List[JobType], Mapping[JobType, List[JobType]], Mapping[JobType, List[JobType]]]:
+        """Get the jobs and precedences as in 'sdf_to_jobs', with 'actors' aligned to the actor indexes."""
+        jobs: List[JobType] = [(f, actors[a]) for (a, f) in zip(self.job_actor, self.job_firing)]
+        weak_next = {
+            jobs[j]: [jobs[k] for k in self.weak_targets[self.weak_offsets[j] : self.weak_offsets[j + 1]]]
+            for j in range(len(jobs))
+        }
+        strong_next = {
+            jobs[j]: [jobs[k] for k in self.strong_targets[self.strong_offsets[j] : self.strong_offsets[j + 1]]]
+            for j in range(len(jobs))
+        }
+        return (jobs, weak_next, strong_next)
+
+
+def _edges_to_csr(num_nodes: int, sources: List[int], targets: List[int]) -> Tuple[List[int], List[int]]:
+    # stable counting sort by source, so that the successors keep the order of the edges
+    offsets = [0] * (num_nodes + 1)
+    for src in sources:
+        offsets[src + 1] += 1
+    for n in range(num_nodes):
+        offsets[n + 1] += offsets[n]
+    position = offsets[:-1]
+    sorted_targets = [0] * len(targets)
+    for (src, dst) in zip(sources, targets):
+        sorted_targets[position[src]] = dst
+        position[src] += 1
+    return (offsets, sorted_targets)
+
+
+def sdf_job_graph(
+    num_actors: int,
+    channels: Sequence[SDFChannel],
+    repetition_vector: Sequence[int],
+    initial_tokens: Optional[Sequence[int]] = None,
+) -> JobGraph:
+    """Create the integer indexed job graph of a SDF graph
+
+    The precedences are the same as in 'sdf_to_jobs': the next firing of an
+    actor weak proceeds the previous one, and a firing strong proceeds the
+    producer firings whose tokens it consumes.
+
+    Arguments:
+        num_actors: amount of actors in the SDF graph.
+        channels: the actor indexes, production and consumption of every channel.
+        repetition_vector: the amount of firings of every actor.
+        initial_tokens: the delays of every channel, none if not given.
+
+    Returns:
+        The jobs of the SDF graph and their precedences.
+    """
+    graph = JobGraph()
+    for a in range(num_actors):
+        q = int(repetition_vector[a])
+        graph.actor_first_job.append(graph.actor_first_job[-1] + q)
+        graph.job_actor.extend(itertools.repeat(a, q))
+        graph.job_firing.extend(range(1, q + 1))
+    num_jobs = graph.num_jobs
+    first = graph.actor_first_job
+    weak_sources = [j for j in range(num_jobs - 1) if graph.job_actor[j] == graph.job_actor[j + 1]]
+    (graph.weak_offsets, graph.weak_targets) = _edges_to_csr(num_jobs, weak_sources, [j + 1 for j in weak_sources])
+    strong_sources: List[int] = []
+    strong_targets: List[int] = []
+    for (cidx, (src, dst, prod, cons)) in enumerate(channels):
+        tokens = int(initial_tokens[cidx]) if initial_tokens else 0
+        fires = 1
+        firet = 1
+        q_dst = first[dst + 1] - first[dst]
+        while firet <= q_dst:
+            if prod * (fires - 1) + tokens - cons * firet >= 0:
+                firet += 1
+            else:
+                strong_sources.append(first[src] + fires - 1)
+                strong_targets.append(first[dst] + firet - 1)
+                fires += 1
+    (graph.strong_offsets, graph.strong_targets) = _edges_to_csr(num_jobs, strong_sources, strong_targets)
+    return graph
+
+
+def _precedence_reach(
+    num_nodes: int, weak_succ: Sequence[Sequence[int]], strong_succ: Sequence[Sequence[int]]
+) -> List[int]:
+    # bitset of the nodes reachable from every node, excluding itself
+    indegree = [0] * num_nodes
+    for succs in itertools.chain(weak_succ, strong_succ):
+        for v in succs:
+            indegree[v] += 1
+    order = [u for u in range(num_nodes) if indegree[u] == 0]
+    for u in order:
+        for v in itertools.chain(weak_succ[u], strong_succ[u]):
+            indegree[v] -= 1
+            if indegree[v] == 0:
+                order.append(v)
+    if len(order) < num_nodes:
+        raise ValueError("The precedence graph has cycles")
+    reach = [0] * num_nodes
+    for u in reversed(order):
+        r = 0
+        for v in itertools.chain(weak_succ[u], strong_succ[u]):
+            r |= reach[v] | (1 << v)
+        reach[u] = r
+    return reach
+
+
+def _bits(bitset: int) -> List[int]:
+    nodes = []
+    while bitset:
+        low = bitset & -bitset
+        nodes.append(low.bit_length() - 1)
+        bitset ^= low
+    return nodes
+
+
+def precedence_reduction(
+    num_nodes: int,
+    weak_succ: Sequence[Sequence[int]],
+    strong_succ: Sequence[Sequence[int]],
+    keep_strong: bool = False,
+) -> Tuple[List[List[int]], List[List[int]]]:
+    """Get the transitive reduction of a weak and strong precedence graph
+
+    A path implies a strong precedence if its first edge is strong, since the
+    first job finishes before the next one starts, and any later job starts even
+    later. Every path implies a weak precedence. So, a strong edge is dropped if
+    another strong successor reaches its target, and a weak edge is dropped if
+    its target is also a strong successor or if another successor reaches it.
+    Duplicated edges are dropped as well.
+
+    Arguments:
+        num_nodes: amount of nodes, which are numbered from 0.
+        weak_succ: the weak successors of every node.
+        strong_succ: the strong successors of every node.
+        keep_strong: drop only weak edges, e.g. when the strong ones also carry data.
+
+    Returns:
+        The weak and strong successors of every node that are not implied by the others,
+        in the same order as given.
+
+    Raises:
+        ValueError: if the precedences have cycles.
+    """
+    reach = _precedence_reach(num_nodes, weak_succ, strong_succ)
+    reduced_weak: List[List[int]] = []
+    reduced_strong: List[List[int]] = []
+    for u in range(num_nodes):
+        strong_cover = 0
+        for v in strong_succ[u]:
+            strong_cover |= reach[v]
+        any_cover = strong_cover
+        for v in weak_succ[u]:
+            any_cover |= reach[v]
+        strong_kept = list(dict.fromkeys(v for v in strong_succ[u] if keep_strong or not (strong_cover >> v) & 1))
+        strong_set = set(strong_succ[u])
+        weak_kept = list(
+            dict.fromkeys(v for v in weak_succ[u] if v not in strong_set and not (any_cover >> v) & 1)
+        )
+        reduced_weak.append(weak_kept)
+        reduced_strong.append(strong_kept)
+    return (reduced_weak, reduced_strong)
+
+
+def precedence_closure(
+    num_nodes: int, weak_succ: Sequence[Sequence[int]], strong_succ: Sequence[Sequence[int]]
+) -> Tuple[List[List[int]], List[List[int]]]:
+    """Get the transitive closure of a weak and strong precedence graph
+
+    Every node is weakly preceded by all nodes that reach it, and strongly preceded
+    by the nodes that reach it through a strong edge first, as in 'precedence_reduction'.
+    The strong successors are not repeated as weak successors.
+
+    Returns:
+        The weak and strong successors of every node, in increasing order.
+
+    Raises:
+        ValueError: if the precedences have cycles.
+    """
+    reach = _precedence_reach(num_nodes, weak_succ, strong_succ)
+    closed_weak: List[List[int]] = []
+    closed_strong: List[List[int]] = []
+    for u in range(num_nodes):
+        strong_reach = 0
+        for v in strong_succ[u]:
+            strong_reach |= reach[v] | (1 << v)
+        closed_strong.append(_bits(strong_reach))
+        closed_weak.append(_bits(reach[u] & ~strong_reach))
+    return (closed_weak, closed_strong)
+
+
+def reduce_job_precedences(
+    jobs: Sequence[JobType],
+    weak_next: Mapping[JobType, Sequence[JobType]],
+    strong_next: Mapping[JobType, Sequence[JobType]],
+    keep_strong: bool = False,
+) -> Tuple[Dict[JobType, List[JobType]], Dict[JobType, List[JobType]]]:
+    """Same as 'precedence_reduction', for the job precedences given by 'sdf_to_jobs'."""
+    index = {j: jidx for (jidx, j) in enumerate(jobs)}
+    (weak, strong) = precedence_reduction(
+        len(jobs),
+        [[index[k] for k in weak_next.get(j, [])] for j in jobs],
+        [[index[k] for k in strong_next.get(j, [])] for j in jobs],
+        keep_strong=keep_strong,
+    )
+    return (
+        {j: [jobs[k] for k in weak[jidx]] for (jidx, j) in enumerate(jobs)},
+        {j: [jobs[k] for k in strong[jidx]] for (jidx, j) in enumerate(jobs)},
+    )
+
+
 def sdf_to_jobs(
     actors: Collection[Vertex],
     channels: Mapping[Tuple[Vertex, Vertex], Sequence[Sequence[Vertex]]],
-    topology: List[List[int]],
+    channel_rates: Sequence[SDFChannel],
     repetition_vector: List[int],
     initial_tokens: Optional[List[int]],
+    reduced: bool = False,
 ) -> Tuple[List[JobType], Mapping[JobType, List[JobType]], Mapping[JobType, List[JobType]]]:
     """Create job graph out of a SDF graph.
 
@@ -87,41 +792,170 @@ def sdf_to_jobs(
     Arguments:
         actors: The SDF actors.
         channels: The Channel representations between every actor.
-        topology: The SDF topology matrix: consumptions and productions.
+        channel_rates: The actor indexes, production and consumption of every channel.
         repetition_vector: The amount of firings for each actor in actors.
             It is expected that the repetition vector is a column vector.
         initial_tokens: the delays for each channel of the SDF graph.
+        reduced: drop the weak precedences that are implied by others. The strong
+            ones are the data dependencies of the channels, so they are all kept.
 
     Returns:
         A tuple containing 1) the actors as jobs, 2) the weak procededences
         and the 3) strong procedences.
     """
-    q_vector = [q for q in repetition_vector]
-    jobs = [(q, a) for (i, a) in enumerate(actors) for q in range(1, int(q_vector[i]) + 1)]
-    strong_next: Mapping[JobType, List[JobType]] = {j: [] for (i, j) in enumerate(jobs)}
-    initial_tokens_internal = initial_tokens if initial_tokens else [0 for _ in actors]
-    for (cidx, (s, t)) in enumerate(channels):
-        idxs = next((i for (i, a) in enumerate(actors) if a == s), -1)
-        idxt = next((i for (i, a) in enumerate(actors) if a == t), -1)
-        production = topology[cidx][idxs]
-        consumption = topology[cidx][idxt]
-        fires = 1
-        firet = 1
-        while firet <= q_vector[idxt]:
-            if production * (fires - 1) + initial_tokens_internal[cidx] + consumption * firet >= 0:
-                firet += 1
+    graph = sdf_job_graph(len(actors), channel_rates, repetition_vector, initial_tokens)
+    if reduced:
+        graph = graph.reduced(keep_strong=True)
+    return graph.to_jobs(list(actors))
+
+
+def pass_buffer_sizes(
+    num_actors: int,
+    channels: Sequence[SDFChannel],
+    firings: Iterable[int],
+    initial_tokens: Optional[Sequence[int]] = None,
+) -> List[int]:
+    """Get the most tokens that every channel holds while 'firings' are executed in order
+
+    Tokens are produced when a firing ends, so these are the buffer sizes that
+    the schedule needs, counting the initial tokens.
+    """
+    incidence = _channels_incidence(num_actors, channels)
+    tokens = [int(t) for t in initial_tokens] if initial_tokens else [0 for _ in channels]
+    sizes = list(tokens)
+    for idx in firings:
+        for (channeln, rate) in incidence[idx]:
+            tokens[channeln] += rate
+            if tokens[channeln] > sizes[channeln]:
+                sizes[channeln] = tokens[channeln]
+    return sizes
+
+
+def _fits_buffers(
+    consumes: Sequence[Sequence[Tuple[int, int]]],
+    changes: Sequence[Sequence[Tuple[int, int]]],
+    repetition_vector: Sequence[int],
+    tokens: List[int],
+    sizes: Sequence[int],
+    max_states: int,
+) -> bool:
+    # depth first search for one iteration where no channel holds more tokens than its size.
+    # The tokens only depend on how many times every actor fired, so these counts are the
+    # states, and each of them is explored only once. Giving up after 'max_states' states besides
+    # the ones of a straight iteration counts as not fitting.
+    num_actors = len(repetition_vector)
+    remaining = sum(repetition_vector)
+    max_states += remaining
+    fired = [0] * num_actors
+    visited: Set[Tuple[int, ...]] = set()
+    path: List[int] = []
+    # next actor to try at every depth of the search
+    tries = [0]
+
+    def apply(idx: int, sign: int) -> None:
+        for (channeln, rate) in changes[idx]:
+            tokens[channeln] += sign * rate
+        fired[idx] += sign
+
+    while remaining > 0:
+        idx = tries[-1]
+        while idx < num_actors:
+            if (
+                fired[idx] < repetition_vector[idx]
+                and all(tokens[channeln] >= rate for (channeln, rate) in consumes[idx])
+                and all(tokens[channeln] + rate <= sizes[channeln] for (channeln, rate) in changes[idx] if rate > 0)
+            ):
+                apply(idx, 1)
+                state = tuple(fired)
+                if state not in visited:
+                    break
+                apply(idx, -1)
+            idx += 1
+        if idx < num_actors:
+            visited.add(state)
+            if len(visited) > max_states:
+                return False
+            tries[-1] = idx + 1
+            tries.append(0)
+            path.append(idx)
+            remaining -= 1
+        else:
+            tries.pop()
+            if not path:
+                return False
+            apply(path.pop(), -1)
+            remaining += 1
+    return True
+
+
+def minimal_buffer_sizes(
+    num_actors: int,
+    channels: Sequence[SDFChannel],
+    repetition_vector: Sequence[int],
+    initial_tokens: Optional[Sequence[int]] = None,
+    firings: Optional[Iterable[int]] = None,
+    max_states: int = 10000,
+) -> List[int]:
+    """Get buffer sizes for every channel under which the SDF graph can still run
+
+    The sizes start from the ones the PASS 'firings' needs (see 'pass_buffer_sizes'). If a
+    whole iteration can still be executed with every channel at the smallest size it needs
+    alone, these are the sizes. Otherwise every channel is shrunk, by bisection, as long as an
+    iteration can still be executed with the sizes of all channels. Both are checked by
+    exploring the states of the graph. The result is minimal in the sense that no channel can be made smaller
+    alone, but other distributions with a smaller total may exist. Every weakly connected
+    component is explored separately.
+
+    Arguments:
+        num_actors: amount of actors in the SDF graph.
+        channels: the actor indexes, production and consumption of every channel.
+        repetition_vector: the amount of firings of every actor.
+        initial_tokens: the delays of every channel, none if not given.
+        firings: a PASS of the graph. It is computed if not given.
+        max_states: states explored at most for every check, besides the ones of one iteration,
+            after which a size is not shrunk.
+
+    Returns:
+        The size of every channel, or the sizes the PASS needs if the graph has no PASS.
+    """
+    tokens = [int(t) for t in initial_tokens] if initial_tokens else [0 for _ in channels]
+    if firings is None:
+        firings = channels_PASS(num_actors, channels, list(repetition_vector), tokens)
+    sizes = pass_buffer_sizes(num_actors, channels, firings, tokens)
+    for component in sdf_components(num_actors, channels):
+        local = {a: i for (i, a) in enumerate(component.actors)}
+        consumes: List[List[Tuple[int, int]]] = [[] for _ in component.actors]
+        changes: List[List[Tuple[int, int]]] = [[] for _ in component.actors]
+        for cidx in component.channels:
+            (src, dst, prod, cons) = channels[cidx]
+            consumes[local[dst]].append((cidx, cons))
+            if src == dst:
+                changes[local[src]].append((cidx, prod - cons))
             else:
-                strong_next[(fires, s)].append((firet, t))
-                fires += 1
-        # for fires in range(q_vector[idxs]):
-        #     for firet in range(q_vector[idxt]):
-        #         if production * fires + int(initial_tokens[cidx]) < consumption * (firet + 1):
-        #             poss = actor_fire.index((s, fires))
-        #             post = actor_fire.index((t, firet))
-        #             strong_next.append((poss, post))
-    weak_next: Mapping[JobType, List[JobType]] = {j: [] for (_, j) in enumerate(jobs)}
-    for ((i, j), (inext, jnext)) in zip(jobs[:-1], jobs[1:]):
-        if j == jnext and inext == i + 1:
-            # the +1 comes from the fact that we dont start at 0
-            weak_next[(i, j)].append((inext, jnext))
-    return (jobs, weak_next, strong_next)
+                changes[local[src]].append((cidx, prod))
+                changes[local[dst]].append((cidx, -cons))
+        component_q = [repetition_vector[a] for a in component.actors]
+        if not _fits_buffers(consumes, changes, component_q, list(tokens), sizes, max_states):
+            # the PASS does not complete, or the states are too many to explore
+            continue
+        # the smallest size of every channel alone, which the other channels can only make larger
+        lows: Dict[int, int] = {}
+        for cidx in component.channels:
+            (src, dst, prod, cons) = channels[cidx]
+            step = math.gcd(prod, cons)
+            lows[cidx] = tokens[cidx] if src == dst else max(tokens[cidx], prod + cons - step + tokens[cidx] % step)
+        lowest = [lows.get(cidx, s) for (cidx, s) in enumerate(sizes)]
+        if _fits_buffers(consumes, changes, component_q, list(tokens), lowest, max_states):
+            sizes = lowest
+            continue
+        for cidx in component.channels:
+            (low, high) = (lows[cidx], sizes[cidx])
+            while low < high:
+                middle = (low + high) // 2
+                sizes[cidx] = middle
+                if _fits_buffers(consumes, changes, component_q, list(tokens), sizes, max_states):
+                    high = middle
+                else:
+                    low = middle + 1
+            sizes[cidx] = high
+    return sizes
@@ -0,0 +1,363 @@
+from fractions import Fraction
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import idesyde.sdf as sdfapi
+from idesyde.sdf import SDFChannel
+
+# (source job, target job, delay in iterations, amount of tokens, channel) of a HSDF dependency
+HSDFDependency = Tuple[int, int, int, int, int]
+# (source, target, delay in iterations, weight) of a timed precedence
+TimedEdge = Tuple[int, int, int, int]
+
+# tolerance when comparing the float ratios and biases of the policy iteration
+_EPSILON = 1e-9
+
+
+def hsdf_dependencies(
+    num_actors: int,
+    channels: Sequence[SDFChannel],
+    repetition_vector: Sequence[int],
+    initial_tokens: Optional[Sequence[int]] = None,
+) -> List[HSDFDependency]:
+    """Get the firing to firing dependencies of the HSDF expansion of a SDF graph
+
+    The jobs are numbered as in 'sdf.sdf_job_graph'. Tokens are consumed in the
+    order they are produced, so the tokens that a consumer firing needs may come
+    from producer firings of earlier iterations, in which case the dependency
+    has as delay the amount of iterations between the two firings.
+
+    Returns:
+        The dependencies of one iteration, with the amount of tokens that go through
+        each of them, ordered by channel and then by consumer firing.
+    """
+    first = [0]
+    for a in range(num_actors):
+        first.append(first[-1] + int(repetition_vector[a]))
+    dependencies: List[HSDFDependency] = []
+    for (cidx, (src, dst, prod, cons)) in enumerate(channels):
+        if prod == 0 or cons == 0:
+            continue
+        tokens = int(initial_tokens[cidx]) if initial_tokens else 0
+        q_src = first[src + 1] - first[src]
+        for firet in range(first[dst + 1] - first[dst]):
+            # the tokens consumed by this firing, numbered in production order
+            (low, high) = (firet * cons, (firet + 1) * cons)
+            for fires in range((low - tokens) // prod, (high - 1 - tokens) // prod + 1):
+                amount = min(high, tokens + (fires + 1) * prod) - max(low, tokens + fires * prod)
+                # negative firings belong to previous iterations
+                dependencies.append(
+                    (first[src] + fires % q_src, first[dst] + firet, -(fires // q_src), amount, cidx)
+                )
+    return dependencies
+
+
+def strongly_connected_components(num_nodes: int, succ: Sequence[Sequence[int]]) -> List[List[int]]:
+    """Get the strongly connected components of a graph, in reverse topological order
+
+    Tarjan's algorithm is run iteratively, so that long cycles do not exhaust the stack.
+
+    Arguments:
+        num_nodes: amount of nodes, which are numbered from 0.
+        succ: the successors of every node.
+    """
+    index = [-1] * num_nodes
+    low = [0] * num_nodes
+    on_stack = [False] * num_nodes
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+    for root in range(num_nodes):
+        if index[root] >= 0:
+            continue
+        work = [(root, 0)]
+        while work:
+            (v, i) = work.pop()
+            if i == 0:
+                index[v] = low[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack[v] = True
+            if i < len(succ[v]):
+                work.append((v, i + 1))
+                u = succ[v][i]
+                if index[u] < 0:
+                    work.append((u, 0))
+                elif on_stack[u]:
+                    low[v] = min(low[v], index[u])
+                continue
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[v])
+            if low[v] == index[v]:
+                component = []
+                while True:
+                    u = stack.pop()
+                    on_stack[u] = False
+                    component.append(u)
+                    if u == v:
+                        break
+                components.append(component)
+    return components
+
+
+def _policy_iteration(out: Sequence[Sequence[Tuple[int, int, int]]]) -> Fraction:
+    # Howard's policy iteration for the maximum cycle ratio of a strongly connected graph,
+    # where 'out' has the (target, delay, weight) of the edges leaving every node.
+    # Ratios and biases are floats to be fast, and the result is exact from the critical cycle.
+    n = len(out)
+    policy = [max(range(len(edges)), key=lambda i: edges[i][2]) for edges in out]
+    while True:
+        # value determination: every node takes the ratio of the cycle its policy leads to
+        ratio: List[Optional[float]] = [None] * n
+        bias = [0.0] * n
+        visited = [-1] * n
+        reverse: List[List[int]] = [[] for _ in range(n)]
+        for u in range(n):
+            reverse[out[u][policy[u]][0]].append(u)
+        cycles: List[Tuple[int, int]] = []
+        for start in range(n):
+            if ratio[start] is not None:
+                continue
+            u = start
+            while visited[u] != start:
+                visited[u] = start
+                u = out[u][policy[u]][0]
+            (total_weight, total_delay, v) = (0, 0, u)
+            while True:
+                (v, d, w) = out[v][policy[v]]
+                total_weight += w
+                total_delay += d
+                if v == u:
+                    break
+            cycles.append((total_weight, total_delay))
+            eta = total_weight / total_delay
+            ratio[u] = eta
+            stack = [u]
+            while stack:
+                v = stack.pop()
+                for p in reverse[v]:
+                    if ratio[p] is None:
+                        (_, d, w) = out[p][policy[p]]
+                        ratio[p] = eta
+                        bias[p] = w - eta * d + bias[v]
+                        stack.append(p)
+        # policy improvement: first towards larger ratios, then towards larger biases
+        changed = False
+        for u in range(n):
+            (best, best_ratio) = (policy[u], ratio[u])
+            for (i, (v, _, _)) in enumerate(out[u]):
+                if ratio[v] > best_ratio + _EPSILON:
+                    (best, best_ratio) = (i, ratio[v])
+            if best != policy[u]:
+                policy[u] = best
+                changed = True
+        if changed:
+            continue
+        for u in range(n):
+            (best, best_bias) = (policy[u], bias[u])
+            for (i, (v, d, w)) in enumerate(out[u]):
+                if abs(ratio[v] - ratio[u]) <= _EPSILON and w - ratio[u] * d + bias[v] > best_bias + _EPSILON:
+                    (best, best_bias) = (i, w - ratio[u] * d + bias[v])
+            if best != policy[u]:
+                policy[u] = best
+                changed = True
+        if not changed:
+            return max(Fraction(w, d) for (w, d) in cycles)
+
+
+def max_cycle_ratio(num_nodes: int, edges: Sequence[TimedEdge]) -> Optional[Fraction]:
+    """Get the maximum cycle ratio of a graph with Howard's policy iteration
+
+    The ratio of a cycle is the sum of the weights of its edges over the sum of their
+    delays. Every strongly connected component is solved separately.
+
+    Arguments:
+        num_nodes: amount of nodes, which are numbered from 0.
+        edges: (source, target, delay, weight) of every edge. Cycles must have some delay.
+
+    Returns:
+        The largest ratio of a cycle, or None if the graph has no cycles.
+    """
+    succ: List[List[int]] = [[] for _ in range(num_nodes)]
+    for (u, v, _, _) in edges:
+        succ[u].append(v)
+    components = strongly_connected_components(num_nodes, succ)
+    component_of = [0] * num_nodes
+    local = [0] * num_nodes
+    for (cidx, component) in enumerate(components):
+        for (i, v) in enumerate(component):
+            component_of[v] = cidx
+            local[v] = i
+    out: Dict[int, List[List[Tuple[int, int, int]]]] = {}
+    for (u, v, d, w) in edges:
+        cidx = component_of[u]
+        if cidx == component_of[v]:
+            if cidx not in out:
+                out[cidx] = [[] for _ in components[cidx]]
+            out[cidx][local[u]].append((local[v], d, w))
+    return max((_policy_iteration(component_out) for component_out in out.values()), default=None)
+
+
+def self_timed_period(num_jobs: int, edges: Sequence[TimedEdge]) -> Optional[Fraction]:
+    """Get the period of the self-timed execution of a timed precedence graph
+
+    Every edge (u, v, d, w) states that the start of job v in every iteration k
+    happens at least w after the start of job u in iteration k - d. In the steady
+    state, the time between iterations is the maximum cycle ratio of the graph.
+
+    Returns:
+        The time between iterations in the steady state, or None if the jobs deadlock
+        because the edges without delay form cycles.
+    """
+    immediate: List[List[int]] = [[] for _ in range(num_jobs)]
+    indegree = [0] * num_jobs
+    for (u, v, d, _) in edges:
+        if d == 0:
+            immediate[u].append(v)
+            indegree[v] += 1
+    order = [j for j in range(num_jobs) if indegree[j] == 0]
+    for j in order:
+        for k in immediate[j]:
+            indegree[k] -= 1
+            if indegree[k] == 0:
+                order.append(k)
+    if len(order) < num_jobs:
+        return None
+    period = max_cycle_ratio(num_jobs, edges)
+    return period if period is not None else Fraction(0)
+
+
+class SDFThroughputAnalysis(object):
+    """Throughput of the self-timed execution of a SDF graph under different mappings
+
+    The HSDF expansion is built once, so that evaluating a mapping only builds its
+    timed precedence graph and finds its maximum cycle ratio. Actors never fire concurrently
+    with themselves, and the actors mapped to the same processor fire in a static
+    order that repeats every iteration.
+    """
+
+    def __init__(
+        self,
+        num_actors: int,
+        channels: Sequence[SDFChannel],
+        repetition_vector: Sequence[int],
+        initial_tokens: Optional[Sequence[int]] = None,
+        pass_firings: Optional[Sequence[int]] = None,
+    ):
+        """
+        Arguments:
+            num_actors: amount of actors in the SDF graph.
+            channels: the actor indexes, production and consumption of every channel.
+            repetition_vector: the amount of firings of every actor.
+            initial_tokens: the delays of every channel, none if not given.
+            pass_firings: a PASS of the graph, from which the default static orders are taken.
+                It is computed if not given.
+        """
+        self.num_actors = num_actors
+        self.channels = list(channels)
+        self.repetition_vector = [int(q) for q in repetition_vector]
+        self.initial_tokens = [int(t) for t in initial_tokens] if initial_tokens else [0 for _ in channels]
+        self.first_job = [0]
+        for q in self.repetition_vector:
+            self.first_job.append(self.first_job[-1] + q)
+        self.dependencies = hsdf_dependencies(num_actors, self.channels, self.repetition_vector, self.initial_tokens)
+        self._pass_firings = list(pass_firings) if pass_firings is not None else None
+
+    @property
+    def pass_firings(self) -> List[int]:
+        if self._pass_firings is None:
+            self._pass_firings = sdfapi.channels_PASS(
+                self.num_actors, self.channels, self.repetition_vector, self.initial_tokens
+            )
+        return self._pass_firings
+
+    def timed_edges(
+        self,
+        execution_times: Sequence[int],
+        mapping: Optional[Sequence[int]] = None,
+        orders: Optional[Sequence[Sequence[int]]] = None,
+        token_times: Optional[Sequence[int]] = None,
+    ) -> List[TimedEdge]:
+        """Get the timed precedence graph of one mapping, see 'period' for the arguments."""
+        edges: List[TimedEdge] = []
+        for a in range(self.num_actors):
+            (start, end) = (self.first_job[a], self.first_job[a + 1])
+            if end > start:
+                edges.extend((j, j + 1, 0, execution_times[a]) for j in range(start, end - 1))
+                edges.append((end - 1, start, 1, execution_times[a]))
+        for (src_job, dst_job, delay, amount, cidx) in self.dependencies:
+            (src, dst, _, _) = self.channels[cidx]
+            weight = execution_times[src]
+            if token_times and mapping is not None and mapping[src] != mapping[dst]:
+                weight += amount * token_times[cidx]
+            edges.append((src_job, dst_job, delay, weight))
+        if mapping is not None:
+            if orders is None:
+                if len(self.pass_firings) < self.first_job[-1]:
+                    # without a PASS, the dependencies alone already deadlock
+                    return edges
+                procs = max(mapping, default=-1) + 1
+                orders = [[a for a in self.pass_firings if mapping[a] == p] for p in range(procs)]
+            for (p, order) in enumerate(orders):
+                fired = [0] * self.num_actors
+                jobs = []
+                for a in order:
+                    if mapping[a] != p:
+                        raise ValueError(f"Actor {a} is ordered in processor {p}, but mapped to {mapping[a]}")
+                    jobs.append(self.first_job[a] + fired[a])
+                    fired[a] += 1
+                if any(fired[a] != self.repetition_vector[a] for a in range(self.num_actors) if mapping[a] == p):
+                    raise ValueError(f"The order of processor {p} does not fire its actors as the repetition vector")
+                if jobs:
+                    edges.extend(
+                        (j, k, 0, execution_times[a]) for (j, k, a) in zip(jobs[:-1], jobs[1:], order)
+                    )
+                    edges.append((jobs[-1], jobs[0], 1, execution_times[order[-1]]))
+        return edges
+
+    def period(
+        self,
+        execution_times: Sequence[int],
+        mapping: Optional[Sequence[int]] = None,
+        orders: Optional[Sequence[Sequence[int]]] = None,
+        token_times: Optional[Sequence[int]] = None,
+    ) -> Optional[Fraction]:
+        """Get the time of one iteration of the self-timed execution
+
+        Arguments:
+            execution_times: the time one firing of every actor takes where it is mapped.
+            mapping: the processor of every actor. Without it, every actor has its own processor.
+            orders: the actor indexes in firing order for one iteration, for every processor.
+                By default, the PASS restricted to the actors of every processor.
+            token_times: the time to send one token of every channel between two processors.
+
+        Returns:
+            The period in the steady state, or None if the mapping and orders deadlock.
+
+        Raises:
+            ValueError: if the orders do not agree with the mapping and the repetition vector.
+        """
+        edges = self.timed_edges(execution_times, mapping, orders, token_times)
+        return self_timed_period(self.first_job[-1], edges)
+
+    def throughput(
+        self,
+        execution_times: Sequence[int],
+        mapping: Optional[Sequence[int]] = None,
+        orders: Optional[Sequence[Sequence[int]]] = None,
+        token_times: Optional[Sequence[int]] = None,
+    ) -> Optional[Fraction]:
+        """Get the iterations per time unit of the self-timed execution, see 'period'
+
+        Returns:
+            The throughput, which is 0 if the execution deadlocks, or None if it is unbounded
+            because nothing takes time.
+        """
+        period = self.period(execution_times, mapping, orders, token_times)
+        if period is None:
+            return Fraction(0)
+        return 1 / period if period > 0 else None
@@ -0,0 +1,196 @@
+from dataclasses import dataclass
+from dataclasses import field
+from fractions import Fraction
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from idesyde.sdf_throughput import SDFThroughputAnalysis
+from idesyde.sdf_throughput import TimedEdge
+from idesyde.sdf_throughput import strongly_connected_components
+
+
+@dataclass
+class SelfTimedExecution:
+    """Outcome of simulating a self-timed execution
+
+    The period is the time between iterations in the periodic regime, and the
+    latency is the longest time from the first start to the last finish of an
+    iteration in that regime. The utilization of every processor is the time it
+    is busy in an iteration over the period. A deadlocked execution has neither
+    period nor latency.
+    """
+
+    period: Optional[Fraction] = None
+    latency: Optional[int] = None
+    utilization: List[Fraction] = field(default_factory=list)
+    # iterations simulated until the periodic regime was found
+    iterations: int = 0
+
+    @property
+    def deadlocked(self) -> bool:
+        return self.period is None
+
+
+def _iterate(
+    schedule: Sequence[Tuple[int, Sequence[Tuple[int, int, int]]]], num_jobs: int, depth: int, max_iterations: int
+) -> Tuple[List[List[int]], int, int, Optional[Fraction]]:
+    # compute the start times of whole iterations until the last 'depth' of them
+    # repeat relative to their earliest start, which makes the execution periodic from there
+    history: List[List[int]] = []
+    seen: Dict[Tuple[int, ...], Tuple[int, int]] = {}
+    for k in range(max_iterations):
+        start = [0] * num_jobs
+        for (v, vpreds) in schedule:
+            t = 0
+            for (u, d, w) in vpreds:
+                if d == 0:
+                    if start[u] + w > t:
+                        t = start[u] + w
+                elif k >= d and history[k - d][u] + w > t:
+                    t = history[k - d][u] + w
+            start[v] = t
+        history.append(start)
+        if k + 1 >= depth:
+            window = history[k + 1 - depth :]
+            base = min(min(s) for s in window)
+            key = tuple(t - base for s in window for t in s)
+            if key in seen:
+                (previous, previous_base) = seen[key]
+                return (history, previous + 1, k + 1, Fraction(base - previous_base, k - previous))
+            seen[key] = (k, base)
+    return (history, 0, len(history), None)
+
+
+def simulate_self_timed(
+    num_jobs: int,
+    edges: Sequence[TimedEdge],
+    durations: Sequence[int],
+    job_proc: Sequence[int],
+    num_procs: int,
+    max_iterations: int = 1000,
+) -> SelfTimedExecution:
+    """Simulate the self-timed execution of a timed precedence graph until it becomes periodic
+
+    Every edge (u, v, d, w) states that job v starts in every iteration k at least w
+    after job u started in iteration k - d, and every job starts as soon as all its
+    edges allow it, as in 'sdf_throughput'. The processors and static orders must
+    already be edges. Instead of an event queue, whole iterations are computed over a
+    topological order of the edges without delay, and the start times of the last
+    iterations are memoized relative to their earliest start. Once they repeat, the
+    execution is periodic and the period is exact.
+
+    Parts of the graph that do not depend on each other, such as processors that only
+    send data downstream, may run at different rates. Then every strongly connected
+    part is simulated alone to find its period, and the execution has the largest one.
+    If a part runs ahead of the parts that follow it, the latency grows without bound.
+
+    Arguments:
+        num_jobs: amount of jobs, which are numbered from 0.
+        edges: the timed precedences between the jobs.
+        durations: the time every job takes.
+        job_proc: the processor of every job.
+        num_procs: amount of processors.
+        max_iterations: iterations to simulate at most while looking for the periodic regime.
+
+    Returns:
+        The period, latency and processor utilizations of the execution. The latency is None
+        if it grows without bound or the periodic regime is not found in 'max_iterations'.
+    """
+    preds: List[List[Tuple[int, int, int]]] = [[] for _ in range(num_jobs)]
+    succ: List[List[int]] = [[] for _ in range(num_jobs)]
+    immediate: List[List[int]] = [[] for _ in range(num_jobs)]
+    indegree = [0] * num_jobs
+    depth = 1
+    for (u, v, d, w) in edges:
+        preds[v].append((u, d, w))
+        succ[u].append(v)
+        depth = max(depth, d)
+        if d == 0:
+            immediate[u].append(v)
+            indegree[v] += 1
+    order = [j for j in range(num_jobs) if indegree[j] == 0]
+    for j in order:
+        for k in immediate[j]:
+            indegree[k] -= 1
+            if indegree[k] == 0:
+                order.append(k)
+    busy = [0] * num_procs
+    for j in range(num_jobs):
+        busy[job_proc[j]] += durations[j]
+    if len(order) < num_jobs:
+        return SelfTimedExecution(utilization=[Fraction(0) for _ in busy])
+    if num_jobs == 0:
+        return SelfTimedExecution(period=Fraction(0), latency=0, utilization=[Fraction(0) for _ in busy])
+    position = [0] * num_jobs
+    for (i, j) in enumerate(order):
+        position[j] = i
+    components = strongly_connected_components(num_jobs, succ)
+    component_of = [0] * num_jobs
+    for (cidx, component) in enumerate(components):
+        for j in component:
+            component_of[j] = cidx
+    # the period of every component alone, and the one it runs at, set by the components before it
+    rates: List[Fraction] = []
+    iterations = 0
+    for (cidx, component) in enumerate(components):
+        local = {j: i for (i, j) in enumerate(sorted(component, key=lambda j: position[j]))}
+        schedule = [
+            (i, [(local[u], d, w) for (u, d, w) in preds[j] if component_of[u] == cidx]) for (j, i) in local.items()
+        ]
+        if not any(vpreds for (_, vpreds) in schedule):
+            rates.append(Fraction(0))
+            continue
+        (history, first, last, rate) = _iterate(schedule, len(component), depth, max_iterations)
+        iterations = max(iterations, last)
+        if rate is None:
+            # no periodic regime found, so the average of the second half is the best guess
+            half = len(history) // 2
+            rate = Fraction(max(s - h for (s, h) in zip(history[-1], history[half - 1])), len(history) - half)
+        rates.append(rate)
+    period = max(rates, default=Fraction(0))
+    running = list(rates)
+    for cidx in reversed(range(len(components))):
+        for j in components[cidx]:
+            for (u, _, _) in preds[j]:
+                running[cidx] = max(running[cidx], running[component_of[u]])
+    latency: Optional[int] = None
+    if all(r == period for r in running):
+        schedule = [(j, preds[j]) for j in order]
+        (history, first, last, whole) = _iterate(schedule, num_jobs, depth, max_iterations)
+        iterations = max(iterations, last)
+        if whole is not None:
+            latency = max(max(s[j] + durations[j] for j in range(num_jobs)) - min(s) for s in history[first:last])
+    return SelfTimedExecution(
+        period=period,
+        latency=latency,
+        utilization=[Fraction(b) / period if period > 0 else Fraction(0) for b in busy],
+        iterations=iterations,
+    )
+
+
+def simulate_sdf(
+    analysis: SDFThroughputAnalysis,
+    execution_times: Sequence[int],
+    mapping: Optional[Sequence[int]] = None,
+    orders: Optional[Sequence[Sequence[int]]] = None,
+    token_times: Optional[Sequence[int]] = None,
+    max_iterations: int = 1000,
+) -> SelfTimedExecution:
+    """Simulate the self-timed execution of the SDF graph of 'analysis'
+
+    The arguments are the same as for 'SDFThroughputAnalysis.period'. Without a
+    mapping, every actor is its own processor.
+    """
+    num_actors = analysis.num_actors
+    job_actor = [a for a in range(num_actors) for _ in range(analysis.repetition_vector[a])]
+    edges = analysis.timed_edges(execution_times, mapping, orders, token_times)
+    if mapping is None:
+        (job_proc, num_procs) = (job_actor, num_actors)
+    else:
+        (job_proc, num_procs) = ([mapping[a] for a in job_actor], max(mapping, default=-1) + 1)
+    return simulate_self_timed(
+        len(job_actor), edges, [execution_times[a] for a in job_actor], job_proc, num_procs, max_iterations
+    )
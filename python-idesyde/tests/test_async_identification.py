@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from forsyde.io.python.core import Vertex
+
+from idesyde.benchmark.generators import synthetic_model
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.api import identify_decision_models_async
+from idesyde.identification.api import identify_decision_models_stream_async
+from idesyde.identification.models import TimeTriggeredPlatform
+
+
+class _Rules(object):
+    # rules that record their calls, each identifying one platform of its own
+    def __init__(self, delays):
+        self.calls = []
+        self.finished = threading.Event()
+        self.rules = [self._rule(name, delay) for (name, delay) in delays]
+
+    def _rule(self, name, delay):
+        def rule(model, identified):
+            self.calls.append(name)
+            time.sleep(delay)
+            self.finished.set()
+            return (True, TimeTriggeredPlatform(cores=[Vertex(name)]))
+
+        rule.__name__ = name
+        return rule
+
+
+def _fingerprints(models):
+    return sorted(m.fingerprint() for m in models)
+
+
+def test_async_identification_does_not_depend_on_the_threads():
+    # all rules of an iteration see the same models, so the result is not the sequential
+    # one, but it is the same however the rules of an iteration are interleaved
+    model = synthetic_model(6, 4)
+    identified = asyncio.run(identify_decision_models_async(model))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        serial = asyncio.run(identify_decision_models_async(model, executor=executor))
+    assert _fingerprints(identified) == _fingerprints(serial)
+    assert set(m.short_name() for m in identified) == set(m.short_name() for m in identify_decision_models(model))
+
+
+def test_async_stream_is_the_sync_one():
+    model = synthetic_model(6, 4)
+
+    async def collect():
+        return [m async for (m, _) in identify_decision_models_stream_async(model)]
+
+    assert _fingerprints(asyncio.run(collect())) == _fingerprints(identify_decision_models(model))
+
+
+def test_async_identification_timeout_discards_running_rules():
+    rules = _Rules([("slow", 0.5), ("queued", 0.0)])
+    model = synthetic_model(2, 1)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        identified = asyncio.run(
+            identify_decision_models_async(model, rules.rules, timeout=0.2, executor=executor)
+        )
+    assert len(identified) == 0
+    # the running rule finished late and changed nothing, the queued one never ran
+    assert rules.finished.is_set()
+    assert len(identified) == 0
+    assert rules.calls == ["slow"]
+
+
+def test_async_stream_stops_calling_rules_when_closed():
+    rules = _Rules([("first", 0.0), ("second", 0.0), ("third", 0.0)])
+    model = synthetic_model(2, 1)
+
+    async def first_only():
+        stream = identify_decision_models_stream_async(model, rules.rules)
+        async for (m, _) in stream:
+            await stream.aclose()
+            return m
+
+    m = asyncio.run(first_only())
+    assert m.cores[0].identifier == "first"
+    assert rules.calls == ["first"]
+
+
+def test_async_stream_stops_after_the_running_rule_when_cancelled():
+    rules = _Rules([("slow", 0.3), ("next", 0.0)])
+    model = synthetic_model(2, 1)
+
+    async def cancel_early():
+        stream = identify_decision_models_stream_async(model, rules.rules)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stream.__anext__(), 0.05)
+
+    asyncio.run(cancel_early())
+    assert rules.finished.wait(2.0)
+    time.sleep(0.1)
+    assert rules.calls == ["slow"]
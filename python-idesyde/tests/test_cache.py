@@ -0,0 +1,96 @@
+import importlib
+import sys
+
+from forsyde.io.python.types import VertexTrait
+
+from idesyde.benchmark.generators import synthetic_model
+from idesyde.identification.api import _get_registered_rules
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.cache import IdentificationCache
+from idesyde.identification.cache import code_hash
+from idesyde.identification.cache import identify_decision_models_cached
+
+
+def _rules():
+    return list(_get_registered_rules())
+
+
+def test_key_depends_on_model_content(tmp_path):
+    cache = IdentificationCache(tmp_path)
+    assert cache.key(synthetic_model(4, 2), _rules()) == cache.key(synthetic_model(4, 2), _rules())
+    assert cache.key(synthetic_model(4, 2), _rules()) != cache.key(synthetic_model(4, 2, seed=1), _rules())
+    model = synthetic_model(4, 2)
+    key = cache.key(model, _rules())
+    core = next(v for v in model if v.has_trait(VertexTrait.AbstractProcessingComponent))
+    core.properties["max_memory_internal_bytes"] += 1
+    assert cache.key(model, _rules()) != key
+
+
+def test_key_depends_on_rules_and_targets(tmp_path):
+    cache = IdentificationCache(tmp_path)
+    model = synthetic_model(4, 2)
+    key = cache.key(model, _rules())
+    assert cache.key(model, _rules()[:-1]) != key
+    assert cache.key(model, list(reversed(_rules()))) != key
+    assert cache.key(model, _rules(), ["TaskScheduling"]) != key
+    assert cache.key(model, _rules(), ["TaskScheduling"]) != cache.key(model, _rules(), ["SDFExecution"])
+    assert cache.key(model, _rules(), ["TaskScheduling", "SDFExecution"]) == cache.key(
+        model, _rules(), ["SDFExecution", "TaskScheduling"]
+    )
+
+
+def test_key_depends_on_rule_module_code(tmp_path, monkeypatch):
+    module_dir = tmp_path / "modules"
+    module_dir.mkdir()
+    source = "def rule(model, identified):\n    return (True, None)\n"
+    (module_dir / "cached_rules_module.py").write_text(source)
+    monkeypatch.syspath_prepend(str(module_dir))
+    rule = importlib.import_module("cached_rules_module").rule
+    try:
+        cache = IdentificationCache(tmp_path)
+        model = synthetic_model(4, 2)
+        key = cache.key(model, [rule])
+        # the rule itself is the same, but a helper it could call changed
+        (module_dir / "cached_rules_module.py").write_text(source + "\n\ndef helper():\n    return 1\n")
+        assert cache.key(model, [rule]) != key
+    finally:
+        sys.modules.pop("cached_rules_module", None)
+
+
+def test_code_hash_covers_the_identification_loop(monkeypatch):
+    hashed = []
+    find_spec = importlib.util.find_spec
+
+    def recording_find_spec(name, *args):
+        hashed.append(name)
+        return find_spec(name, *args)
+
+    monkeypatch.setattr(importlib.util, "find_spec", recording_find_spec)
+    code_hash(_rules())
+    assert "idesyde.identification.api" in hashed
+    assert "idesyde.identification.scheduling" in hashed
+    assert "idesyde.identification.models" in hashed
+
+
+def test_entries_are_reused(tmp_path):
+    cache = IdentificationCache(tmp_path)
+    model = synthetic_model(4, 2)
+    identified = identify_decision_models_cached(model, cache=cache)
+    assert len(list(tmp_path.glob("*.pickle"))) == 1
+    loaded = cache.load(synthetic_model(4, 2), _rules())
+    assert loaded is not None
+    assert sorted(m.fingerprint() for m in loaded) == sorted(m.fingerprint() for m in identified)
+
+
+def test_corrupted_entry_is_a_miss(tmp_path):
+    cache = IdentificationCache(tmp_path)
+    model = synthetic_model(4, 2)
+    identify_decision_models_cached(model, cache=cache)
+    (entry,) = tmp_path.glob("*.pickle")
+    entry.write_bytes(b"not a pickle")
+    assert cache.load(model, _rules()) is None
+    identified = identify_decision_models_cached(model, cache=cache)
+    assert sorted(m.fingerprint() for m in identified) == sorted(
+        m.fingerprint() for m in identify_decision_models(model)
+    )
+    assert cache.load(model, _rules()) is not None
@@ -0,0 +1,229 @@
+import random
+from typing import List
+
+import pytest
+
+from forsyde.io.python.api import ForSyDeModel
+from forsyde.io.python.core import Vertex
+from forsyde.io.python.types import VertexTrait
+
+from idesyde.benchmark.generators import add_sdf_application
+from idesyde.benchmark.generators import add_timing_annotations
+from idesyde.benchmark.generators import synthetic_model
+from idesyde.identification.api import _dominance_graph
+from idesyde.identification.api import _get_registered_rules
+from idesyde.identification.api import choose_decision_models
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.api import identify_decision_models_parallel
+from idesyde.identification.api import reidentify_decision_models
+from idesyde.identification.interfaces import DecisionModel
+from idesyde.identification.models import SDFExecution
+from idesyde.identification.models import SDFToMPSoCClusteringMzn
+from idesyde.identification.models import SDFToMultiCore
+from idesyde.identification.models import SDFToMultiCoreCharacterized
+from idesyde.identification.models import SDFToOrders
+from idesyde.identification.models import TaskScheduling
+from idesyde.identification.models import TimeTriggeredPlatform
+from idesyde.identification.scheduling import RuleScheduler
+
+_models = [
+    ("mesh", dict(actors=6, tiles=4)),
+    ("bus", dict(actors=5, tiles=3, platform="bus", extra_channels=2, delays=1)),
+    ("unannotated", dict(actors=4, tiles=2, annotated=False)),
+]
+
+
+def _unscheduled_identification(model: ForSyDeModel) -> List[DecisionModel]:
+    # the identification loop without any scheduling, calling every rule until its fixpoint
+    rules = list(_get_registered_rules())
+    max_iterations = len(model) * len(rules)
+    allowed_rules = list(rules)
+    identified: List[DecisionModel] = []
+    iterations = 0
+    while len(allowed_rules) > 0 and iterations < max_iterations:
+        for rule in list(allowed_rules):
+            (fixed, subprob) = rule(model, identified)
+            if subprob and subprob not in identified:
+                identified.append(subprob)
+            if fixed:
+                allowed_rules.remove(rule)
+        iterations += 1
+    return identified
+
+
+def _fingerprints(models: List[DecisionModel]) -> List[str]:
+    return sorted(m.fingerprint() for m in models)
+
+
+@pytest.mark.parametrize("name, kwargs", _models, ids=[n for (n, _) in _models])
+def test_scheduled_identification_chooses_as_unscheduled(name, kwargs):
+    model = synthetic_model(**kwargs)
+    expected = choose_decision_models(_unscheduled_identification(model))
+    assert expected
+    assert _fingerprints(choose_decision_models(identify_decision_models(model))) == _fingerprints(expected)
+
+
+@pytest.mark.parametrize("name, kwargs", _models, ids=[n for (n, _) in _models])
+def test_targeted_identification_chooses_as_unscheduled(name, kwargs):
+    model = synthetic_model(**kwargs)
+    expected = choose_decision_models(_unscheduled_identification(model))
+    for m in expected:
+        targeted = choose_decision_models(identify_decision_models(model, targets=[m.short_name()]))
+        assert m.fingerprint() in _fingerprints(targeted)
+
+
+def test_rule_is_due_only_for_new_consumed_models():
+    def rule(model, identified):
+        return (False, None)
+
+    def design_rule(model, identified):
+        return (False, None)
+
+    scheduler = RuleScheduler([rule, design_rule], {rule: (SDFExecution,), design_rule: ()})
+    identified: List[DecisionModel] = []
+    assert scheduler.due_rules(identified) == [rule, design_rule]
+    scheduler.notify(rule, 0, False, None)
+    scheduler.notify(design_rule, 0, False, None)
+    assert scheduler.due_rules(identified) == []
+    identified.append(TimeTriggeredPlatform())
+    assert scheduler.due_rules(identified) == []
+    identified.append(SDFExecution())
+    assert scheduler.due_rules(identified) == [rule]
+    # a rule that produced something may still have more to give
+    scheduler.notify(rule, len(identified), False, TimeTriggeredPlatform())
+    assert scheduler.is_due(rule, identified)
+    scheduler.notify(rule, len(identified), True, None)
+    assert not scheduler.is_due(rule, identified)
+
+
+def test_equal_numbers_have_the_same_fingerprint():
+    (steps, float_steps) = (SDFToMultiCore(max_steps=2), SDFToMultiCore(max_steps=2.0))
+    assert steps == float_steps
+    assert steps.fingerprint() == float_steps.fingerprint()
+    assert hash(steps) == hash(float_steps)
+    assert SDFToMultiCore(max_steps=True) == SDFToMultiCore(max_steps=1)
+    assert SDFToMultiCore(max_steps=2.5) != SDFToMultiCore(max_steps=2)
+    assert SDFToMultiCore(max_steps=2.5).fingerprint() == SDFToMultiCore(max_steps=2.5).fingerprint()
+
+
+@pytest.mark.parametrize("name, kwargs", _models, ids=[n for (n, _) in _models])
+def test_dominance_graph_is_pairwise_dominance(name, kwargs):
+    identified = identify_decision_models(synthetic_model(**kwargs))
+    assert any(isinstance(m, TaskScheduling) for m in identified)
+    expected = set(
+        (i, j)
+        for (i, m) in enumerate(identified)
+        for (j, other) in enumerate(identified)
+        if i != j and m.dominates(other)
+    )
+    assert set(_dominance_graph(identified).edges) == expected
+
+
+def test_task_scheduling_with_more_timings_dominates():
+    job = (1, Vertex("actor"))
+    untimed = TaskScheduling(jobs=[], wcet={})
+    timed = TaskScheduling(jobs=[], wcet={(job, 0): 5})
+    assert timed.dominates(untimed)
+    assert not untimed.dominates(timed)
+    assert set(_dominance_graph([untimed, timed]).edges) == {(1, 0)}
+
+
+def test_sdf_models_use_plain_repetition_vectors():
+    identified = identify_decision_models(synthetic_model(actors=5, tiles=3, delays=1))
+    orders = next(m for m in identified if isinstance(m, SDFToOrders))
+    repetition_vector = orders.sdf_exec_sub.sdf_repetition_vector
+    assert orders.get_mzn_data()["activations"] == repetition_vector
+    characterized = next(m for m in identified if isinstance(m, SDFToMultiCoreCharacterized))
+    clustering = SDFToMPSoCClusteringMzn(sdf_mpsoc_char_sub=characterized)
+    clustering.compute_deduced_properties()
+    assert clustering.num_clusters == sum(repetition_vector)
+
+
+def test_task_scheduling_simulation_sends_the_data_of_implied_precedences():
+    # a -> b -> c, with the shortcut channel a -> c and a back channel c -> a with delays
+    (a, b, c) = [(1, Vertex(name)) for name in "abc"]
+    (core0, core1, bus) = (Vertex("core0"), Vertex("core1"), Vertex("bus"))
+    scheduling = TaskScheduling(
+        jobs=[a, b, c],
+        procs=[[core0], [core1]],
+        comms=[[bus]],
+        paths={(core0, core1): [[bus]], (core1, core0): [[bus]]},
+        weak_next={a: [], b: [], c: []},
+        # the precedence a -> c is implied by the others
+        strong_next={a: [b], b: [c], c: []},
+        comm_channels={(a, b): [[bus]], (b, c): [[bus]], (a, c): [[bus]], (c, a): [[bus]]},
+        wcet={(j, p): 1 for j in (a, b, c) for p in (0, 1)},
+        wcct={(a, b, 0): 1, (b, c, 0): 1, (a, c, 0): 10, (c, a, 0): 100},
+    )
+    # a and b in the first core, so c waits for the data of a
+    execution = scheduling.simulate([0, 0, 1])
+    assert execution.period == 2
+    assert execution.latency == 1 + 10 + 1
+    # in one core nothing is sent
+    execution = scheduling.simulate([0, 0, 0])
+    assert execution.period == 3
+    assert execution.latency == 3
+
+
+def test_sdf_execution_bounds_the_buffers():
+    # a -2/3-> b -1/2-> c -3/1-> a, with 3 tokens back to a
+    channels = [(0, 1, 2, 3), (1, 2, 1, 2), (2, 0, 3, 1)]
+    execution = SDFExecution(
+        sdf_actors=[Vertex(name) for name in "abc"],
+        sdf_channel_rates=channels,
+        sdf_repetition_vector=[3, 2, 1],
+        sdf_initial_tokens=[0, 0, 3],
+        sdf_pass_loops=[(3, 0), (2, 1), (1, 2)],
+    )
+    execution.compute_deduced_properties()
+    # any schedule fits in the maximum tokens, and one iteration still fits in the minimal buffers
+    assert execution.sdf_max_tokens == [6, 2, 6]
+    # the minimal buffers are only searched for when asked for, and only once
+    assert "sdf_min_buffers" not in execution.__dict__.get("_cached", {})
+    assert execution.sdf_min_buffers() == [4, 2, 3]
+    assert execution.sdf_min_buffers() is execution.sdf_min_buffers()
+
+
+@pytest.mark.parametrize("name, kwargs", _models)
+def test_parallel_identification_is_the_sequential_one(name, kwargs):
+    model = synthetic_model(**kwargs)
+    sequential = identify_decision_models(model)
+    parallel = identify_decision_models_parallel(model, concurrent_idents=2, parallel_threshold=0)
+    assert [m.fingerprint() for m in parallel] == [m.fingerprint() for m in sequential]
+    assert sorted(m.fingerprint() for m in choose_decision_models(parallel)) == sorted(
+        m.fingerprint() for m in choose_decision_models(sequential)
+    )
+
+
+def _add_application(model):
+    cores = [v for v in model if v.has_trait(VertexTrait.AbstractProcessingComponent)]
+    comms = [v for v in model if v.has_trait(VertexTrait.AbstractCommunicationComponent)]
+    before = set(model)
+    rng = random.Random(1)
+    (actors, signals) = add_sdf_application(model, 4, rates=(1, 2), prefix="other", rng=rng)
+    add_timing_annotations(model, actors, cores, signals, comms, prefix="other_ann", rng=rng)
+    return dict(added_vertexes=[v for v in model if v not in before])
+
+
+def _change_wcet(model):
+    wcet = next(v for v in model if v.has_trait(VertexTrait.WCET))
+    wcet.properties["time"] += 1000
+    return dict(added_vertexes=[wcet])
+
+
+def _remove_vertex(model):
+    impl = next(v for v in model if v.has_trait(VertexTrait.InstrumentedFunction))
+    edges = list(model.in_edges(impl)) + list(model.out_edges(impl))
+    model.remove_node(impl)
+    return dict(removed_vertexes=[impl], removed_edges=edges)
+
+
+@pytest.mark.parametrize("edit", [_add_application, _change_wcet, _remove_vertex])
+def test_reidentification_chooses_as_a_full_identification(edit):
+    model = synthetic_model(actors=5, tiles=3, delays=1)
+    previous = identify_decision_models(model)
+    changes = edit(model)
+    reidentified = reidentify_decision_models(model, previous, **changes)
+    assert sorted(m.fingerprint() for m in choose_decision_models(reidentified)) == sorted(
+        m.fingerprint() for m in choose_decision_models(identify_decision_models(model))
+    )
@@ -0,0 +1,31 @@
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx  # type: ignore
+
+from forsyde.io.python.types import VertexTrait
+
+from idesyde.benchmark.generators import synthetic_model
+from idesyde.identification.queries import ModelQueries
+
+
+def test_shortest_paths_are_the_ones_of_networkx():
+    model = synthetic_model(actors=4, tiles=4)
+    queries = ModelQueries(model)
+    cores = queries.vertexes_with_trait(VertexTrait.AbstractProcessingComponent)
+    for (s, t) in itertools.permutations(cores, 2):
+        expected = [p[1:-1] for p in nx.all_shortest_paths(model, s, t)] if nx.has_path(model, s, t) else None
+        assert queries.shortest_paths(s, t) == expected
+
+
+def test_shared_queries_answer_the_same_from_many_threads():
+    model = synthetic_model(actors=8, tiles=9)
+    vertexes = list(model)
+    pairs = list(itertools.product(vertexes[::3], vertexes[::5]))
+    expected = ModelQueries(model)
+    answers = [expected.shortest_paths(s, t) for (s, t) in pairs]
+    # few trees, so that the threads keep evicting each other's
+    shared = ModelQueries(model, max_trees=2)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(4):
+            assert list(pool.map(lambda st: shared.shortest_paths(*st), pairs)) == answers
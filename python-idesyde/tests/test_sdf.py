@@ -0,0 +1,420 @@
+import math
+import random
+
+import pytest
+
+import idesyde.sdf as sdf
+
+# channels as (source, target, production, consumption): a -2/3-> b -1/2-> c
+_chain = [(0, 1, 2, 3), (1, 2, 1, 2)]
+# the chain closed back from c to a, consistently or not
+_cycle = _chain + [(2, 0, 3, 1)]
+_inconsistent_cycle = _chain + [(2, 0, 4, 1)]
+
+
+def test_repetition_vector_of_known_graphs():
+    assert sdf.channels_repetition_vector(2, [(0, 1, 2, 3)]) == [3, 2]
+    assert sdf.channels_repetition_vector(3, _chain) == [3, 2, 1]
+    assert sdf.channels_repetition_vector(3, _cycle) == [3, 2, 1]
+    # rates with common factors still give the smallest solution
+    assert sdf.channels_repetition_vector(2, [(0, 1, 4, 6)]) == [3, 2]
+    # a self loop only has to be balanced on its own
+    assert sdf.channels_repetition_vector(2, [(0, 1, 1, 1), (1, 1, 2, 2)]) == [1, 1]
+
+
+def test_repetition_vector_of_random_consistent_graphs():
+    rng = random.Random(0)
+    for _ in range(50):
+        n = rng.randint(2, 12)
+        q = [rng.randint(1, 6) for _ in range(n)]
+        channels = []
+        for dst in range(1, n):
+            src = rng.randrange(dst)
+            # rates balanced for 'q': q[src] * prod == q[dst] * cons
+            k = rng.randint(1, 3)
+            g = math.gcd(q[src], q[dst])
+            channels.append((src, dst, k * q[dst] // g, k * q[src] // g))
+        g = 0
+        for r in q:
+            g = math.gcd(g, r)
+        assert sdf.channels_repetition_vector(n, channels) == [r // g for r in q]
+
+
+def test_repetition_vector_from_topology():
+    topology = [[2, -3, 0], [0, 1, -2]]
+    assert sdf.topology_to_channels(topology) == _chain
+    assert sdf.channels_to_topology(3, _chain) == topology
+    assert sdf.get_repetition_vector(topology) == [3, 2, 1]
+
+
+def test_disconnected_graphs_are_scaled_apart():
+    # two chains, scaled to their own smallest solutions
+    assert sdf.channels_repetition_vector(4, [(0, 1, 2, 3), (2, 3, 5, 1)]) == [3, 2, 1, 5]
+    # an actor without channels fires once
+    assert sdf.channels_repetition_vector(3, [(0, 1, 1, 2)]) == [2, 1, 1]
+
+
+def test_inconsistent_graphs_are_detected():
+    with pytest.raises(sdf.SDFInconsistencyError) as e:
+        sdf.channels_repetition_vector(3, _inconsistent_cycle)
+    # any channel of the cycle can be the one found to conflict
+    assert e.value.channel in (0, 1, 2)
+    with pytest.raises(sdf.SDFInconsistencyError) as e:
+        sdf.channels_repetition_vector(2, [(0, 1, 1, 1), (1, 1, 2, 1)])
+    assert e.value.channel == 1
+    with pytest.raises(sdf.SDFInconsistencyError):
+        sdf.channels_repetition_vector(2, [(0, 1, 0, 1)])
+
+
+def test_malformed_topologies_are_detected():
+    with pytest.raises(sdf.SDFInconsistencyError):
+        sdf.topology_to_channels([[1, 0, 0]])
+    with pytest.raises(sdf.SDFInconsistencyError):
+        sdf.topology_to_channels([[1, 1, 0]])
+    with pytest.raises(sdf.SDFInconsistencyError):
+        sdf.topology_to_channels([[1, -1, -1]])
+
+
+# a consistent chain, an inconsistent cycle, a cycle without delays and a lone actor
+_parts = _chain + [(3, 4, 1, 1), (4, 3, 1, 2), (5, 6, 1, 1), (6, 5, 1, 1)]
+_parts_tokens = [0, 0, 1, 1, 0, 0]
+
+
+def test_graph_is_split_into_components():
+    components = sdf.sdf_components(8, _parts)
+    assert [(c.actors, c.channels) for c in components] == [
+        ([0, 1, 2], [0, 1]),
+        ([3, 4], [2, 3]),
+        ([5, 6], [4, 5]),
+        ([7], []),
+    ]
+
+
+def _check_analysis(components):
+    (chain, inconsistent, deadlocked, lone) = components
+    assert chain.error is None
+    assert chain.repetition_vector == [3, 2, 1]
+    firings = list(sdf.iter_looped_schedule(chain.schedule))
+    assert sorted(firings) == [0, 0, 0, 1, 1, 2]
+    assert "inconsistent" in inconsistent.error
+    assert "Channel 2" in inconsistent.error or "Channel 3" in inconsistent.error
+    assert inconsistent.schedule == []
+    assert "PASS" in deadlocked.error
+    assert deadlocked.schedule == []
+    assert (lone.repetition_vector, lone.schedule, lone.error) == ([1], [(1, 7)], None)
+
+
+def test_components_are_analysed_apart():
+    _check_analysis(sdf.analyse_sdf_components(8, _parts, _parts_tokens))
+
+
+def test_components_are_analysed_in_parallel():
+    _check_analysis(sdf.analyse_sdf_components(8, _parts, _parts_tokens, parallel_threshold=0, max_workers=2))
+
+
+@pytest.mark.parametrize("error", [sdf.BrokenProcessPool, sdf.pickle.PicklingError, OSError])
+def test_components_are_analysed_serially_if_the_pool_fails(monkeypatch, error):
+    class FailingPool(object):
+        def __init__(self, max_workers=None):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def map(self, *args):
+            raise error("the pool failed")
+
+    monkeypatch.setattr(sdf, "ProcessPoolExecutor", FailingPool)
+    _check_analysis(sdf.analyse_sdf_components(8, _parts, _parts_tokens, parallel_threshold=0))
+
+
+def test_errors_of_the_analysis_are_not_hidden_by_the_serial_fallback(monkeypatch):
+    class FailingPool(object):
+        def __init__(self, max_workers=None):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def map(self, *args):
+            raise TypeError("a bug in the analysis")
+
+    monkeypatch.setattr(sdf, "ProcessPoolExecutor", FailingPool)
+    with pytest.raises(TypeError):
+        sdf.analyse_sdf_components(8, _parts, _parts_tokens, parallel_threshold=0)
+
+
+def _naive_pass(topology, repetition_vector, tokens):
+    # at every step, fire the first actor by index that can fire
+    tokens = list(tokens)
+    remaining = list(repetition_vector)
+    firings = []
+    while sum(remaining) > 0:
+        for a in range(len(remaining)):
+            if remaining[a] > 0 and all(tokens[c] + row[a] >= 0 for (c, row) in enumerate(topology)):
+                for (c, row) in enumerate(topology):
+                    tokens[c] += row[a]
+                remaining[a] -= 1
+                firings.append(a)
+                break
+        else:
+            return []
+    return firings
+
+
+def _random_graph(rng, n, cycles):
+    # a random tree with balanced rates, plus back channels closing cycles with delays
+    q = [rng.randint(1, 4) for _ in range(n)]
+    channels = []
+    for dst in range(1, n):
+        src = rng.randrange(dst)
+        g = math.gcd(q[src], q[dst])
+        channels.append((src, dst, q[dst] // g, q[src] // g))
+    tokens = [0 for _ in channels]
+    for _ in range(cycles):
+        (dst, src) = sorted(rng.sample(range(n), 2))
+        g = math.gcd(q[src], q[dst])
+        channels.append((src, dst, q[dst] // g, q[src] // g))
+        tokens.append(rng.choice([0, q[dst] * (q[src] // g)]))
+    return (channels, tokens)
+
+
+def test_pass_is_the_one_of_the_first_fireable_actor():
+    rng = random.Random(1)
+    for _ in range(100):
+        n = rng.randint(2, 8)
+        (channels, tokens) = _random_graph(rng, n, rng.randint(0, 3))
+        q = sdf.channels_repetition_vector(n, channels)
+        topology = sdf.channels_to_topology(n, channels)
+        expected = _naive_pass(topology, q, tokens)
+        assert list(sdf.get_PASS(topology, q, tokens)) == expected
+        assert sdf.channels_PASS(n, channels, q, tokens) == expected
+
+
+def test_pass_of_known_graphs():
+    assert list(sdf.get_PASS([[2, -3, 0], [0, 1, -2]], [3, 2, 1])) == [0, 0, 0, 1, 1, 2]
+    # the cycle needs the delays of its back channel
+    assert sdf.channels_PASS(3, _cycle, [3, 2, 1], [0, 0, 3]) == [0, 0, 0, 1, 1, 2]
+    assert sdf.channels_PASS(3, _cycle, [3, 2, 1], [0, 0, 2]) == []
+    assert sdf.channels_looped_PASS(3, _cycle, [3, 2, 1], [0, 0, 2]) == []
+    looped = sdf.channels_looped_PASS(3, _cycle, [3, 2, 1], [0, 0, 3])
+    assert list(sdf.iter_looped_schedule(looped)) == [0, 0, 0, 1, 1, 2]
+
+
+def test_looped_schedule_of_known_firings():
+    assert sdf.looped_schedule([0, 0, 1, 0, 0, 1, 2]) == [(2, [(2, 0), (1, 1)]), (1, 2)]
+    assert sdf.looped_schedule([0, 1] * 50) == [(50, [(1, 0), (1, 1)])]
+    assert sdf.looped_schedule([]) == []
+    # blocks longer than 'max_block' are not folded
+    assert sdf.looped_schedule([0, 1, 2] * 2, max_block=2) == [(1, 0), (1, 1), (1, 2)] * 2
+    assert sdf.looped_schedule([0, 1, 2] * 2, max_block=3) == [(2, [(1, 0), (1, 1), (1, 2)])]
+    # nested loops
+    assert sdf.looped_schedule(([0, 0, 1] * 3 + [2]) * 2) == [(2, [(3, [(2, 0), (1, 1)]), (1, 2)])]
+
+
+def test_looped_schedule_expands_to_its_firings():
+    rng = random.Random(2)
+    for _ in range(200):
+        # firings with some repeated structure, as the ones of a PASS
+        pieces = [[rng.randrange(4) for _ in range(rng.randint(1, 4))] for _ in range(3)]
+        firings = [a for _ in range(rng.randint(1, 4)) for p in rng.choices(pieces, k=4) for a in p * rng.randint(1, 3)]
+        schedule = sdf.looped_schedule(iter(firings), max_block=rng.randint(1, 8))
+        assert list(sdf.iter_looped_schedule(schedule)) == firings
+        assert sdf.looped_schedule_length(schedule) == len(firings)
+        assert list(sdf.iter_looped_schedule(sdf.map_looped_schedule(schedule, lambda a: 10 * a))) == [
+            10 * a for a in firings
+        ]
+
+
+def test_folded_blocks_expand_to_the_same_firings():
+    rng = random.Random(3)
+    for _ in range(200):
+        schedule = [(rng.randint(1, 2), rng.randrange(3)) for _ in range(rng.randint(0, 12))]
+        for block in range(1, 5):
+            folded = sdf._fold_blocks(schedule, block)
+            assert len(folded) <= len(schedule)
+            assert list(sdf.iter_looped_schedule(folded)) == list(sdf.iter_looped_schedule(schedule))
+    # repeated blocks become a loop, merged with an equal loop right after it
+    assert sdf._fold_blocks([(1, 0), (1, 1), (1, 0), (1, 1), (1, 2)], 2) == [(2, [(1, 0), (1, 1)]), (1, 2)]
+    assert sdf._fold_blocks([(2, [(1, 0)]), (1, 0), (1, 0)], 1) == [(4, [(1, 0)])]
+
+
+def test_job_graph_of_known_graph():
+    # a1 a2 a3 b1 b2 c1 as jobs 0 to 5, with one token from b to c
+    graph = sdf.sdf_job_graph(3, _chain, [3, 2, 1], [0, 1])
+    assert graph.num_jobs == 6
+    assert graph.actor_first_job == [0, 3, 5, 6]
+    assert (graph.job_actor, graph.job_firing) == ([0, 0, 0, 1, 1, 2], [1, 2, 3, 1, 2, 1])
+    assert [graph.job(a, f) for (a, f) in zip(graph.job_actor, graph.job_firing)] == list(range(6))
+    assert (graph.weak_offsets, graph.weak_targets) == ([0, 1, 2, 2, 3, 3, 3], [1, 2, 4])
+    assert (graph.strong_offsets, graph.strong_targets) == ([0, 1, 2, 3, 4, 4, 4], [3, 3, 4, 5])
+    assert [graph.strong_successors(j) for j in range(6)] == [[3], [3], [4], [5], [], []]
+    (jobs, weak_next, strong_next) = graph.to_jobs(["a", "b", "c"])
+    assert jobs == [(1, "a"), (2, "a"), (3, "a"), (1, "b"), (2, "b"), (1, "c")]
+    assert weak_next[(1, "b")] == [(2, "b")]
+    # the initial token lets c fire once b fired once
+    assert strong_next[(1, "b")] == [(1, "c")]
+    assert strong_next[(2, "b")] == []
+
+
+def test_job_graph_strong_edges_give_the_tokens_consumed():
+    rng = random.Random(4)
+    for _ in range(100):
+        n = rng.randint(2, 6)
+        (channels, tokens) = _random_graph(rng, n, rng.randint(0, 2))
+        q = sdf.channels_repetition_vector(n, channels)
+        graph = sdf.sdf_job_graph(n, channels, q, tokens)
+        expected = set()
+        for ((src, dst, prod, cons), t) in zip(channels, tokens):
+            for f in range(1, q[src] + 1):
+                # the first consumer firing that needs a token of the producer firing 'f'
+                k = (prod * (f - 1) + t) // cons + 1
+                if k <= q[dst]:
+                    expected.add((graph.job(src, f), graph.job(dst, k)))
+        assert set((j, k) for j in range(graph.num_jobs) for k in graph.strong_successors(j)) == expected
+        assert [graph.weak_successors(j) for j in range(graph.num_jobs)] == [
+            [j + 1] if j + 1 < graph.actor_first_job[graph.job_actor[j] + 1] else [] for j in range(graph.num_jobs)
+        ]
+
+
+def _random_dag(rng, n):
+    # edges only go to higher nodes, with some duplicates
+    weak = [[v for v in range(u + 1, n) if rng.random() < 0.3] for u in range(n)]
+    strong = [[v for v in range(u + 1, n) if rng.random() < 0.2] for u in range(n)]
+    for u in range(n):
+        strong[u] += rng.sample(strong[u], min(1, len(strong[u])))
+    return (weak, strong)
+
+
+@pytest.mark.parametrize("keep_strong", [False, True])
+def test_reduction_keeps_the_closure(keep_strong):
+    rng = random.Random(5)
+    for _ in range(100):
+        n = rng.randint(1, 12)
+        (weak, strong) = _random_dag(rng, n)
+        (reduced_weak, reduced_strong) = sdf.precedence_reduction(n, weak, strong, keep_strong=keep_strong)
+        assert sdf.precedence_closure(n, reduced_weak, reduced_strong) == sdf.precedence_closure(n, weak, strong)
+        assert all(set(r) <= set(w) for (r, w) in zip(reduced_weak, weak))
+        if keep_strong:
+            assert reduced_strong == [list(dict.fromkeys(s)) for s in strong]
+        else:
+            assert all(set(r) <= set(s) for (r, s) in zip(reduced_strong, strong))
+
+
+def test_reduction_of_a_shortcut():
+    # a -> b -> c with the shortcut a -> c, all strong
+    strong = [[1, 2], [2], []]
+    assert sdf.precedence_reduction(3, [[], [], []], strong) == ([[], [], []], [[1], [2], []])
+    assert sdf.precedence_reduction(3, [[2], [], []], strong, keep_strong=True) == ([[], [], []], strong)
+    with pytest.raises(ValueError):
+        sdf.precedence_reduction(2, [[1], [0]], [[], []])
+
+
+def test_reduced_jobs_keep_the_data_dependencies():
+    rng = random.Random(6)
+    for _ in range(50):
+        n = rng.randint(2, 6)
+        (channels, tokens) = _random_graph(rng, n, rng.randint(0, 2))
+        q = sdf.channels_repetition_vector(n, channels)
+        # a shortcut channel, implied by the others when the graph is a chain
+        g = math.gcd(q[0], q[n - 1])
+        channels.append((0, n - 1, q[n - 1] // g, q[0] // g))
+        tokens.append(0)
+        if not sdf.channels_PASS(n, channels, q, tokens):
+            # the jobs of a deadlocked graph have cyclic precedences
+            continue
+        graph = sdf.sdf_job_graph(n, channels, q, tokens)
+        reduced = graph.reduced(keep_strong=True)
+        # parallel channels can give the same precedence more than once
+        assert [set(reduced.strong_successors(j)) for j in range(graph.num_jobs)] == [
+            set(graph.strong_successors(j)) for j in range(graph.num_jobs)
+        ]
+        assert (reduced.closure().weak_targets, reduced.closure().strong_targets) == (
+            graph.closure().weak_targets,
+            graph.closure().strong_targets,
+        )
+        actors = list(range(n))
+        (jobs, _, strong_next) = sdf.sdf_to_jobs(actors, {}, channels, q, tokens)
+        reduced_next = sdf.sdf_to_jobs(actors, {}, channels, q, tokens, reduced=True)[2]
+        assert {j: set(ts) for (j, ts) in reduced_next.items()} == {j: set(ts) for (j, ts) in strong_next.items()}
+
+
+def _buffer_incidence(num_actors, channels):
+    # the tokens every actor consumes and changes, as 'minimal_buffer_sizes' gives to '_fits_buffers'
+    consumes = [[] for _ in range(num_actors)]
+    changes = [[] for _ in range(num_actors)]
+    for (cidx, (src, dst, prod, cons)) in enumerate(channels):
+        consumes[dst].append((cidx, cons))
+        changes[src].append((cidx, prod))
+        changes[dst].append((cidx, -cons))
+    return (consumes, changes)
+
+
+class _CountedTokens(list):
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.updates = 0
+
+    def __setitem__(self, idx, value):
+        self.updates += 1
+        super().__setitem__(idx, value)
+
+
+def test_pass_buffer_sizes():
+    assert sdf.pass_buffer_sizes(2, [(0, 1, 2, 3)], [0, 0, 0, 1, 1]) == [6]
+    assert sdf.pass_buffer_sizes(2, [(0, 1, 2, 3)], [0, 0, 1, 0, 1]) == [4]
+    # the initial tokens are in the buffer too
+    assert sdf.pass_buffer_sizes(2, [(0, 1, 2, 3)], [0, 0, 0, 1, 1], [2]) == [8]
+    assert sdf.pass_buffer_sizes(3, _cycle, iter([0, 0, 0, 1, 1, 2]), [0, 0, 3]) == [6, 2, 3]
+
+
+def test_fits_buffers():
+    (consumes, changes) = _buffer_incidence(2, [(0, 1, 2, 3)])
+    assert sdf._fits_buffers(consumes, changes, [3, 2], [0], [4], 0)
+    assert not sdf._fits_buffers(consumes, changes, [3, 2], [0], [3], 10000)
+    # b needs a whole iteration of a before it fires
+    (consumes, changes) = _buffer_incidence(2, [(0, 1, 1, 3)])
+    assert not sdf._fits_buffers(consumes, changes, [3, 1], [0], [2], 10000)
+    assert sdf._fits_buffers(consumes, changes, [3, 1], [0], [3], 10000)
+
+
+def test_fits_buffers_gives_up_after_max_states():
+    # six sources and a sink that needs three tokens of each, but the last buffer only holds two
+    sources = 6
+    channels = [(a, sources, 1, 3) for a in range(sources)]
+    (consumes, changes) = _buffer_incidence(sources + 1, channels)
+    q = [3] * sources + [1]
+    sizes = [3] * (sources - 1) + [2]
+    tokens = _CountedTokens([0] * sources)
+    assert not sdf._fits_buffers(consumes, changes, q, tokens, sizes, 10000)
+    explored = tokens.updates
+    tokens = _CountedTokens([0] * sources)
+    assert not sdf._fits_buffers(consumes, changes, q, tokens, sizes, 10)
+    assert tokens.updates < explored // 10
+
+
+def test_minimal_buffer_sizes():
+    # p + c - gcd(p, c) for a single channel
+    assert sdf.minimal_buffer_sizes(2, [(0, 1, 2, 3)], [3, 2]) == [4]
+    assert sdf.minimal_buffer_sizes(2, [(0, 1, 2, 4)], [2, 1], [1]) == [5]
+    # the PASS needs 6 tokens in a -> b, but 4 are enough
+    assert sdf.minimal_buffer_sizes(3, _cycle, [3, 2, 1], [0, 0, 3]) == [4, 2, 3]
+    # without a PASS, the sizes are the ones of the firings given
+    assert sdf.minimal_buffer_sizes(3, _cycle, [3, 2, 1], [0, 0, 2]) == [0, 0, 2]
+    rng = random.Random(7)
+    for _ in range(50):
+        n = rng.randint(2, 6)
+        (channels, tokens) = _random_graph(rng, n, rng.randint(0, 2))
+        q = sdf.channels_repetition_vector(n, channels)
+        firings = sdf.channels_PASS(n, channels, q, tokens)
+        sizes = sdf.minimal_buffer_sizes(n, channels, q, tokens, firings)
+        assert all(s <= p for (s, p) in zip(sizes, sdf.pass_buffer_sizes(n, channels, firings, tokens)))
+        if firings:
+            (consumes, changes) = _buffer_incidence(n, channels)
+            assert sdf._fits_buffers(consumes, changes, q, list(tokens), sizes, 10000)
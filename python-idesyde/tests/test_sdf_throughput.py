@@ -0,0 +1,105 @@
+import random
+from fractions import Fraction
+
+import networkx as nx  # type: ignore
+
+import idesyde.sdf_throughput as sdf_throughput
+from idesyde.sdf_throughput import SDFThroughputAnalysis
+
+# channels as (source, target, production, consumption): a -2/3-> b -1/2-> c -3/1-> a
+_cycle = [(0, 1, 2, 3), (1, 2, 1, 2), (2, 0, 3, 1)]
+
+
+def _brute_force_ratio(num_nodes, edges):
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(num_nodes))
+    graph.add_edges_from((u, v, dict(d=d, w=w)) for (u, v, d, w) in edges)
+    ratios = []
+    for cycle in nx.simple_cycles(graph):
+        steps = list(zip(cycle, cycle[1:] + cycle[:1]))
+        delay = sum(graph.edges[s]["d"] for s in steps)
+        ratios.append(Fraction(sum(graph.edges[s]["w"] for s in steps), delay) if delay > 0 else None)
+    return ratios
+
+
+def test_max_cycle_ratio_of_known_graphs():
+    # a cycle with 7 time units over 2 delays
+    assert sdf_throughput.max_cycle_ratio(3, [(0, 1, 0, 3), (1, 2, 1, 2), (2, 0, 1, 2)]) == Fraction(7, 2)
+    # two components, each solved on its own, plus an edge between them that is in no cycle
+    edges = [(0, 1, 1, 1), (1, 0, 0, 1), (2, 3, 0, 5), (3, 2, 1, 4), (1, 2, 0, 100)]
+    assert sdf_throughput.max_cycle_ratio(4, edges) == 9
+    assert sdf_throughput.max_cycle_ratio(3, [(0, 1, 0, 1), (1, 2, 0, 1)]) is None
+    # self loops and parallel edges, where the slower edge back over 2 delays is the worst
+    assert sdf_throughput.max_cycle_ratio(2, [(0, 0, 1, 3), (0, 1, 0, 1), (1, 0, 1, 1), (1, 0, 2, 6)]) == Fraction(
+        7, 2
+    )
+
+
+def test_max_cycle_ratio_is_the_one_of_the_worst_cycle():
+    rng = random.Random(0)
+    for _ in range(200):
+        n = rng.randint(1, 7)
+        edges = {
+            (u, v): (rng.randint(0, 2), rng.randint(0, 10))
+            for u in range(n)
+            for v in range(n)
+            if rng.random() < 0.35
+        }
+        edges = [(u, v, d, w) for ((u, v), (d, w)) in edges.items()]
+        ratios = _brute_force_ratio(n, edges)
+        if None in ratios:
+            # a cycle without delays deadlocks
+            assert sdf_throughput.self_timed_period(n, edges) is None
+        else:
+            assert sdf_throughput.max_cycle_ratio(n, edges) == max(ratios, default=None)
+
+
+def test_strongly_connected_components_of_a_long_cycle():
+    n = 5000
+    succ = [[(u + 1) % n] for u in range(n)] + [[0]]
+    assert [sorted(c) for c in sdf_throughput.strongly_connected_components(n + 1, succ)] == [
+        list(range(n)),
+        [n],
+    ]
+
+
+def test_hsdf_dependencies_of_known_graph():
+    # the consumer of b -> c takes the token left by the b of the previous iteration
+    assert sdf_throughput.hsdf_dependencies(3, _cycle[:2], [3, 2, 1], [0, 1]) == [
+        (0, 3, 0, 2, 0),
+        (1, 3, 0, 1, 0),
+        (1, 4, 0, 1, 0),
+        (2, 4, 0, 2, 0),
+        (4, 5, 1, 1, 1),
+        (3, 5, 0, 1, 1),
+    ]
+
+
+def test_throughput_of_known_graphs():
+    chain = SDFThroughputAnalysis(2, _cycle[:1], [3, 2])
+    # every actor fires its repetitions sequentially
+    assert chain.period([1, 5]) == 10
+    assert chain.throughput([1, 5]) == Fraction(1, 10)
+    assert chain.throughput([0, 0]) is None
+    analysis = SDFThroughputAnalysis(3, _cycle, [3, 2, 1], [0, 0, 3])
+    # b starts before the last a, and the next a waits for c
+    assert analysis.period([1, 2, 3]) == 9
+    assert analysis.period([1, 2, 3], [0, 0, 0]) == 10
+    # a apart from b and c, sending every token in 1 time unit
+    assert analysis.period([1, 2, 3], [0, 1, 1], token_times=[1, 1, 1]) == 11
+
+
+def test_throughput_of_deadlocking_graphs():
+    assert SDFThroughputAnalysis(3, _cycle, [3, 2, 1], [0, 0, 2]).throughput([1, 2, 3]) == 0
+    # the graph runs on its own, but not in this order on one processor
+    analysis = SDFThroughputAnalysis(3, _cycle, [3, 2, 1], [0, 0, 3])
+    assert analysis.throughput([1, 2, 3], [0, 0, 0], [[1, 1, 0, 0, 0, 2]]) == 0
+
+
+def test_throughput_of_two_components():
+    # two independent actors pairs, the slowest one sets the period
+    analysis = SDFThroughputAnalysis(4, [(0, 1, 1, 1), (2, 3, 2, 1)], [1, 1, 1, 2])
+    assert analysis.period([1, 2, 3, 4]) == 8
+    assert analysis.period([1, 2, 3, 4], [0, 0, 1, 1]) == 11
+    # b and both d share a processor, a and c the other one
+    assert analysis.period([1, 2, 3, 4], [0, 1, 0, 1]) == 10
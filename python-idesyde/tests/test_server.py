@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import idesyde.identification.server as server_module
+from idesyde.benchmark.generators import synthetic_model
+from idesyde.identification.api import identify_decision_models_stream
+from idesyde.identification.cache import IdentificationCache
+from idesyde.identification.server import IdentificationClient
+from idesyde.identification.server import IdentificationServer
+
+
+@pytest.fixture
+def model_file(tmp_path, monkeypatch):
+    # the server only parses the file through 'load_model', and checks its stamp
+    path = tmp_path / "model.forxml"
+    path.write_text("model")
+    models = {str(path): synthetic_model(4, 2)}
+    monkeypatch.setattr(server_module.forsyde_io, "load_model", lambda p: models[p])
+    return path
+
+
+def _expected(path):
+    return [
+        {"fixed": fixed, "decision_model_ids": m.short_name()}
+        for (m, fixed) in identify_decision_models_stream(server_module.forsyde_io.load_model(str(path)))
+    ]
+
+
+@pytest.fixture
+def served(tmp_path):
+    socket_path = str(tmp_path / "idesyde.sock")
+    server = IdentificationServer()
+    thread = threading.Thread(target=lambda: asyncio.run(server.serve(unix_socket=socket_path)))
+    thread.start()
+    for _ in range(100):
+        try:
+            client = IdentificationClient(unix_socket=socket_path)
+            break
+        except OSError:
+            time.sleep(0.05)
+    yield (server, client)
+    client.close()
+    thread.join(5.0)
+    assert not thread.is_alive()
+
+
+def test_protocol(served, model_file, tmp_path):
+    (_, client) = served
+    assert client.can_identify(str(model_file))
+    assert client.can_identify(model_file.as_uri())
+    assert not client.can_identify(str(tmp_path / "missing.forxml"))
+    expected = _expected(model_file)
+    assert list(client.identify(str(model_file))) == expected
+    # the second time the results are taken from memory
+    assert list(client.identify(model_file.as_uri())) == expected
+    assert list(client.identify(str(model_file), ["TaskScheduling"])) == [
+        r for r in expected if r["decision_model_ids"] == "TaskScheduling"
+    ]
+    with pytest.raises(RuntimeError):
+        client._request("Unknown", {})
+        client._answer()
+    with pytest.raises(RuntimeError):
+        list(client.identify("http://localhost/model.forxml"))
+    client.shutdown()
+
+
+def test_concurrent_requests_share_one_identification(model_file):
+    server = IdentificationServer()
+    calls = []
+
+    def counted(rule):
+        def call(model, identified):
+            calls.append(rule)
+            return rule(model, identified)
+
+        return call
+
+    server.rules = [counted(rule) for rule in server.rules]
+
+    async def collect(ids=[]):
+        return [r async for r in server.identify(str(model_file), ids)]
+
+    async def both():
+        return await asyncio.gather(collect(), collect(), collect(["SDFExecution"]))
+
+    (first, second, filtered) = asyncio.run(both())
+    expected = _expected(model_file)
+    assert first == expected
+    assert second == expected
+    assert filtered == [r for r in expected if r["decision_model_ids"] == "SDFExecution"]
+    single = len(calls)
+    calls.clear()
+    list(identify_decision_models_stream(server_module.forsyde_io.load_model(str(model_file)), server.rules))
+    assert single == len(calls)
+
+
+def test_cached_results_keep_their_fixpoints(model_file, tmp_path, monkeypatch):
+    cache = IdentificationCache(tmp_path / "cache")
+
+    async def collect(server):
+        return [r async for r in server.identify(str(model_file))]
+
+    identified = asyncio.run(collect(IdentificationServer(cache)))
+    assert identified == _expected(model_file)
+    assert any(not r["fixed"] for r in identified)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The identification should come from the cache")
+
+    # a new server finds them in the cache
+    monkeypatch.setattr(server_module, "identify_decision_models_stream_async", fail)
+    assert asyncio.run(collect(IdentificationServer(cache))) == identified
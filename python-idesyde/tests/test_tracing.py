@@ -0,0 +1,73 @@
+import functools
+import json
+from collections import Counter
+
+import pytest
+
+from idesyde.benchmark.generators import synthetic_model
+from idesyde.identification.api import _get_registered_rules
+from idesyde.identification.api import identify_decision_models
+from idesyde.identification.tracing import IdentificationTrace
+
+
+def _counted(rule, calls: Counter):
+    @functools.wraps(rule)
+    def wrapper(model, identified):
+        calls[rule.__name__] += 1
+        return rule(model, identified)
+
+    return wrapper
+
+
+def _traced_identification():
+    model = synthetic_model(actors=4, tiles=2)
+    calls: Counter = Counter()
+    rules = [_counted(rule, calls) for rule in _get_registered_rules()]
+    trace = IdentificationTrace()
+    identified = identify_decision_models(model, rules, trace=trace)
+    return (trace, calls, identified)
+
+
+def test_one_invocation_per_rule_call():
+    (trace, calls, identified) = _traced_identification()
+    assert len(trace.invocations) == sum(calls.values())
+    assert Counter(i.rule for i in trace.invocations) == calls
+    assert {r: c for (r, (c, _)) in trace.rule_totals().items()} == dict(calls)
+    assert sum(1 for i in trace.invocations if i.identified) == len(identified)
+    assert all(i.start >= 0 and i.duration >= 0 for i in trace.invocations)
+
+
+def test_iterations_summarize_their_invocations():
+    (trace, _, identified) = _traced_identification()
+    assert [it.iteration for it in trace.iterations] == list(range(len(trace.iterations)))
+    for it in trace.iterations:
+        calls = [i for i in trace.invocations if i.iteration == it.iteration]
+        assert it.rules_called == len(calls)
+        assert it.rules_identified == sum(1 for i in calls if i.identified)
+        assert all(it.start <= i.start and i.start + i.duration <= it.start + it.duration for i in calls)
+    assert trace.iterations[-1].total_identified == len(identified)
+
+
+def test_chrome_trace_has_complete_events():
+    (trace, _, _) = _traced_identification()
+    events = trace.to_chrome_trace()["traceEvents"]
+    assert len(events) == len(trace.iterations) + len(trace.invocations)
+    for e in events:
+        assert e["ph"] == "X"
+        assert e["cat"] in ("iteration", "rule")
+        assert e["ts"] >= 0 and e["dur"] >= 0
+        assert isinstance(e["pid"], int) and isinstance(e["tid"], int)
+    assert sum(1 for e in events if e["cat"] == "rule") == len(trace.invocations)
+
+
+def test_write_both_formats(tmp_path):
+    (trace, _, _) = _traced_identification()
+    trace.write(str(tmp_path / "trace.json"))
+    with open(tmp_path / "trace.json") as f:
+        assert json.load(f) == json.loads(json.dumps(trace.to_json()))
+    trace.write(str(tmp_path / "chrome.json"), "chrome")
+    with open(tmp_path / "chrome.json") as f:
+        assert len(json.load(f)["traceEvents"]) == len(trace.iterations) + len(trace.invocations)
+    with pytest.raises(ValueError):
+        trace.write(str(tmp_path / "trace.csv"), "csv")
+    assert not (tmp_path / "trace.csv").exists()